@@ -1,14 +1,18 @@
 import asyncio
 import json
+import uuid
 
-import redis.asyncio as aioredis
-import requests
 from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.conf import settings
 
+from .services.gpu_relay import request_prediction, user_semaphore
+from .services.pubsub import get_mail_stream_multiplexer
 from .services.utils import build_prompt_inputs, collect_prompt_context
 
+# 마지막 키 입력 후 이 시간 동안 다음 입력이 없을 때만 GPU 요청 (연속 입력은 마지막 것 하나로 합침)
+AUTOCOMPLETE_DEBOUNCE_SECONDS = 0.15
+
 
 class MailGenerateConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -24,34 +28,51 @@ class MailGenerateConsumer(AsyncWebsocketConsumer):
 
         self.user = self.scope["user"]
         self.room_group_name = f"user_{self.user.id}_mail"
+        self.suggest_task = None
+        # 소켓 식별자 + 키 입력 순번: GPU 서버는 더 새 seq 가 온 이전 요청을 건너뛰고,
+        # 이 소켓은 자기 세션의 최신 seq 결과만 클라이언트로 전달한다
+        self.session_id = uuid.uuid4().hex
+        self.seq = 0
+        # 유저별 GPU 동시 요청 제한 (소켓이 살아 있는 동안 semaphore를 붙잡아 둔다)
+        self.gpu_semaphore = user_semaphore(self.user.id)
 
         # WebSocket 연결 허용
         await self.accept()
 
-        # Redis 구독 설정
-        self.redis = await aioredis.from_url("redis://redis:6379")
-        self.pubsub = self.redis.pubsub()
-        await self.pubsub.subscribe(self.room_group_name)
+        # Redis 구독: 워커 프로세스가 공유하는 멀티플렉서 큐에 등록 (소켓마다 Redis 연결을 열지 않음)
+        self.stream_queue = get_mail_stream_multiplexer().subscribe(self.room_group_name)
 
         # Redis 메시지 수신 태스크 실행
         self.listener_task = asyncio.create_task(self.redis_listener())
 
     async def disconnect(self, close_code):
         # 연결 해제 시 자원 정리
+        if getattr(self, "suggest_task", None):
+            self.suggest_task.cancel()
         if hasattr(self, "listener_task"):
             self.listener_task.cancel()
-        if hasattr(self, "pubsub"):
-            await self.pubsub.unsubscribe(self.room_group_name)
-        if hasattr(self, "redis"):
-            await self.redis.close()
+        if hasattr(self, "stream_queue"):
+            get_mail_stream_multiplexer().unsubscribe(self.room_group_name, self.stream_queue)
 
     async def receive(self, text_data):
         """
         프론트엔드에서 GPU 요청 전송 시 호출됨.
         Django는 이 요청을 GPU 서버에 중계함.
+
+        중계는 별도 태스크로 돌려 receive가 바로 반환되게 하고,
+        새 키 입력이 오면 아직 끝나지 않은 이전 제안 요청은 의미가 없으므로 취소한다.
+        (debounce 대기 중에 취소되면 GPU 요청 자체가 나가지 않음)
         """
         data = json.loads(text_data)
+
+        self.seq += 1
+        if self.suggest_task and not self.suggest_task.done():
+            self.suggest_task.cancel()
+        self.suggest_task = asyncio.create_task(self.suggest(data, self.seq))
+
+    async def suggest(self, data, seq):
         # json should include: to_emails, body
+        await asyncio.sleep(AUTOCOMPLETE_DEBOUNCE_SECONDS)
         user = self.user
 
         to_emails = data.get("to_emails", [])  # 보내는 사람들 = list[str]
@@ -95,19 +116,19 @@ class MailGenerateConsumer(AsyncWebsocketConsumer):
 
         try:
             print("[DEBUG] Sending GPU request:", settings.GPU_SERVER_BASEURL + "predict")
-            # GPU 서버로 직접 REST POST
-            response = requests.post(
-                settings.GPU_SERVER_BASEURL + "predict",
-                json={
+            # 공유 커넥션 풀로 GPU 서버에 비동기 POST (응답 대기 중에도 다른 소켓은 계속 처리됨)
+            result = await request_prediction(
+                self.user.id,
+                {
                     "user_id": self.user.id,
                     "system_prompt": system_prompt,
                     "user_input": data.get("text"),
                     "max_tokens": 30,  # fixed value
+                    "session_id": self.session_id,
+                    "seq": seq,
                 },
-                timeout=5,  # GPU 서버 응답 지연 시 타임아웃 방지
             )
-            response.raise_for_status()
-            print("[DEBUG] GPU Response:", response.status_code, response.text)
+            print("[DEBUG] GPU Response:", result)
         except Exception as e:
             # GPU 서버 요청 실패 시 프론트로 에러 메시지 전달
             print("[ERROR] GPU Request Failed:", e)
@@ -116,13 +137,24 @@ class MailGenerateConsumer(AsyncWebsocketConsumer):
     async def redis_listener(self):
         """
         Redis Pub/Sub을 통해 GPU 서버에서 보내는 토큰 스트림을 수신하고,
-        클라이언트(WebSocket)으로 전달함.
+        클라이언트(WebSocket)으로 전달함. (멀티플렉서가 이 소켓 큐에 넣어준 메시지를 소비)
+        """
+        while True:
+            data = await self.stream_queue.get()
+            try:
+                event = json.loads(data)
+            except json.JSONDecodeError:
+                # 혹시 malformed JSON이 오면 무시
+                continue
+            if self.is_superseded(event):
+                continue
+            await self.send(text_data=json.dumps(event))
+
+    def is_superseded(self, event) -> bool:
+        """
+        같은 유저 채널을 공유하는 다른 소켓(탭)의 결과이거나, 이 소켓의 더 새 키 입력으로 대체된 요청의 결과인지.
+        session/seq 가 없는 메시지는 그대로 전달한다.
         """
-        async for message in self.pubsub.listen():
-            if message["type"] == "message":
-                try:
-                    event = json.loads(message["data"])
-                    await self.send(text_data=json.dumps(event))
-                except json.JSONDecodeError:
-                    # 혹시 malformed JSON이 오면 무시
-                    continue
+        if not isinstance(event, dict) or "session" not in event:
+            return False
+        return event["session"] != self.session_id or event.get("seq", self.seq) < self.seq
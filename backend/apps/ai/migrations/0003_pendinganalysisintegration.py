@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_pending_integrations(apps, schema_editor):
+    # 배포 시점의 모든 쌍을 한 번 dirty 로 표시 (새 분석이 없는 쌍은 첫 drain 에서 LLM 호출 없이 빠진다)
+    MailAnalysisResult = apps.get_model("ai", "MailAnalysisResult")
+    PendingAnalysisIntegration = apps.get_model("ai", "PendingAnalysisIntegration")
+
+    pending = [
+        PendingAnalysisIntegration(user_id=user_id, contact_id=contact_id)
+        for user_id, contact_id in MailAnalysisResult.objects.values_list("user_id", "contact_id").distinct()
+    ]
+    pending += [
+        PendingAnalysisIntegration(user_id=user_id, group_id=group_id)
+        for user_id, group_id in MailAnalysisResult.objects.filter(contact__group__isnull=False)
+        .values_list("user_id", "contact__group_id")
+        .distinct()
+    ]
+    PendingAnalysisIntegration.objects.bulk_create(pending, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0002_remove_contactanalysisresult_figurative_usage_and_more"),
+        ("contact", "0006_group_background_color_group_emoji"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingAnalysisIntegration",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("updated_at", models.DateTimeField(auto_now=True, db_index=True)),
+                (
+                    "contact",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_analysis_integration",
+                        to="contact.contact",
+                    ),
+                ),
+                (
+                    "group",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_analysis_integration",
+                        to="contact.group",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="pending_analysis_integration", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("contact__isnull", False)), fields=("user", "contact"), name="uniq_pending_integration_contact"
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("group__isnull", False)), fields=("user", "group"), name="uniq_pending_integration_group"
+                    ),
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            models.Q(("contact__isnull", False), ("group__isnull", True)),
+                            models.Q(("contact__isnull", True), ("group__isnull", False)),
+                            _connector="OR",
+                        ),
+                        name="pending_integration_contact_xor_group",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(seed_pending_integrations, migrations.RunPython.noop),
+    ]
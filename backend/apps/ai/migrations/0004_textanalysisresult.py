@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:00
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0003_pendinganalysisintegration"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalysisDedupDailyStat",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date", models.DateField(unique=True)),
+                ("llm_calls", models.PositiveIntegerField(default=0)),
+                ("reused", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TextAnalysisResult",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("updated_at", models.DateTimeField(auto_now=True, db_index=True)),
+                ("content_hash", models.CharField(max_length=64)),
+                ("lexical_style", models.JSONField()),
+                ("grammar_patterns", models.JSONField()),
+                ("emotional_tone", models.JSONField()),
+                ("representative_sentences", django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), default=list, size=None)),
+                (
+                    "user",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="text_analysis_result", to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="mailanalysisresult",
+            name="text_analysis",
+            field=models.ForeignKey(
+                blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="mail_analysis_result", to="ai.textanalysisresult"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="textanalysisresult",
+            constraint=models.UniqueConstraint(fields=("user", "content_hash"), name="uniq_text_analysis_user_hash"),
+        ),
+    ]
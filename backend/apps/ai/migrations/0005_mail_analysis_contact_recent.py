@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:02
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # 큰 테이블에서 쓰기를 막지 않도록 CONCURRENTLY 로 생성 (트랜잭션 밖에서 실행)
+    atomic = False
+
+    dependencies = [
+        ("ai", "0004_textanalysisresult"),
+        ("contact", "0006_group_background_color_group_emoji"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="mailanalysisresult",
+            index=models.Index(fields=["contact", "-created_at", "-id"], name="mail_analysis_contact_recent"),
+        ),
+    ]
@@ -6,6 +6,34 @@ from apps.core.models import TimeStampedModel
 from apps.user.models import User
 
 
+class TextAnalysisResult(TimeStampedModel):
+    # (정규화된 제목 + 본문) 해시 단위로 말투 분석 결과를 한 번만 저장하는 모델
+    # 같은 메일이 여러 연락처로 backfill 되거나 다시 보내져도 LLM 분석은 한 번만 하고, 여러 MailAnalysisResult 가 이 행을 가리킨다
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="text_analysis_result",
+    )
+    content_hash = models.CharField(max_length=64)
+
+    lexical_style = models.JSONField()
+    grammar_patterns = models.JSONField()
+    emotional_tone = models.JSONField()
+    representative_sentences = ArrayField(base_field=models.TextField(), default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "content_hash"], name="uniq_text_analysis_user_hash"),
+        ]
+
+
+class AnalysisDedupDailyStat(models.Model):
+    # 하루 단위 말투 분석 LLM 호출 수 / 저장된 분석 재사용(= 아낀 LLM 호출) 수
+    date = models.DateField(unique=True)
+    llm_calls = models.PositiveIntegerField(default=0)
+    reused = models.PositiveIntegerField(default=0)
+
+
 class MailAnalysisResult(TimeStampedModel):
     # 메일마다 분석 결과를 저장하는 모델
     user = models.ForeignKey(
@@ -20,12 +48,26 @@ class MailAnalysisResult(TimeStampedModel):
         related_name="mail_anaylsis_result",
         db_index=True,
     )
+    # 이 행의 분석을 만든 TextAnalysisResult (같은 메일이 같은 연락처에 두 번 저장되지 않도록 확인할 때 사용)
+    text_analysis = models.ForeignKey(
+        TextAnalysisResult,
+        on_delete=models.SET_NULL,
+        related_name="mail_analysis_result",
+        null=True,
+        blank=True,
+    )
 
     lexical_style = models.JSONField()
     grammar_patterns = models.JSONField()
     emotional_tone = models.JSONField()
     representative_sentences = ArrayField(base_field=models.TextField(), default=list)
 
+    class Meta:
+        indexes = [
+            # delete_up_n 의 contact 별 최신순 ROW_NUMBER() 용
+            models.Index(fields=["contact", "-created_at", "-id"], name="mail_analysis_contact_recent"),
+        ]
+
 
 class ContactAnalysisResult(TimeStampedModel):
     # contact 단위로 통합된 분석 결과를 저장하는 모델
@@ -71,3 +113,79 @@ class GroupAnalysisResult(TimeStampedModel):
     grammar_patterns = models.JSONField()
     emotional_tone = models.JSONField()
     representative_sentences = ArrayField(base_field=models.TextField(), default=list)
+
+
+class PendingAnalysisIntegration(TimeStampedModel):
+    # 새 MailAnalysisResult 가 생겨 다시 통합해야 하는 (user, contact) 또는 (user, group) 키 (dirty set)
+    # unified_analysis 가 꺼내 가며 지우므로, 새 분석이 없는 쌍은 통합 작업에서 아무 비용도 들지 않는다
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="pending_analysis_integration",
+    )
+    contact = models.ForeignKey(
+        Contact,
+        on_delete=models.CASCADE,
+        related_name="pending_analysis_integration",
+        null=True,
+        blank=True,
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name="pending_analysis_integration",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "contact"], condition=models.Q(contact__isnull=False), name="uniq_pending_integration_contact"),
+            models.UniqueConstraint(fields=["user", "group"], condition=models.Q(group__isnull=False), name="uniq_pending_integration_group"),
+            models.CheckConstraint(
+                condition=models.Q(contact__isnull=False, group__isnull=True) | models.Q(contact__isnull=True, group__isnull=False),
+                name="pending_integration_contact_xor_group",
+            ),
+        ]
+
+
+class PendingContactBackfill(TimeStampedModel):
+    # 새로 추가되어 보낸 메일 말투 분석(backfill)을 기다리는 연락처
+    # 연락처마다 바로 Gmail/LLM 을 부르지 않고 모아 두었다가 backfill_mail_analysis 가 사용자 단위로 한 번에 처리한다
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="pending_contact_backfill",
+    )
+    contact = models.ForeignKey(
+        Contact,
+        on_delete=models.CASCADE,
+        related_name="pending_contact_backfill",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "contact"], name="uniq_pending_contact_backfill"),
+        ]
+
+
+class MailAnalysisBackfill(TimeStampedModel):
+    # backfill_mail_analysis 한 번의 실행과 진행 상황 (클라이언트가 연락처 가져오기 진행률을 볼 때 사용)
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="mail_analysis_backfill",
+    )
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.RUNNING)
+    contacts = models.PositiveIntegerField(default=0)
+    # 찾은 (중복 제거된) 메일 수 / LLM 으로 분석 / 저장된 분석 재사용 / 분석 실패
+    messages = models.PositiveIntegerField(default=0)
+    analyzed = models.PositiveIntegerField(default=0)
+    reused = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
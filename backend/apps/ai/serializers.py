@@ -3,6 +3,7 @@ import os
 from rest_framework import serializers
 
 from apps.ai.constants import MAX_FILE_SIZE_MB, SUPPORTED_FILE_TYPES
+from apps.ai.models import MailAnalysisBackfill
 
 
 class MailGenerateRequest(serializers.Serializer):
@@ -134,3 +135,14 @@ class MailSuggestRequest(serializers.Serializer):
 class MailSuggestResponseSerializer(serializers.Serializer):
     target = serializers.ChoiceField(choices=["subject", "body"])
     suggestion = serializers.CharField(help_text="이어쓰기/자동완성 제안 텍스트")
+
+
+class MailAnalysisBackfillSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MailAnalysisBackfill
+        fields = ["id", "status", "contacts", "messages", "analyzed", "reused", "failed", "created_at", "updated_at", "finished_at"]
+
+
+class MailAnalysisBackfillProgressSerializer(serializers.Serializer):
+    pending_contacts = serializers.IntegerField(help_text="아직 backfill 을 시작하지 않은 연락처 수")
+    latest = MailAnalysisBackfillSerializer(allow_null=True, help_text="가장 최근 backfill 실행 (없으면 null)")
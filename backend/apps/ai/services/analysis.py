@@ -16,8 +16,26 @@ def analyze_speech_llm(
     return analysis_result
 
 
+def analyze_speech_llm_batch(texts: list[tuple[str | None, str | None]], max_concurrency: int):
+    # (subject, body) 여러 개를 병렬(최대 max_concurrency)로 분석. 실패한 항목은 예외 객체로 돌려준다.
+    return analysis_chain.batch(
+        [{"incoming_subject": subject, "incoming_body": body} for subject, body in texts],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True,
+    )
+
+
 def integrate_analysis(analysis_results: list[dict[str, Any]]):
     integrated_result = integrate_chain.invoke({"analysis_results": analysis_results})
     # 하나의 통합된 AnalysisResult를 반환한다.
 
     return integrated_result
+
+
+def integrate_analysis_batch(analysis_result_lists: list[list[dict[str, Any]]], max_concurrency: int):
+    # 여러 키의 통합을 병렬(최대 max_concurrency)로 수행. 실패한 항목은 예외 객체로 돌려준다.
+    return integrate_chain.batch(
+        [{"analysis_results": results} for results in analysis_result_lists],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True,
+    )
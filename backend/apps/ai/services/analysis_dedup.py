@@ -0,0 +1,135 @@
+"""
+말투 분석 중복 제거 (내용 주소 기반 저장소).
+
+- 같은 본문이 여러 번 분석되는 경우: 같은 SENT 메일이 여러 연락처로 backfill 되거나, 같은 메일을 다시 보낸 경우
+- (user, 정규화된 제목 + 본문의 sha256) 으로 TextAnalysisResult 를 찾고, 없을 때만 analyze_speech_llm 을 호출해 저장한다
+- 하루 단위로 LLM 호출 수와 재사용 수(= 아낀 호출 수)를 AnalysisDedupDailyStat 에 세고, report_analysis_dedup 가 로그로 남긴다
+"""
+
+import hashlib
+import re
+import unicodedata
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.ai.models import AnalysisDedupDailyStat, ContactAnalysisResult, GroupAnalysisResult, MailAnalysisResult, TextAnalysisResult
+from apps.ai.services.analysis_integration import ANALYSIS_FIELDS, mark_analysis_dirty
+from apps.ai.services.context_cache import bump_prompt_context_version
+
+# 분석 프롬프트/스키마가 바뀌면 올려서 이전 분석을 재사용하지 않게 한다
+ANALYSIS_DEDUP_VERSION = 1
+# 이보다 오래된 저장소 행은 정리 (재전송/backfill 은 보통 며칠 안에 일어남)
+ANALYSIS_DEDUP_TTL_DAYS = 30
+
+_TRAILING_SPACE_RX = re.compile(r"[ \t]+\n")
+_BLANK_LINES_RX = re.compile(r"\n{3,}")
+
+
+def normalize_mail_text(text: str | None) -> str:
+    # 말투에 영향을 주지 않는 차이(유니코드 조합, 줄바꿈 종류, 줄 끝 공백, 빈 줄 개수)만 없앤다. 대소문자/문장부호는 그대로
+    text = unicodedata.normalize("NFC", text or "").replace("\r\n", "\n").replace("\r", "\n")
+    text = _TRAILING_SPACE_RX.sub("\n", text)
+    return _BLANK_LINES_RX.sub("\n\n", text).strip()
+
+
+def content_hash(subject: str | None, body: str | None) -> str:
+    raw = f"v{ANALYSIS_DEDUP_VERSION}\x00{normalize_mail_text(subject)}\x00{normalize_mail_text(body)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def record_dedup_stat(llm_calls: int = 0, reused: int = 0) -> None:
+    today = timezone.localdate()
+    increments = {"llm_calls": F("llm_calls") + llm_calls, "reused": F("reused") + reused}
+    if AnalysisDedupDailyStat.objects.filter(date=today).update(**increments):
+        return
+    _, created = AnalysisDedupDailyStat.objects.get_or_create(date=today, defaults={"llm_calls": llm_calls, "reused": reused})
+    if not created:
+        AnalysisDedupDailyStat.objects.filter(date=today).update(**increments)
+
+
+def find_text_analyses(user_id: int, digests) -> dict[str, TextAnalysisResult]:
+    return {t.content_hash: t for t in TextAnalysisResult.objects.filter(user_id=user_id, content_hash__in=set(digests))}
+
+
+def save_text_analysis(user_id: int, digest: str, analysis: dict) -> TextAnalysisResult:
+    fields = {field: analysis[field] for field in ANALYSIS_FIELDS}
+    try:
+        with transaction.atomic():
+            return TextAnalysisResult.objects.create(user_id=user_id, content_hash=digest, **fields)
+    except IntegrityError:
+        # 같은 본문을 동시에 분석한 다른 task 가 먼저 저장함
+        return TextAnalysisResult.objects.get(user_id=user_id, content_hash=digest)
+
+
+def link_text_analysis(user_id: int, contacts: list, text_analysis: TextAnalysisResult) -> int:
+    """
+    분석 결과를 받는 사람(연락처)들의 MailAnalysisResult 로 저장하고, 만든 행 수를 돌려준다.
+    contacts 는 id / group_id 만 있으면 된다. 받는 사람 수와 관계없이 쿼리 수가 일정하다.
+    """
+    analysis_result = {field: getattr(text_analysis, field) for field in ANALYSIS_FIELDS}
+
+    # 같은 메일이 이미 저장된 연락처(재전송, 중복 backfill)는 건너뛴다
+    linked = set(MailAnalysisResult.objects.filter(text_analysis=text_analysis, contact__in=contacts).values_list("contact_id", flat=True))
+    contacts = [contact for contact in contacts if contact.id not in linked]
+    if not contacts:
+        return 0
+
+    contact_ids = [contact.id for contact in contacts]
+    group_ids = {contact.group_id for contact in contacts if contact.group_id is not None}
+
+    with transaction.atomic():
+        results = MailAnalysisResult.objects.bulk_create(
+            [MailAnalysisResult(user_id=user_id, contact_id=contact_id, text_analysis=text_analysis, **analysis_result) for contact_id in contact_ids]
+        )
+        latest_by_contact = {result.contact_id: result.id for result in results}
+        latest_by_group = {}
+        for contact in contacts:
+            if contact.group_id is not None:
+                latest_by_group[contact.group_id] = max(latest_by_group.get(contact.group_id, 0), latest_by_contact[contact.id])
+
+        # 해당 (user, contact)에 해당하는 ContactAnalysisResult이 없다면 방금 분석된 결과를 필드에 그대로 넣어줌
+        existing_contacts = set(
+            ContactAnalysisResult.objects.filter(user_id=user_id, contact_id__in=contact_ids).values_list("contact_id", flat=True)
+        )
+        ContactAnalysisResult.objects.bulk_create(
+            [
+                ContactAnalysisResult(user_id=user_id, contact_id=contact_id, last_analysis_id=latest_by_contact[contact_id], **analysis_result)
+                for contact_id in contact_ids
+                if contact_id not in existing_contacts
+            ]
+        )
+
+        # 해당 (user, contact.group)에 해당하는 GroupAnalysisResult이 없다면 방금 분석된 결과를 필드에 그대로 넣어줌
+        existing_groups = set(GroupAnalysisResult.objects.filter(user_id=user_id, group_id__in=group_ids).values_list("group_id", flat=True))
+        GroupAnalysisResult.objects.bulk_create(
+            [
+                GroupAnalysisResult(user_id=user_id, group_id=group_id, last_analysis_id=last_id, **analysis_result)
+                for group_id, last_id in latest_by_group.items()
+                if group_id not in existing_groups
+            ]
+        )
+
+        # bulk_create 는 post_save signal 을 보내지 않으므로 프롬프트 컨텍스트 캐시를 직접 무효화.
+        # commit 전에 바꾸면 다른 요청이 아직 안 보이는 데이터로 새 버전 캐시를 채울 수 있으므로 commit 후에
+        transaction.on_commit(lambda: bump_prompt_context_version(user_id))
+
+        # 통합 결과에 새 분석을 접어 넣도록 unified_analysis 대상에 추가
+        mark_analysis_dirty(user_id, contact_ids=contact_ids, group_ids=group_ids)
+    return len(contact_ids)
+
+
+def dedup_report(days: int = 7) -> list[dict]:
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return [
+        {"date": stat.date, "llm_calls": stat.llm_calls, "reused": stat.reused}
+        for stat in AnalysisDedupDailyStat.objects.filter(date__gte=since).order_by("date")
+    ]
+
+
+def purge_text_analyses(ttl_days: int = ANALYSIS_DEDUP_TTL_DAYS) -> int:
+    cutoff = timezone.now() - timedelta(days=ttl_days)
+    deleted, _ = TextAnalysisResult.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
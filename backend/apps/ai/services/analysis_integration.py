@@ -0,0 +1,103 @@
+"""
+스타일 분석 통합 (변경 기반).
+
+- MailAnalysisResult 를 만드는 쪽이 mark_analysis_dirty() 로 (user, contact) / (user, group) 키를 PendingAnalysisIntegration 에 넣는다
+- integrate_pending_analyses() 는 그 키들만 꺼내서, 새 분석(id > last_analysis_id)을 기존 통합 결과에 접어 넣는다
+  (기존 통합 결과 1개 + 최근 새 분석 최대 n-1개 → integrate_chain). 전체 쌍을 훑지 않으므로 새 분석이 없는 쌍은 비용이 없다
+- LLM 호출은 integrate_chain.batch 로 최대 INTEGRATION_MAX_CONCURRENCY 개씩 병렬
+- 꺼낸 키는 통합 결과를 저장한 뒤에야 처리된 것으로 본다. 실패했거나 예외로 중단되어 저장하지 못한 키는
+  실행이 끝날 때(finally) 다시 dirty 로 넣어 다음 실행에서 재시도한다
+"""
+
+from django.db import transaction
+
+from apps.ai.models import ContactAnalysisResult, GroupAnalysisResult, MailAnalysisResult, PendingAnalysisIntegration
+from apps.ai.services.analysis import integrate_analysis_batch
+
+INTEGRATION_MAX_CONCURRENCY = 4
+# 한 번에 꺼내 오는 dirty 키 수 (= 한 번의 batch 호출 크기 상한)
+INTEGRATION_CLAIM_SIZE = 50
+
+ANALYSIS_FIELDS = ("lexical_style", "grammar_patterns", "emotional_tone", "representative_sentences")
+
+
+def mark_analysis_dirty(user_id: int, contact_ids=(), group_ids=()) -> None:
+    pending = [PendingAnalysisIntegration(user_id=user_id, contact_id=contact_id) for contact_id in set(contact_ids)]
+    pending += [PendingAnalysisIntegration(user_id=user_id, group_id=group_id) for group_id in set(group_ids) if group_id is not None]
+    if pending:
+        PendingAnalysisIntegration.objects.bulk_create(pending, ignore_conflicts=True)
+
+
+def _claim(limit: int) -> list[PendingAnalysisIntegration]:
+    # 동시에 도는 다른 worker 와 겹치지 않게 잠긴 행은 건너뛰고, 꺼낸 키는 바로 지운다
+    # (처리 중에 새 분석이 들어오면 키가 다시 생겨 다음 실행에서 처리됨)
+    with transaction.atomic():
+        claimed = list(PendingAnalysisIntegration.objects.select_for_update(skip_locked=True).order_by("id")[:limit])
+        if claimed:
+            PendingAnalysisIntegration.objects.filter(id__in=[p.id for p in claimed]).delete()
+    return claimed
+
+
+def _as_dict(obj) -> dict:
+    return {field: getattr(obj, field) for field in ANALYSIS_FIELDS}
+
+
+def _prepare(key: PendingAnalysisIntegration, n: int):
+    if key.contact_id is not None:
+        aggregate = ContactAnalysisResult.objects.filter(user_id=key.user_id, contact_id=key.contact_id).first()
+        rows = MailAnalysisResult.objects.filter(user_id=key.user_id, contact_id=key.contact_id)
+        if aggregate is None:
+            aggregate = ContactAnalysisResult(user_id=key.user_id, contact_id=key.contact_id)
+    else:
+        aggregate = GroupAnalysisResult.objects.filter(user_id=key.user_id, group_id=key.group_id).first()
+        rows = MailAnalysisResult.objects.filter(user_id=key.user_id, contact__group_id=key.group_id)
+        if aggregate is None:
+            aggregate = GroupAnalysisResult(user_id=key.user_id, group_id=key.group_id)
+
+    folded = aggregate.pk is not None and aggregate.last_analysis_id is not None
+    if folded:
+        rows = rows.filter(id__gt=aggregate.last_analysis_id)
+    new_rows = list(rows.order_by("-id")[: n - 1 if folded else n])
+    if not new_rows:
+        return None  # 이미 최신 (또는 분석이 보존 기간에서 지워짐)
+
+    data = ([_as_dict(aggregate)] if folded else []) + [_as_dict(r) for r in new_rows]
+    return aggregate, new_rows[0].id, data
+
+
+def integrate_pending_analyses(n: int = 10, claim_size: int = INTEGRATION_CLAIM_SIZE) -> int:
+    """dirty 키를 모두 꺼내 통합하고, 갱신한 통합 결과 수를 돌려준다."""
+    integrated = 0
+    # 꺼냈지만 아직 통합 결과를 저장하지 못한 키 (실패 + 예외로 중단된 나머지). 끝날 때 다시 dirty 로 넣는다
+    unfinished: dict[int, PendingAnalysisIntegration] = {}
+
+    try:
+        while claimed := _claim(claim_size):
+            unfinished.update((key.id, key) for key in claimed)
+
+            jobs = []
+            for key in claimed:
+                job = _prepare(key, n)
+                if job is None:
+                    unfinished.pop(key.id)
+                else:
+                    jobs.append((key, job))
+            if not jobs:
+                continue
+
+            results = integrate_analysis_batch([data for _, (_, _, data) in jobs], max_concurrency=INTEGRATION_MAX_CONCURRENCY)
+            for (key, (aggregate, latest_id, _)), result in zip(jobs, results, strict=True):
+                if isinstance(result, Exception):
+                    # 루프 안에서 다시 넣으면 곧바로 다시 꺼내지므로 끝날 때까지 unfinished 에 둔다
+                    continue
+                unified = result.model_dump()
+                for field in ANALYSIS_FIELDS:
+                    setattr(aggregate, field, unified[field])
+                aggregate.last_analysis_id = latest_id
+                aggregate.save()
+                unfinished.pop(key.id)
+                integrated += 1
+    finally:
+        for key in unfinished.values():
+            mark_analysis_dirty(key.user_id, contact_ids=[key.contact_id] if key.contact_id else (), group_ids=[key.group_id])
+    return integrated
@@ -0,0 +1,123 @@
+"""
+생성된 메일 본문 검증 (body 스트리밍과 나란히 도는 파이프라인 단계).
+
+- 싼 로컬 검사(빈 본문, PII placeholder 손상, 요청 언어와 다른 본문)를 스트리밍 중 단락이 끝날 때마다 돌린다
+- 끝까지 로컬 검사를 통과하면 LLM validator는 부르지 않는다 → 대부분의 요청은 body.done 뒤 추가 LLM 왕복 없이 done
+- 로컬 검사가 처음 실패한 순간, 그때까지의 본문으로 LLM validator를 같은 이벤트 루프의 태스크로 시작해 남은 스트리밍과 겹치게 한다
+  (스트림이 끝나면 결과만 받아 로컬 지시와 합쳐 재작성 지시로 쓴다)
+"""
+
+import asyncio
+import re
+
+from apps.ai.services.pii_masker import PLACEHOLDER_RX, unmask_once
+
+BODY_JUDGE_TIMEOUT_SECONDS = 30
+# 언어 판정에 필요한 최소 글자 수 (짧은 인사말만으로는 판단하지 않음)
+LANGUAGE_CHECK_MIN_LETTERS = 20
+
+_KOREAN = {"ko", "ko-kr", "kor", "korean", "한국어"}
+_ENGLISH = {"en", "en-us", "en-gb", "eng", "english", "영어"}
+_HANGUL_RX = re.compile(r"[가-힣]")
+_LATIN_RX = re.compile(r"[A-Za-z]")
+
+
+def _placeholder_violation(text: str, req_id: str, mapping: dict[int, str]) -> str | None:
+    valid = 0
+    for m in PLACEHOLDER_RX.finditer(text):
+        if unmask_once(m.group(0), req_id, mapping) == m.group(0):
+            break
+        valid += 1
+    else:
+        if text.count("PII:") == valid:
+            return None
+    return "Some PII placeholders were altered or invented. Copy every {{PII:...}} placeholder exactly as given and do not create new ones."
+
+
+def _language_violation(text: str, language: str | None) -> str | None:
+    lang = (language or "").strip().lower()
+    if lang not in _KOREAN and lang not in _ENGLISH:
+        return None  # 자유 입력 언어 설정은 LLM validator 몫
+
+    text = PLACEHOLDER_RX.sub("", text)
+    hangul = len(_HANGUL_RX.findall(text))
+    latin = len(_LATIN_RX.findall(text))
+    if hangul + latin < LANGUAGE_CHECK_MIN_LETTERS:
+        return None
+    if lang in _KOREAN and hangul < latin:
+        return "Write the whole body in Korean."
+    if lang in _ENGLISH and latin < hangul:
+        return "Write the whole body in English."
+    return None
+
+
+class BodyValidation:
+    """
+    feed()로 마스킹된 본문 청크를 받고, await finish()가 재작성 지시(통과면 None)를 돌려준다.
+    judge는 validator_chain 과 같은 인터페이스(ainvoke({"subject", "body", "constraints"}) -> ValidationResult).
+    이벤트 루프 안(async 스트림)에서만 사용한다.
+    """
+
+    def __init__(self, subject: str, constraints: dict, req_id: str, mapping: dict[int, str], judge):
+        self.subject = subject
+        self.constraints = constraints
+        self.req_id = req_id
+        self.mapping = mapping
+        self.judge = judge
+        self.violations: list[str] = []
+        self.judge_task: asyncio.Task | None = None
+        self._chunks: list[str] = []
+        self._buf = ""  # 아직 검사하지 않은 (끝나지 않은) 단락
+
+    @property
+    def body(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> None:
+        self._chunks.append(chunk)
+        self._buf += chunk
+        if "\n\n" not in self._buf:
+            return
+        done, self._buf = self._buf.rsplit("\n\n", 1)
+        self._check(done)
+
+    async def finish(self) -> str | None:
+        self._check(self._buf)
+        self._buf = ""
+        if not self.body.strip():
+            self._add("The body is empty. Write the full email body.")
+
+        if not self.violations:
+            return None
+
+        instructions = list(self.violations)
+        if self.judge_task is not None:
+            try:
+                judge = await asyncio.wait_for(self.judge_task, BODY_JUDGE_TIMEOUT_SECONDS)
+            except Exception:
+                judge = None
+            if judge is not None and not judge.passed and judge.rewrite_instructions:
+                instructions.append(judge.rewrite_instructions)
+        return "\n".join(instructions)
+
+    def _check(self, text: str) -> None:
+        for violation in (
+            _placeholder_violation(text, self.req_id, self.mapping),
+            _language_violation(self.body, self.constraints.get("language")),
+        ):
+            if violation:
+                self._add(violation)
+
+    def _add(self, violation: str) -> None:
+        if violation in self.violations:
+            return
+        self.violations.append(violation)
+        if self.judge_task is None:
+            # 처음 문제를 발견한 시점의 본문으로 LLM 판정을 미리 시작 (남은 스트리밍과 겹침)
+            payload = {"subject": self.subject, "body": self.body, "constraints": self.constraints}
+            self.judge_task = asyncio.ensure_future(self.judge.ainvoke(payload))
+
+    def cancel(self) -> None:
+        # 클라이언트가 끊겨 finish()까지 가지 못한 경우 진행 중인 판정을 정리
+        if self.judge_task is not None and not self.judge_task.done():
+            self.judge_task.cancel()
@@ -0,0 +1,57 @@
+"""
+collect_prompt_context 결과 캐시.
+
+- 유저별 버전 토큰(prompt_ctx_version:{user_id})을 키에 섞어서, 관련 모델이 바뀌면 버전만 바꿔 전체를 무효화한다
+  (개별 엔트리를 찾아 지울 필요 없음, 이전 버전 엔트리는 TTL로 자연 만료)
+- 버전은 단조 증가 숫자가 아니라 랜덤 토큰이라 버전 키가 evict 되어도 예전 엔트리가 되살아나지 않는다
+- 무효화는 apps.ai.signals 에서, signal이 없는 bulk 작업은 호출부에서 bump_prompt_context_version() 을 직접 부른다
+"""
+
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+PROMPT_CONTEXT_VERSION_KEY = "prompt_ctx_version:{user_id}"
+PROMPT_CONTEXT_ENTRY_KEY = "prompt_ctx:{user_id}:{version}:{digest}"
+# signal이 닿지 않는 변경(queryset.update 등)에 대한 안전망
+PROMPT_CONTEXT_TTL_SECONDS = 10 * 60
+
+
+def _version(user_id: int) -> str:
+    key = PROMPT_CONTEXT_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def prompt_context_key(user_id: int, to_emails: list[str], **flags) -> str:
+    # 수신자 순서는 결과에 영향이 없으므로(라벨은 호출부에서 다시 붙임) 정렬해서 키를 공유한다
+    raw = json.dumps([sorted(to_emails), sorted(flags.items())], ensure_ascii=False)
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return PROMPT_CONTEXT_ENTRY_KEY.format(user_id=user_id, version=_version(user_id), digest=digest)
+
+
+def get_cached_prompt_context(key: str):
+    return cache.get(key)
+
+
+def set_cached_prompt_context(key: str, value) -> None:
+    cache.set(key, value, timeout=PROMPT_CONTEXT_TTL_SECONDS)
+
+
+def bump_prompt_context_version(user_id: int | None) -> None:
+    """Invalidate every cached prompt context of user_id (now, and again once the transaction commits)."""
+    if user_id is None:
+        return
+
+    def _bump():
+        cache.set(PROMPT_CONTEXT_VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex, timeout=None)
+
+    _bump()
+    # commit 전에 다른 요청이 옛 데이터로 새 버전 캐시를 채웠을 수 있으므로 commit 후 한 번 더
+    transaction.on_commit(_bump)
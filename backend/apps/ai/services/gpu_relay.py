@@ -0,0 +1,56 @@
+"""
+GPU 서버(/predict) 비동기 중계.
+
+- 이벤트 루프당 하나의 httpx.AsyncClient(keep-alive 커넥션 풀)를 공유한다
+  (요청마다 TCP/TLS 연결을 새로 맺지 않고, 블로킹 requests 호출로 Daphne 워커 전체가 멈추지 않도록)
+- 유저별 동시 요청 수를 Semaphore로 제한해 한 유저의 여러 탭/소켓이 GPU 서버를 독점하지 않게 한다
+"""
+
+import asyncio
+import weakref
+
+import httpx
+from django.conf import settings
+
+GPU_RELAY_TIMEOUT_SECONDS = 5
+GPU_RELAY_MAX_CONNECTIONS = 100
+GPU_RELAY_MAX_KEEPALIVE = 20
+GPU_RELAY_PER_USER_CONCURRENCY = 2
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+# 해당 유저의 소켓이 하나라도 살아 있는 동안만 유지 (consumer가 강한 참조를 들고 있음)
+_user_semaphores: "weakref.WeakValueDictionary[int, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+
+def _client() -> httpx.AsyncClient:
+    # AsyncClient는 생성된 이벤트 루프에 묶이므로 루프별로 하나씩 둔다 (Daphne 워커는 루프 1개)
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=GPU_RELAY_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=GPU_RELAY_MAX_CONNECTIONS, max_keepalive_connections=GPU_RELAY_MAX_KEEPALIVE),
+        )
+        _clients[loop] = client
+    return client
+
+
+def user_semaphore(user_id: int) -> asyncio.Semaphore:
+    semaphore = _user_semaphores.get(user_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(GPU_RELAY_PER_USER_CONCURRENCY)
+        _user_semaphores[user_id] = semaphore
+    return semaphore
+
+
+async def request_prediction(user_id: int, payload: dict) -> dict:
+    """
+    POST payload to the GPU server's /predict without blocking the event loop.
+
+    Tokens themselves arrive later over Redis pub/sub; this only starts the job.
+    Raises httpx.HTTPError on timeout / non-2xx.
+    """
+    async with user_semaphore(user_id):
+        response = await _client().post(settings.GPU_SERVER_BASEURL + "predict", json=payload)
+        response.raise_for_status()
+        return response.json()
@@ -1,31 +1,51 @@
-from typing import Any
+from typing import Any, TypedDict
 
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, StateGraph
 
-from apps.ai.services.chains import subject_chain
+from apps.ai.services.chains import plan_chain, subject_chain
 from apps.ai.services.pii_masker import PiiMasker, make_req_id
-from apps.ai.services.utils import build_prompt_inputs, collect_prompt_context
-
-State = dict[str, Any]
-
-
-def build_context_node(state: State) -> State:
+from apps.ai.services.utils import acollect_prompt_context, build_prompt_inputs
+
+# build_context -> masking -> (subject | plan) -> body_prep
+#  - subject 와 plan 은 masked_inputs 에만 의존하므로 같은 superstep 에서 동시에 실행 (astream: 같은 이벤트 루프의 태스크)
+#  - LLM/ORM 노드는 async (ainvoke/astream), CPU 만 쓰는 masking/body_prep 은 sync 그대로 (LangGraph 가 executor 에서 실행)
+#  - plan 청크는 stream_mode="custom" 으로 바로 흘려보내서, subject LLM 호출이 끝나기 전에 plan.delta 를 보낼 수 있다
+#  - 병렬 노드가 같은 키를 쓰면 충돌하므로 노드는 자기가 만든 키만 반환한다
+
+
+class State(TypedDict, total=False):
+    user: Any
+    subject: str | None
+    body: str | None
+    to_emails: list[str]
+    attachments: list[dict] | None
+    raw_inputs: dict[str, Any]
+    req_id: str
+    masker: PiiMasker
+    masked_inputs: dict[str, Any]
+    mask_mapping: dict[str, str]
+    locked_title: str
+    plan_text: str
+    body_inputs: dict[str, Any]
+
+
+async def build_context_node(state: State) -> State:
     user = state["user"]
     to_emails = state["to_emails"]
     attachments = state.get("attachments")
-    ctx = collect_prompt_context(user, to_emails)
+    ctx = await acollect_prompt_context(user, to_emails)
     raw_inputs = build_prompt_inputs(
         ctx,
         extra={
             "attachments": attachments or [],
         },
     )
-    state["raw_inputs"] = raw_inputs
-    return state
+    return {"raw_inputs": raw_inputs}
 
 
 def masking_node(state: State) -> State:
-    raw_inputs = state["raw_inputs"]
+    raw_inputs = dict(state["raw_inputs"])
     raw_inputs["subject"] = state.get("subject") or ""
     raw_inputs["body"] = state.get("body") or ""
 
@@ -33,18 +53,31 @@ def masking_node(state: State) -> State:
     masker = PiiMasker(req_id)
     masked, mapping = masker.mask_inputs(raw_inputs)
 
-    state["req_id"] = req_id
-    state["masker"] = masker
-    state["masked_inputs"] = masked
-    state["mask_mapping"] = mapping
-    return state
+    return {
+        "raw_inputs": raw_inputs,
+        "req_id": req_id,
+        "masker": masker,
+        "masked_inputs": masked,
+        "mask_mapping": mapping,
+    }
 
 
-def subject_node(state: State) -> State:
+async def subject_node(state: State) -> State:
     masked_inputs = state["masked_inputs"]
-    locked_title = (subject_chain.invoke(masked_inputs) or "").strip()
-    state["locked_title"] = locked_title
-    return state
+    locked_title = ((await subject_chain.ainvoke(masked_inputs)) or "").strip()
+    return {"locked_title": locked_title}
+
+
+async def plan_node(state: State) -> State:
+    # 청크마다 {"plan_delta": ...} 를 custom 스트림으로 내보냄 (ainvoke 로 돌리면 writer 는 no-op)
+    write = get_stream_writer()
+    chunks: list[str] = []
+    async for ch in plan_chain.astream(state["masked_inputs"]):
+        if not ch:
+            continue
+        chunks.append(ch)
+        write({"plan_delta": ch})
+    return {"plan_text": "".join(chunks)}
 
 
 def body_prep_node(state: State) -> State:
@@ -68,8 +101,7 @@ def body_prep_node(state: State) -> State:
         "plan_text": plan_text,
         "profile": raw_inputs.get("profile"),
     }
-    state["body_inputs"] = locked_inputs
-    return state
+    return {"body_inputs": locked_inputs}
 
 
 # 그래프 구성
@@ -77,12 +109,15 @@ graph = StateGraph(State)
 graph.add_node("build_context", build_context_node)
 graph.add_node("masking", masking_node)
 graph.add_node("subject", subject_node)
+graph.add_node("plan", plan_node)
 graph.add_node("body_prep", body_prep_node)
 
 graph.set_entry_point("build_context")
 graph.add_edge("build_context", "masking")
+# fan-out: 두 LLM 호출을 동시에, fan-in: body_prep 은 둘 다 끝난 뒤 한 번만 실행
 graph.add_edge("masking", "subject")
-graph.add_edge("subject", "body_prep")
+graph.add_edge("masking", "plan")
+graph.add_edge(["subject", "plan"], "body_prep")
 graph.add_edge("body_prep", END)
 
 mail_graph = graph.compile()
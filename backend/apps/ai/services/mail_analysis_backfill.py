@@ -0,0 +1,158 @@
+"""
+보낸 메일 말투 분석 backfill (연락처 추가/가져오기).
+
+- 연락처가 추가되면 request_contact_backfill() 이 PendingContactBackfill 에 넣고, 사용자마다 BACKFILL_DEBOUNCE_SECONDS 에 한 번만
+  backfill_mail_analysis 를 예약한다 (연락처 수백 개를 가져와도 연락처마다 Gmail 검색 + 메일마다 LLM task 로 흩어지지 않음)
+- run_backfill() 은 대기 중인 연락처를 모두 꺼내 Gmail 검색을 받는 사람 여러 명씩 묶어 하고 (list_sent_to_recipients_logic),
+  여러 연락처에 보낸 같은 메일 / 같은 본문은 한 번만 분석한다 (이미 분석된 본문은 TextAnalysisResult 재사용)
+- 분석은 analysis_chain.batch (최대 BACKFILL_MAX_CONCURRENCY 병렬). rate limit / 일시 오류로 실패한 것만 backoff 후 다시 보낸다
+- 진행 상황은 BACKFILL_CHUNK_SIZE 개마다 MailAnalysisBackfill 에 기록한다 (MailAnalysisBackfillView)
+- 실행이 도중에 실패하면 처리가 끝나지 않은 연락처만 대기열로 되돌리고 진행 상황을 FAILED 로 닫는다 (Celery 재시도가 이어서 처리)
+"""
+
+import logging
+import random
+import time
+
+import openai
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.ai.models import MailAnalysisBackfill, PendingContactBackfill
+from apps.ai.services.analysis import analyze_speech_llm_batch
+from apps.ai.services.analysis_dedup import content_hash, find_text_analyses, link_text_analysis, record_dedup_stat, save_text_analysis
+from apps.contact.models import Contact
+from apps.mail.services import list_sent_to_recipients_logic
+from apps.mail.utils import normalize_email
+
+logger = logging.getLogger(__name__)
+
+# 연락처 추가 후 backfill 을 시작하기까지 모으는 시간
+BACKFILL_DEBOUNCE_SECONDS = 30
+BACKFILL_CLAIM_KEY = "ai:backfill:claim:v1:{user_id}"
+BACKFILL_MAX_CONCURRENCY = 4
+# 한 번의 analysis_chain.batch 에 넣는 본문 수 (= 진행 상황 기록 단위)
+BACKFILL_CHUNK_SIZE = 20
+BACKFILL_MAX_ATTEMPTS = 4
+BACKFILL_BACKOFF_SECONDS = 2.0
+
+# 다시 보내면 성공할 수 있는 LLM 오류 (그 외 오류는 같은 입력으로 다시 실패하므로 재시도하지 않음)
+_RETRYABLE_LLM_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def request_contact_backfill(user_id: int, contact_id: int) -> bool:
+    """연락처를 대기열에 넣고, 이번에 backfill_mail_analysis 를 예약해야 하면 True."""
+    PendingContactBackfill.objects.bulk_create([PendingContactBackfill(user_id=user_id, contact_id=contact_id)], ignore_conflicts=True)
+    return cache.add(BACKFILL_CLAIM_KEY.format(user_id=user_id), True, timeout=BACKFILL_DEBOUNCE_SECONDS)
+
+
+def _claim_contacts(user_id: int) -> list[Contact]:
+    # 같은 사용자의 다른 실행과 겹치지 않게 잠긴 행은 건너뛰고, 꺼낸 연락처는 대기열에서 지운다
+    with transaction.atomic():
+        pending = list(PendingContactBackfill.objects.select_for_update(skip_locked=True).filter(user_id=user_id).values_list("id", "contact_id"))
+        PendingContactBackfill.objects.filter(id__in=[pending_id for pending_id, _ in pending]).delete()
+    return list(Contact.objects.filter(user_id=user_id, id__in=[contact_id for _, contact_id in pending]).only("id", "email", "group_id"))
+
+
+def analyze_texts(texts: list[tuple[str, str]]) -> list:
+    """(subject, body) 마다 SpeechAnalysis 또는 (재시도 후에도 실패한) 예외를 같은 순서로 돌려준다."""
+    results: list = [None] * len(texts)
+    pending = list(range(len(texts)))
+    for attempt in range(BACKFILL_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(BACKFILL_BACKOFF_SECONDS * (2 ** (attempt - 1)) * (1 + random.random()))
+
+        outputs = analyze_speech_llm_batch([texts[i] for i in pending], max_concurrency=BACKFILL_MAX_CONCURRENCY)
+        retry = []
+        for i, output in zip(pending, outputs, strict=True):
+            results[i] = output
+            if isinstance(output, _RETRYABLE_LLM_ERRORS):
+                retry.append(i)
+        pending = retry
+        if not pending:
+            break
+    return results
+
+
+def _backfill(user, contacts: list[Contact], per_contact_limit: int, progress: MailAnalysisBackfill, unfinished: dict[int, Contact]) -> None:
+    messages, recipients = list_sent_to_recipients_logic(user, [c.email for c in contacts], per_contact_limit)
+
+    # 같은 본문은 (여러 연락처에 보낸 메일이든, 다시 보낸 메일이든) 하나로 모은다
+    # list_sent_to_recipients_logic 가 돌려주는 주소와 같은 형태로 맞춘다
+    by_email = {normalize_email(c.email): c for c in contacts}
+    texts: dict[str, tuple[str, str]] = {}
+    targets: dict[str, dict[int, Contact]] = {}
+    for msg in messages:
+        subject, body = msg.get("subject") or "", msg.get("body") or ""
+        if not (subject or body):
+            continue
+        digest = content_hash(subject, body)
+        texts.setdefault(digest, (subject, body))
+        targets.setdefault(digest, {}).update({c.id: c for e in recipients.get(msg["id"], []) if (c := by_email.get(normalize_email(e)))})
+
+    # 연락처마다 아직 끝나지 않은 본문. 모두 끝난 (또는 보낸 메일이 없는) 연락처는 unfinished 에서 뺀다
+    open_digests: dict[int, set[str]] = {contact_id: set() for contact_id in unfinished}
+    for digest, contacts_by_id in targets.items():
+        for contact_id in contacts_by_id:
+            open_digests[contact_id].add(digest)
+
+    def finish(digest: str) -> None:
+        for contact_id in targets[digest]:
+            open_digests[contact_id].discard(digest)
+            if not open_digests[contact_id]:
+                unfinished.pop(contact_id, None)
+
+    for contact_id, digests in open_digests.items():
+        if not digests:
+            unfinished.pop(contact_id)
+
+    existing = find_text_analyses(user.id, texts)
+    for digest, text_analysis in existing.items():
+        link_text_analysis(user.id, list(targets[digest].values()), text_analysis)
+        finish(digest)
+    progress.messages = len(texts)
+    progress.reused = len(existing)
+    progress.save(update_fields=["messages", "reused", "updated_at"])
+
+    misses = [digest for digest in texts if digest not in existing]
+    for i in range(0, len(misses), BACKFILL_CHUNK_SIZE):
+        chunk = misses[i : i + BACKFILL_CHUNK_SIZE]
+        for digest, result in zip(chunk, analyze_texts([texts[d] for d in chunk]), strict=True):
+            if isinstance(result, Exception):
+                # 재시도 후에도 실패한 본문은 다시 보내도 같은 결과이므로 처리된 것으로 본다
+                logger.warning(f"[backfill_mail_analysis] analysis failed user={user.id}: {result!r}")
+                progress.failed += 1
+            else:
+                text_analysis = save_text_analysis(user.id, digest, result.model_dump())
+                link_text_analysis(user.id, list(targets[digest].values()), text_analysis)
+                progress.analyzed += 1
+            finish(digest)
+        progress.save(update_fields=["analyzed", "failed", "updated_at"])
+
+
+def run_backfill(user, per_contact_limit: int = 2) -> MailAnalysisBackfill | None:
+    contacts = _claim_contacts(user.id)
+    if not contacts:
+        return None
+
+    progress = MailAnalysisBackfill.objects.create(user=user, contacts=len(contacts))
+    # 꺼냈지만 아직 처리가 끝나지 않은 연락처
+    unfinished = {c.id: c for c in contacts}
+    try:
+        _backfill(user, contacts, per_contact_limit, progress, unfinished)
+    except Exception:
+        # 어느 단계에서 실패하든 다음 재시도에서 남은 연락처를 다시 처리하도록 대기열로 되돌림
+        PendingContactBackfill.objects.bulk_create([PendingContactBackfill(user=user, contact=c) for c in unfinished.values()], ignore_conflicts=True)
+        progress.status = MailAnalysisBackfill.Status.FAILED
+        progress.finished_at = timezone.now()
+        progress.save(update_fields=["status", "finished_at", "updated_at"])
+        raise
+    finally:
+        # 도중에 실패해도 이미 한 LLM 호출/재사용은 일일 통계에 남긴다 (재시도는 남은 것만 센다)
+        record_dedup_stat(llm_calls=progress.analyzed + progress.failed, reused=progress.reused)
+
+    progress.status = MailAnalysisBackfill.Status.DONE
+    progress.finished_at = timezone.now()
+    progress.save(update_fields=["status", "finished_at", "updated_at"])
+    return progress
@@ -1,25 +1,24 @@
 import time
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Any
 
-from apps.ai.services.chains import body_chain, plan_chain, subject_chain, validator_chain
+from apps.ai.services.body_validation import BodyValidation
+from apps.ai.services.chains import body_chain, subject_chain, validator_chain
 from apps.ai.services.graph import mail_graph
-from apps.ai.services.models import ValidationResult
-from apps.ai.services.pii_masker import PiiMasker, make_req_id, unmask_stream
-from apps.ai.services.utils import build_prompt_inputs, collect_prompt_context, heartbeat, sse_event
-from apps.core.utils.async_stream import as_async_stream
+from apps.ai.services.pii_masker import PiiMasker, aunmask_stream, make_req_id, unmask_stream
+from apps.ai.services.utils import acollect_prompt_context, build_prompt_inputs, collect_prompt_context, heartbeat, sse_event
 
 
-@as_async_stream
-def stream_mail_generation(
+async def stream_mail_generation(
     user,
     subject: str | None,
     body: str | None,
     to_emails: list[str],
     attachments: list[dict] | None = None,
-) -> Generator[str]:
+) -> AsyncGenerator[str]:
 
-    ctx = collect_prompt_context(user, to_emails)
+    # ORM 접근은 여기 한 번뿐 (이후는 전부 이벤트 루프에서 astream/ainvoke)
+    ctx = await acollect_prompt_context(user, to_emails)
     raw_inputs = build_prompt_inputs(
         ctx,
         extra={
@@ -40,7 +39,7 @@ def stream_mail_generation(
 
     # 1) Subject (non-streaming) — 제목 생성
     try:
-        locked_title = (subject_chain.invoke(masked_inputs) or "").strip()
+        locked_title = ((await subject_chain.ainvoke(masked_inputs)) or "").strip()
     except Exception:
         locked_title = ""
 
@@ -70,9 +69,9 @@ def stream_mail_generation(
     }
 
     try:
-        raw_stream = body_chain.stream(locked_inputs)
+        raw_stream = body_chain.astream(locked_inputs)
 
-        for chunk in unmask_stream(raw_stream, req_id, mapping):
+        async for chunk in aunmask_stream(raw_stream, req_id, mapping):
             if chunk:
                 yield sse_event("body.delta", {"seq": seq - 1, "text": chunk}, eid=str(seq))
                 seq += 1
@@ -88,39 +87,16 @@ def stream_mail_generation(
         yield sse_event("done", {"reason": "stop"}, eid=str(seq + 1))
 
 
-@as_async_stream
-def stream_mail_generation_with_plan(
+async def stream_mail_generation_with_plan(
     user: dict,
     subject: str | None,
     body: str | None,
     to_emails: list[str],
     attachments: list[dict] | None = None,
-) -> Generator[str, None, None]:
+) -> AsyncGenerator[str, None]:
 
     yield sse_event("ready", {"ts": int(time.time() * 1000)}, retry_ms=5000)
 
-    state = mail_graph.invoke(
-        {
-            "user": user,
-            "subject": subject,
-            "body": body,
-            "to_emails": to_emails,
-            "attachments": attachments,
-        }
-    )
-
-    req_id = state["req_id"]
-    mapping = state["mask_mapping"]
-    masked_inputs = state["masked_inputs"]
-    body_inputs = state["body_inputs"]
-    locked_title_masked = state["locked_title"]
-
-    yield sse_event("plan.start", {}, eid="plan-0")
-
-    plan_chunks: list[str] = []
-
-    raw_stream = plan_chain.stream(masked_inputs)
-
     paragraph_buf = ""
     para_idx = 1
 
@@ -136,10 +112,36 @@ def stream_mail_generation_with_plan(
         )
         para_idx += 1
 
-    for ch in raw_stream:
+    # subject 와 plan 이 그래프 안에서 동시에 돌고, plan 청크는 subject 를 기다리지 않고 바로 plan.delta 로 나간다
+    state: dict[str, Any] = {}
+    graph_stream = mail_graph.astream(
+        {
+            "user": user,
+            "subject": subject,
+            "body": body,
+            "to_emails": to_emails,
+            "attachments": attachments,
+        },
+        stream_mode=["custom", "updates"],
+    )
+
+    async for mode, payload in graph_stream:
+        if mode == "updates":
+            for node, update in payload.items():
+                state.update(update or {})
+                if node == "masking":
+                    yield sse_event("plan.start", {}, eid="plan-0")
+                elif node == "plan":
+                    if paragraph_buf.strip():
+                        for ev in flush_paragraph(paragraph_buf):
+                            yield ev
+                    paragraph_buf = ""
+                    yield sse_event("plan.done", {}, eid="plan-done")
+            continue
+
+        ch = payload.get("plan_delta")
         if not ch:
             continue
-        plan_chunks.append(ch)
         paragraph_buf += ch
 
         if "\n\n" in paragraph_buf:
@@ -155,14 +157,10 @@ def stream_mail_generation_with_plan(
                 yield ev
             paragraph_buf = rest
 
-    if paragraph_buf.strip():
-        for ev in flush_paragraph(paragraph_buf):
-            yield ev
-
-    yield sse_event("plan.done", {}, eid="plan-done")
-
-    plan_text = "".join(plan_chunks)
-    body_inputs["plan_text"] = plan_text
+    req_id = state["req_id"]
+    mapping = state["mask_mapping"]
+    body_inputs = state["body_inputs"]
+    locked_title_masked = state["locked_title"]
 
     unmasked_title = "".join(unmask_stream([locked_title_masked], req_id, mapping)) if locked_title_masked else ""
     yield sse_event("subject", {"title": unmasked_title, "text": unmasked_title}, eid="0")
@@ -171,21 +169,22 @@ def stream_mail_generation_with_plan(
     seq = 2
     last_ping = time.monotonic()
 
-    masked_full_chunks: list[str] = []
+    # 스트리밍과 함께 단락마다 로컬 검사, 문제가 보이면 그 시점부터 LLM 판정을 백그라운드로
+    validation = BodyValidation(locked_title_masked, body_inputs, req_id, mapping, judge=validator_chain)
 
     try:
-        raw_stream = body_chain.stream(body_inputs)
+        raw_stream = body_chain.astream(body_inputs)
 
-        def capture_body(stream):
-            for ch in stream:
+        async def capture_body(stream):
+            async for ch in stream:
                 if not ch:
                     continue
-                masked_full_chunks.append(ch)
+                validation.feed(ch)
                 yield ch
 
         captured_body_stream = capture_body(raw_stream)
 
-        for chunk in unmask_stream(captured_body_stream, req_id, mapping):
+        async for chunk in aunmask_stream(captured_body_stream, req_id, mapping):
             if not chunk:
                 continue
             yield sse_event("body.delta", {"seq": seq - 1, "text": chunk}, eid=str(seq))
@@ -198,36 +197,41 @@ def stream_mail_generation_with_plan(
     except Exception as e:
         yield sse_event("error", {"message": str(e)}, eid=str(seq))
     finally:
-        yield sse_event("body.done", {"text": "\n"}, eid=str(seq))
-        seq += 1
-
-        masked_body = "".join(masked_full_chunks)
-
         try:
-            judge: ValidationResult = validator_chain.invoke(
-                {
-                    "subject": locked_title_masked,
-                    "body": masked_body,
-                    "constraints": body_inputs,
-                }
-            )
-        except Exception:
-            judge = None
-
-        if judge is not None and not judge.passed:
-            fixed_masked_body = body_chain.invoke(
-                {
-                    **body_inputs,
-                    "body": masked_body,
-                    "prompt_text": (body_inputs.get("prompt_text") or "") + "\n" + judge.rewrite_instructions,
-                }
-            )
-            fixed_unmasked = "".join(unmask_stream([fixed_masked_body], req_id, mapping))
-            yield sse_event("patched", {"text": fixed_unmasked}, eid=str(seq))
+            yield sse_event("body.done", {"text": "\n"}, eid=str(seq))
             seq += 1
 
-        yield sse_event("done", {"reason": "stop"}, eid=str(seq + 1))
-        mapping.clear()
+            rewrite_instructions = await validation.finish()
+
+            if rewrite_instructions:
+                # 보정 본문도 통째로 기다리지 않고 delta로 흘려보냄
+                yield sse_event("patched.start", {}, eid=str(seq))
+                seq += 1
+                patch_seq = 0
+                try:
+                    fixed_stream = body_chain.astream(
+                        {
+                            **body_inputs,
+                            "body": validation.body,
+                            "prompt_text": (body_inputs.get("prompt_text") or "") + "\n" + rewrite_instructions,
+                        }
+                    )
+                    async for chunk in aunmask_stream(fixed_stream, req_id, mapping):
+                        if not chunk:
+                            continue
+                        yield sse_event("patched.delta", {"seq": patch_seq, "text": chunk}, eid=str(seq))
+                        seq += 1
+                        patch_seq += 1
+                except Exception as e:
+                    yield sse_event("error", {"message": str(e)}, eid=str(seq))
+                    seq += 1
+                yield sse_event("patched.done", {}, eid=str(seq))
+                seq += 1
+
+            yield sse_event("done", {"reason": "stop"}, eid=str(seq + 1))
+        finally:
+            validation.cancel()
+            mapping.clear()
 
 
 def debug_mail_generation_analysis(
@@ -1,4 +1,5 @@
 from apps.ai.services.chains import suggest_chain
+from apps.ai.services.suggestion_cache import get_cached_suggestion, set_cached_suggestion
 from apps.ai.services.utils import build_prompt_inputs, collect_prompt_context
 
 
@@ -40,7 +41,13 @@ def suggest_mail_text(
     )
     prompt_inputs["target"] = target
 
+    # 같은 입력(토글/재시도) 또는 이전 제안을 그대로 따라 친 경우는 LLM 호출 없이 캐시에서
+    cached = get_cached_suggestion(user.id, prompt_inputs)
+    if cached is not None:
+        return cached
+
     # 3) LLM 호출 (스트리밍 X, 단일 응답)
     suggestion: str = suggest_chain.invoke(prompt_inputs)
+    set_cached_suggestion(user.id, prompt_inputs, suggestion)
 
     return suggestion
@@ -3,7 +3,8 @@ import hashlib
 import hmac
 import re
 import uuid
-from collections.abc import Generator, Iterable
+from bisect import bisect_right
+from collections.abc import AsyncGenerator, AsyncIterable, Generator, Iterable, Iterator
 from dataclasses import dataclass
 
 from django.conf import settings
@@ -33,6 +34,35 @@ class PatternSpec:
     name: str
     regex: re.Pattern
     group: int
+    # regex가 매치를 시작할 수 있는 모든 위치에서 반드시 매치되는 싼 정규식 (필요조건).
+    # 있으면 본 정규식은 anchor 위치에서만 시도한다 — finditer()와 결과는 동일.
+    anchor: re.Pattern | None = None
+    # 매치에 반드시 포함되는 문자열. 본문에 없으면 패턴 자체를 건너뛴다.
+    trigger: str | None = None
+
+    def finditer(self, text: str) -> Iterator[re.Match]:
+        if self.trigger is not None and self.trigger not in text:
+            return iter(())
+        if self.anchor is None:
+            return self.regex.finditer(text)
+        return self._anchored_finditer(text)
+
+    def _anchored_finditer(self, text: str) -> Iterator[re.Match]:
+        search = self.anchor.search
+        match = self.regex.match
+        pos = 0
+        while True:
+            a = search(text, pos)
+            if a is None:
+                return
+            start = a.start()
+            m = match(text, start)
+            if m is None:
+                pos = start + 1
+                continue
+            yield m
+            # finditer와 같이 다음 탐색은 매치 끝에서 (빈 매치면 한 칸 전진)
+            pos = m.end() if m.end() > start else start + 1
 
 
 PATTERNS: list[PatternSpec] = [
@@ -40,33 +70,41 @@ PATTERNS: list[PatternSpec] = [
         "EMAIL",
         re.compile(r"(?P<email>[A-Za-z0-9._%+\-]+@(?:[A-Za-z0-9\-]+\.)+[A-Za-z]{2,24})(?![A-Za-z0-9._%+\-@])"),
         0,
+        trigger="@",
     ),
     PatternSpec(
         "PHONE",
         re.compile(r"(?P<phone>(?:\+?\d{1,3}[-.\s]?)?(?:\d{2,4}[-.\s]?){2,4}\d)(?!\d)"),
         0,
+        anchor=re.compile(r"[+\d][-.\s\d]{4}"),
     ),
-    PatternSpec("CARD", re.compile(r"(?P<card>(?:\d[ -]*?){13,19})(?![0-9\-])"), 0),
-    PatternSpec("CVV_CVC", re.compile(r"\b(?:CVV|CVC)[:\s]*\d{3,4}\b", re.I), 0),
-    PatternSpec("CARD_EXP", re.compile(r"\b(0[1-9]|1[0-2])/(?:\d{2}|\d{4})\b"), 0),
+    PatternSpec("CARD", re.compile(r"(?P<card>(?:\d[ -]*?){13,19})(?![0-9\-])"), 0, anchor=re.compile(r"\d[ \d-]{12}")),
+    PatternSpec("CVV_CVC", re.compile(r"\b(?:CVV|CVC)[:\s]*\d{3,4}\b", re.I), 0, anchor=re.compile(r"cv[vc]", re.I)),
+    PatternSpec("CARD_EXP", re.compile(r"\b(0[1-9]|1[0-2])/(?:\d{2}|\d{4})\b"), 0, anchor=re.compile(r"[01]\d/")),
     PatternSpec("RRN", re.compile(r"(?P<rrn>\d{6}[-\s]?\d{7})(?![0-9])"), 0),
     PatternSpec("ACCOUNT_SIMPLE", re.compile(r"\b(?:\d{2,6}[-\s]?\d{2,6}[-\s]?\d{2,8})\b"), 0),
-    PatternSpec("IBAN", re.compile(r"\b[A-Z]{2}\d{2}[A-Z0-9]{10,30}\b"), 0),
-    PatternSpec("SWIFT_BIC", re.compile(r"\b[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}([A-Z0-9]{3})?\b"), 0),
-    PatternSpec("SSN_US", re.compile(r"\b\d{3}-\d{2}-\d{4}\b"), 0),
-    PatternSpec("JWT", re.compile(r"\beyJ[A-Za-z0-9_\-]+?\.[A-Za-z0-9_\-]+?\.[A-Za-z0-9_\-]*\b"), 0),
-    PatternSpec("BEARER", re.compile(r"\bBearer\s+[A-Za-z0-9\-_.=]{20,}\b", re.I), 0),
-    PatternSpec("AWS", re.compile(r"\bAKIA[0-9A-Z]{16}\b"), 0),
-    PatternSpec("GITHUB_PAT", re.compile(r"\bgh[pousr]_[A-Za-z0-9]{36,}\b"), 0),
+    PatternSpec("IBAN", re.compile(r"\b[A-Z]{2}\d{2}[A-Z0-9]{10,30}\b"), 0, anchor=re.compile(r"[A-Z]{2}\d{2}")),
+    PatternSpec("SWIFT_BIC", re.compile(r"\b[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}([A-Z0-9]{3})?\b"), 0, anchor=re.compile(r"[A-Z]{6}[A-Z0-9]{2}")),
+    PatternSpec("SSN_US", re.compile(r"\b\d{3}-\d{2}-\d{4}\b"), 0, anchor=re.compile(r"\d{3}-\d\d-\d{4}")),
+    PatternSpec("JWT", re.compile(r"\beyJ[A-Za-z0-9_\-]+?\.[A-Za-z0-9_\-]+?\.[A-Za-z0-9_\-]*\b"), 0, anchor=re.compile(r"eyJ")),
+    PatternSpec("BEARER", re.compile(r"\bBearer\s+[A-Za-z0-9\-_.=]{20,}\b", re.I), 0, anchor=re.compile(r"bearer", re.I)),
+    PatternSpec("AWS", re.compile(r"\bAKIA[0-9A-Z]{16}\b"), 0, anchor=re.compile(r"AKIA")),
+    PatternSpec("GITHUB_PAT", re.compile(r"\bgh[pousr]_[A-Za-z0-9]{36,}\b"), 0, anchor=re.compile(r"gh[pousr]_")),
     PatternSpec(
         "UUID",
         re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[1-5][0-9a-fA-F]{3}-[89abAB][0-9a-fA-F]{3}-[0-9a-fA-F]{12}\b"),
         0,
+        anchor=re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-"),
+    ),
+    PatternSpec("IPV4", re.compile(r"\b(?:(?:25[0-5]|2[0-4]\d|[01]?\d\d?)(?:\.(?!$)|$)){4}\b"), 0, anchor=re.compile(r"\d{1,3}\.\d")),
+    PatternSpec("MAC", re.compile(r"\b(?:[0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}\b"), 0, anchor=re.compile(r"[0-9A-Fa-f]{2}[:-][0-9A-Fa-f]{2}[:-]")),
+    PatternSpec("VIN", re.compile(r"\b[A-HJ-NPR-Za-hj-npr-z0-9]{17}\b"), 0, anchor=re.compile(r"[A-HJ-NPR-Za-hj-npr-z0-9]{17}")),
+    PatternSpec(
+        "PASS",
+        re.compile(r"(?i)(?:password|pwd|pass|비밀번호)\s*[:=]\s*([^\s,;]{4,64})"),
+        1,
+        anchor=re.compile(r"(?i:p(?:ass|wd)|비밀번호)"),
     ),
-    PatternSpec("IPV4", re.compile(r"\b(?:(?:25[0-5]|2[0-4]\d|[01]?\d\d?)(?:\.(?!$)|$)){4}\b"), 0),
-    PatternSpec("MAC", re.compile(r"\b(?:[0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}\b"), 0),
-    PatternSpec("VIN", re.compile(r"\b[A-HJ-NPR-Za-hj-npr-z0-9]{17}\b"), 0),
-    PatternSpec("PASS", re.compile(r"(?i)(?:password|pwd|pass|비밀번호)\s*[:=]\s*([^\s,;]{4,64})"), 1),
     PatternSpec("LONG_DIGITS", re.compile(r"\b\d{6,20}\b"), 0),
     PatternSpec("URL", re.compile(r"https?://[^\s]+"), 0),
 ]
@@ -84,22 +122,35 @@ class PiiMasker:
         self._map[self._n] = original
         return f"{{{{PII:{self.req_id}:{self._n}:{tag}}}}}"
 
-    def _placeholder_spans(self, s: str) -> list[tuple[int, int]]:
-        return [m.span() for m in PLACEHOLDER_RX.finditer(s)]
+    def _placeholder_starts(self, s: str) -> tuple[list[int], list[int]]:
+        starts, ends = [], []
+        for m in PLACEHOLDER_RX.finditer(s):
+            starts.append(m.start())
+            ends.append(m.end())
+        return starts, ends
 
-    def _is_inside(self, idx: int, spans: list[tuple[int, int]]) -> bool:
-        return any(a <= idx < b for a, b in spans)
+    @staticmethod
+    def _is_inside(idx: int, starts: list[int], ends: list[int]) -> bool:
+        # placeholder 구간은 서로 겹치지 않으므로 idx 이하에서 시작하는 마지막 구간만 보면 된다
+        i = bisect_right(starts, idx) - 1
+        return i >= 0 and idx < ends[i]
 
     def mask_text(self, text: str) -> tuple[str, dict[int, str]]:
+        """
+        Replace PII in text with signed placeholders.
+
+        후보 충돌은 leftmost → longest 규칙으로 정리하고, 결과 문자열은 한 번에 join 한다.
+        placeholder 번호는 기존과 같이 뒤쪽 매치부터 매긴다 (출력 호환).
+        """
         if not text:
             return text, {}
 
-        ph_spans = self._placeholder_spans(text)
+        ph_starts, ph_ends = self._placeholder_starts(text)
         candidates: list[tuple[int, int, str]] = []
 
         # 모든 패턴에 대해 탐색
         for spec in PATTERNS:
-            for m in spec.regex.finditer(text):
+            for m in spec.finditer(text):
                 if spec.group == 0:
                     start, end = m.span()
                     original = text[start:end]
@@ -107,7 +158,7 @@ class PiiMasker:
                     start, end = m.span(spec.group)
                     original = m.group(spec.group)
 
-                if self._is_inside(start, ph_spans):
+                if ph_starts and self._is_inside(start, ph_starts, ph_ends):
                     continue
 
                 candidates.append((start, end, original))
@@ -123,12 +174,19 @@ class PiiMasker:
                 non_overlap.append((s, e, val))
                 cur_end = e
 
-        out = text
-        for s, e, val in sorted(non_overlap, key=lambda x: x[0], reverse=True):
-            ph = self._next_ph(val)
-            out = out[:s] + ph + out[e:]
+        # 뒤에서부터 번호를 매기기 위해 placeholder를 먼저 만든다
+        placeholders = [self._next_ph(val) for _, _, val in reversed(non_overlap)]
+        placeholders.reverse()
 
-        return out, dict(self._map)
+        parts = []
+        prev = 0
+        for (s, e, _), ph in zip(non_overlap, placeholders, strict=True):
+            parts.append(text[prev:s])
+            parts.append(ph)
+            prev = e
+        parts.append(text[prev:])
+
+        return "".join(parts), dict(self._map)
 
     def mask_inputs(
         self,
@@ -203,79 +261,139 @@ def _verify_and_unmask_token(token: str, req_id: str, mapping: dict[int, str]) -
     return original
 
 
-def unmask_stream(
-    chunks: Iterable[str],
-    req_id: str,
-    mapping: dict[int, str],
-) -> Generator[str]:
+class StreamUnmasker:
     """
-    최소 버퍼 DFA:
-    - PLAIN 모드: 즉시 방출
-    - OPEN 모드: '{'부터 OPEN_TOKENS prefix를 한 글자씩 검사
-    - TOKEN 모드: 닫힘 토큰까지 수집 → 검증/복원 → 방출
-    PPI 마스킹된 부분은 버퍼로 모아서 마스킹 해제, 그렇지 않은 평문은 즉시 flush함.
+    청크 단위 스캐너 (문자 단위 DFA와 출력이 바이트 단위로 동일):
+    - PLAIN 모드: str.find로 다음 '{'까지 평문을 슬라이스째 방출
+    - OPEN 모드: '{'부터 OPEN_TOKENS prefix를 검사 (최대 몇 글자)
+    - TOKEN 모드: 닫힘 토큰을 str.find로 찾아 검증/복원 → 방출 (MAX_PLACEHOLDER_LEN 초과 시 원문 그대로)
+    청크 경계를 넘어 버퍼에 남기는 것은 placeholder가 될 수 있는 접두부뿐이며,
+    feed()는 입력 청크마다 그때까지 확정된 출력을 돌려준다 (sync/async 스트림 양쪽에서 사용).
     """
 
-    mode = "PLAIN"  # PLAIN | OPEN | TOKEN
-    open_buf = ""  # OPEN 모드에서 오픈 토큰 부분일치 버퍼
-    token_buf = ""  # TOKEN 모드에서 전체 토큰 버퍼
-    open_tok = ""  # 오픈 토큰
-    close_tok = ""  # 닫힘 토큰
-    out_buf: list[str] = []
-
-    def flush():
-        if out_buf:
-            yield "".join(out_buf)
-            out_buf.clear()
+    __slots__ = ("req_id", "mapping", "mode", "open_buf", "token_buf", "close_tok")
 
-    def is_prefix_of_open(s: str) -> bool:
-        return any(t.startswith(s) for t in OPEN_TOKENS)
-
-    for chunk in chunks:
-        for ch in chunk:
+    def __init__(self, req_id: str, mapping: dict[int, str]):
+        self.req_id = req_id
+        self.mapping = mapping
+        self.mode = "PLAIN"  # PLAIN | OPEN | TOKEN
+        self.open_buf = ""  # OPEN 모드에서 오픈 토큰 부분일치 버퍼
+        self.token_buf = ""  # TOKEN 모드에서 전체 토큰 버퍼
+        self.close_tok = ""  # 닫힘 토큰
+
+    def feed(self, chunk: str) -> str:
+        # 상태는 루프 동안 지역 변수로 (속성 접근 비용 없이), 끝나면 되돌려 저장
+        mode, open_buf, token_buf, close_tok = self.mode, self.open_buf, self.token_buf, self.close_tok
+        req_id, mapping = self.req_id, self.mapping
+        out: list[str] = []
+
+        i = 0
+        n = len(chunk)
+        while i < n:
             if mode == "PLAIN":
-                if ch == "{":
-                    mode = "OPEN"
-                    open_buf = "{"
-                else:
-                    out_buf.append(ch)
+                j = chunk.find("{", i)
+                if j == -1:
+                    out.append(chunk[i:])
+                    break
+                if j > i:
+                    out.append(chunk[i:j])
+                mode = "OPEN"
+                open_buf = "{"
+                i = j + 1
 
             elif mode == "OPEN":
-                open_buf += ch
-                if any(open_buf == t for t in OPEN_TOKENS):
+                open_buf += chunk[i]
+                i += 1
+                if open_buf in CLOSE_FOR:
                     mode = "TOKEN"
-                    open_tok = open_buf
-                    close_tok = CLOSE_FOR[open_tok]
+                    close_tok = CLOSE_FOR[open_buf]
                     token_buf = open_buf
                     open_buf = ""
                     continue
-                if is_prefix_of_open(open_buf):
+                if _is_prefix_of_open(open_buf):
                     continue
-                while open_buf and not is_prefix_of_open(open_buf):
-                    out_buf.append(open_buf[0])
-                    open_buf = open_buf[1:]
+                # 가장 긴 "오픈 토큰 접두부" 꼬리만 남기고 앞부분은 평문으로 방출
+                k = 1
+                while k < len(open_buf) and not _is_prefix_of_open(open_buf[k:]):
+                    k += 1
+                out.append(open_buf[:k])
+                open_buf = open_buf[k:]
                 if not open_buf:
                     mode = "PLAIN"
 
             else:  # mode == "TOKEN"
-                token_buf += ch
-                if len(token_buf) > MAX_PLACEHOLDER_LEN:
-                    out_buf.append(token_buf)
-                    token_buf = ""
-                    open_tok = close_tok = ""
-                    mode = "PLAIN"
-                    continue
-                if token_buf.endswith(close_tok):
-                    replaced = _verify_and_unmask_token(token_buf, req_id, mapping)
-                    out_buf.append(replaced if replaced is not None else token_buf)
-                    token_buf = ""
-                    open_tok = close_tok = ""
-                    mode = "PLAIN"
+                # 닫힘 토큰이 이전 청크 꼬리와 걸칠 수 있으므로 (len(close)-1)글자를 붙여서 찾는다
+                tail = token_buf[len(token_buf) - len(close_tok) + 1 :] if len(close_tok) > 1 else ""
+                f = (tail + chunk[i:]).find(close_tok) if tail else chunk.find(close_tok, i) - i
+                room = MAX_PLACEHOLDER_LEN - len(token_buf)  # 초과 없이 더 붙일 수 있는 글자 수
+
+                if f >= 0:
+                    end = i + f + len(close_tok) - len(tail)
+                    if end - i <= room:
+                        token_buf += chunk[i:end]
+                        replaced = _verify_and_unmask_token(token_buf, req_id, mapping)
+                        out.append(replaced if replaced is not None else token_buf)
+                        token_buf = close_tok = ""
+                        mode = "PLAIN"
+                        i = end
+                        continue
+                elif n - i <= room:
+                    token_buf += chunk[i:]
+                    break
+
+                # MAX_PLACEHOLDER_LEN을 넘기는 글자까지 붙여 원문 그대로 방출
+                token_buf += chunk[i : i + room + 1]
+                out.append(token_buf)
+                i += room + 1
+                token_buf = close_tok = ""
+                mode = "PLAIN"
+
+        self.mode, self.open_buf, self.token_buf, self.close_tok = mode, open_buf, token_buf, close_tok
+        return "".join(out)
+
+    def flush(self) -> str:
+        """스트림 끝: placeholder가 되지 못한 버퍼를 그대로 돌려준다."""
+        if self.mode == "OPEN":
+            rest = self.open_buf
+        elif self.mode == "TOKEN":
+            rest = self.token_buf
+        else:
+            rest = ""
+        self.mode, self.open_buf, self.token_buf, self.close_tok = "PLAIN", "", "", ""
+        return rest
+
+
+def _is_prefix_of_open(s: str) -> bool:
+    return any(t.startswith(s) for t in OPEN_TOKENS)
+
+
+def unmask_stream(
+    chunks: Iterable[str],
+    req_id: str,
+    mapping: dict[int, str],
+) -> Generator[str]:
+    """입력 청크마다 그때까지 확정된 출력을 한 번 방출 (StreamUnmasker 참고)."""
+    unmasker = StreamUnmasker(req_id, mapping)
+    for chunk in chunks:
+        out = unmasker.feed(chunk)
+        if out:
+            yield out
+    rest = unmasker.flush()
+    if rest:
+        yield rest
 
-        yield from flush()
 
-    if mode == "OPEN" and open_buf:
-        out_buf.append(open_buf)
-    elif mode == "TOKEN" and token_buf:
-        out_buf.append(token_buf)
-    yield from flush()
+async def aunmask_stream(
+    chunks: AsyncIterable[str],
+    req_id: str,
+    mapping: dict[int, str],
+) -> AsyncGenerator[str]:
+    """unmask_stream 의 async 버전 (LangChain astream 청크를 그대로 받음)."""
+    unmasker = StreamUnmasker(req_id, mapping)
+    async for chunk in chunks:
+        out = unmasker.feed(chunk)
+        if out:
+            yield out
+    rest = unmasker.flush()
+    if rest:
+        yield rest
@@ -0,0 +1,106 @@
+"""
+GPU 토큰 스트림(Redis pub/sub) 프로세스 단위 멀티플렉서.
+
+- GPU 서버는 user_{id}_mail 채널로 토큰을 publish 한다
+- 소켓마다 Redis 연결 + subscribe를 여는 대신, 이벤트 루프(=워커 프로세스)당 연결 1개로
+  user_*_mail 패턴을 구독하고 받은 메시지를 채널을 구독 중인 소켓 큐들로 나눠준다
+- 소켓 큐는 크기 제한이 있고, 느린 소켓 때문에 공유 리스너가 막히지 않도록 가득 차면 가장 오래된 메시지를 버린다
+"""
+
+import asyncio
+import logging
+import weakref
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAIL_STREAM_PATTERN = "user_*_mail"
+MAIL_STREAM_QUEUE_SIZE = 256
+MAIL_STREAM_RECONNECT_SECONDS = 1.0
+
+
+def _redis_url() -> str:
+    # 하드코딩 대신 channels_redis 레이어와 같은 Redis를 쓴다
+    return settings.CHANNEL_LAYERS["default"]["CONFIG"]["hosts"][0]
+
+
+class MailStreamMultiplexer:
+    """One Redis connection + pattern subscription per event loop, fanned out to per-socket queues."""
+
+    def __init__(self, url: str, pattern: str = MAIL_STREAM_PATTERN, queue_size: int = MAIL_STREAM_QUEUE_SIZE):
+        self.url = url
+        self.pattern = pattern
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._listener: asyncio.Task | None = None
+        self.dropped = 0
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(channel)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[channel]
+
+    def dispatch(self, channel: str, data) -> None:
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                # backpressure: 소켓이 못 따라오면 그 소켓의 가장 오래된 메시지를 버린다
+                queue.get_nowait()
+                self.dropped += 1
+                logger.warning("mail stream queue full for %s; dropped oldest message", channel)
+            queue.put_nowait(data)
+
+    async def _listen(self):
+        while True:
+            client = aioredis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(self.pattern)
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    self.dispatch(channel, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 연결이 끊겨도 구독자 큐는 유지한 채 재연결
+                logger.exception("mail stream listener failed; reconnecting")
+                await asyncio.sleep(MAIL_STREAM_RECONNECT_SECONDS)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+_multiplexers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, MailStreamMultiplexer]" = weakref.WeakKeyDictionary()
+
+
+def get_mail_stream_multiplexer() -> MailStreamMultiplexer:
+    loop = asyncio.get_running_loop()
+    multiplexer = _multiplexers.get(loop)
+    if multiplexer is None:
+        multiplexer = MailStreamMultiplexer(_redis_url())
+        _multiplexers[loop] = multiplexer
+    return multiplexer
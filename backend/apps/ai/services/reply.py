@@ -1,25 +1,23 @@
-import asyncio
-import queue
-import threading
 import time
-from collections.abc import Generator
+from collections.abc import AsyncGenerator
 
 from apps.ai.services.chains import reply_body_chain, reply_plan_chain
-from apps.ai.services.pii_masker import PiiMasker, make_req_id, unmask_stream
-from apps.ai.services.utils import build_prompt_inputs, collect_prompt_context, sse_event
-from apps.core.utils.async_stream import as_async_stream
-
-
-@as_async_stream
-def stream_reply_options_llm(
-    *,
-    user,
-    subject: str | None,
-    body: str | None,
-    to_email: str,
-    attachments: list[dict] | None = None,
-) -> Generator[str]:
-    ctx = collect_prompt_context(user, [to_email])
+from apps.ai.services.pii_masker import PiiMasker, aunmask_stream, make_req_id, unmask_stream
+from apps.ai.services.reply_prefetch import REPLY_PREFETCH_BODY_OPTIONS, get_prefetched_reply, set_prefetched_reply
+from apps.ai.services.utils import (
+    acollect_prompt_context,
+    build_prompt_inputs,
+    collect_prompt_context,
+    get_attachments_for_message,
+    sse_event,
+)
+from apps.core.utils.async_stream import IDLE, merge_async_iterators
+
+PING_INTERVAL_SECONDS = 10
+MAX_REPLY_OPTIONS = 4
+
+
+def _reply_inputs(ctx: dict, subject: str | None, body: str | None, attachments: list[dict] | None) -> dict:
     raw = build_prompt_inputs(
         ctx,
         extra={
@@ -28,19 +26,11 @@ def stream_reply_options_llm(
     )
     raw["incoming_subject"] = subject or ""
     raw["incoming_body"] = body or ""
+    return raw
 
-    req_id = make_req_id()
-    masker = PiiMasker(req_id)
-    masked_inputs, mapping = masker.mask_inputs(raw)
 
-    def unmask(chunks: list[str]) -> list[str]:
-        return list(unmask_stream(chunks, req_id, mapping))
-
-    # ready
-    yield sse_event("ready", {"ts": int(time.time() * 1000)}, retry_ms=5000)
-
-    # 옵션 설계
-    plan_inputs = {
+def _plan_inputs(masked_inputs: dict) -> dict:
+    return {
         "incoming_subject": masked_inputs["incoming_subject"],
         "incoming_body": masked_inputs["incoming_body"],
         "language": masked_inputs.get("language"),
@@ -51,38 +41,13 @@ def stream_reply_options_llm(
         "recipient_role": masked_inputs.get("recipient_role"),
         "attachments": masked_inputs.get("attachments", []),
     }
-    try:
-        plan = reply_plan_chain.invoke(plan_inputs)
-    except Exception as e:
-        print(e)
-        plan = type(
-            "FallbackPlan",
-            (object,),
-            {
-                "language": masked_inputs.get("language") or "user's original language",
-                "options": [
-                    type("Opt", (object,), {"type": "Concise reply", "title": "Quick confirmation"})(),
-                    type("Opt", (object,), {"type": "Follow-up", "title": "A few clarifications"})(),
-                ],
-            },
-        )()
-
-    items = []
-    for i, opt in enumerate(plan.options[:4]):
-        title = "".join(unmask([opt.title])).strip().rstrip(" .」")
-        otype = "".join(unmask([opt.type])).strip()
-        items.append({"id": i, "type": otype, "title": title})
-
-    next_eid = 0
-    yield sse_event("options", {"count": len(items), "items": items}, eid=str(next_eid))
-    next_eid += 1
 
-    q: queue.Queue[tuple[str, dict]] = queue.Queue()
 
-    masked_common = {
+def _option_inputs(masked_inputs: dict, language: str, locked_type: str, locked_title: str) -> dict:
+    return {
         "incoming_subject": masked_inputs["incoming_subject"],
         "incoming_body": masked_inputs["incoming_body"],
-        "language": plan.language,
+        "language": language,
         "recipients": masked_inputs.get("recipients"),
         "group_description": masked_inputs.get("group_description"),
         "prompt_text": masked_inputs.get("prompt_text"),
@@ -92,59 +57,141 @@ def stream_reply_options_llm(
         "fewshots": masked_inputs.get("fewshots"),
         "profile": masked_inputs.get("profile"),
         "attachments": masked_inputs.get("attachments", []),
+        "locked_type": locked_type,
+        "locked_title": locked_title,
     }
 
-    def worker(opt_idx: int, locked_type: str, locked_title: str):
-        async def produce():
-            seq = 0
-            inputs = {
-                **masked_common,
-                "locked_type": locked_type,
-                "locked_title": locked_title,
-            }
-            try:
-                async for chunk in reply_body_chain.astream(inputs):
-                    if not chunk:
-                        continue
-                    for piece in unmask([chunk]):
-                        if piece:
-                            q.put(("option.delta", {"id": opt_idx, "seq": seq, "text": piece}))
-                            seq += 1
-            except Exception as e:
-                q.put(("option.error", {"id": opt_idx, "message": str(e)}))
-            finally:
-                q.put(("option.done", {"id": opt_idx, "total_seq": seq}))
-
-        # 각 워커 스레드 내에서 이벤트 루프 실행
-        asyncio.run(produce())
-
-    threads = []
-    for it in items:
-        t = threading.Thread(
-            target=worker,
-            args=(it["id"], it["type"], it["title"]),
-            daemon=True,
+
+def _option_items(plan, req_id: str, mapping: dict[int, str]) -> list[dict]:
+    def unmask(text: str) -> str:
+        return "".join(unmask_stream([text], req_id, mapping))
+
+    items = []
+    for i, opt in enumerate(plan.options[:MAX_REPLY_OPTIONS]):
+        title = unmask(opt.title).strip().rstrip(" .」")
+        otype = unmask(opt.type).strip()
+        items.append({"id": i, "type": otype, "title": title})
+    return items
+
+
+def prefetch_reply_options(user, message_id: str, subject: str | None, body: str | None, to_email: str) -> bool:
+    """
+    메일을 열었을 때(Celery) 답장 옵션 설계와 앞쪽 REPLY_PREFETCH_BODY_OPTIONS 개 본문을 미리 만들어 캐시에 둔다.
+    LLM 에는 라이브 경로와 같은 마스킹된 입력만 보내고, 캐시에는 클라이언트에 보낼 (복원된) 옵션만 저장한다.
+    """
+    ctx = collect_prompt_context(user, [to_email])
+    attachments = get_attachments_for_message(user, message_id)
+    raw = _reply_inputs(ctx, subject, body, attachments)
+
+    req_id = make_req_id()
+    masked_inputs, mapping = PiiMasker(req_id).mask_inputs(raw)
+    try:
+        plan = reply_plan_chain.invoke(_plan_inputs(masked_inputs))
+        items = _option_items(plan, req_id, mapping)
+
+        prefetched = items[:REPLY_PREFETCH_BODY_OPTIONS]
+        bodies = reply_body_chain.batch(
+            [_option_inputs(masked_inputs, plan.language, it["type"], it["title"]) for it in prefetched],
+            return_exceptions=True,
         )
-        t.start()
-        threads.append(t)
+        for it, masked_body in zip(prefetched, bodies, strict=True):
+            if isinstance(masked_body, str) and masked_body:
+                it["body"] = "".join(unmask_stream([masked_body], req_id, mapping))
+    except Exception:
+        return False  # 실패한 설계는 저장하지 않음 (답장 시 라이브로 생성)
+    finally:
+        mapping.clear()
+
+    set_prefetched_reply(user.id, message_id, to_email, ctx, attachments, {"language": plan.language, "items": items})
+    return True
+
+
+async def stream_reply_options_llm(
+    *,
+    user,
+    subject: str | None,
+    body: str | None,
+    to_email: str,
+    attachments: list[dict] | None = None,
+    message_id: str | None = None,
+) -> AsyncGenerator[str]:
+    # ORM 접근은 여기 한 번뿐, 옵션 스트림들은 스레드 없이 같은 이벤트 루프의 태스크로 돈다
+    ctx = await acollect_prompt_context(user, [to_email])
+    raw = _reply_inputs(ctx, subject, body, attachments)
+
+    req_id = make_req_id()
+    masker = PiiMasker(req_id)
+    masked_inputs, mapping = masker.mask_inputs(raw)
+
+    # ready
+    yield sse_event("ready", {"ts": int(time.time() * 1000)}, retry_ms=5000)
 
-    last_ping = time.monotonic()
-    alive = True
-    while alive or not q.empty():
+    # 메일을 열 때 미리 만들어 둔 옵션이 같은 컨텍스트로 있으면 설계 호출 없이 바로 재생
+    prefetched = get_prefetched_reply(user.id, message_id, to_email, ctx, attachments) if message_id else None
+    if prefetched is not None:
+        language = prefetched["language"]
+        items = [{"id": it["id"], "type": it["type"], "title": it["title"]} for it in prefetched["items"]]
+        bodies = {it["id"]: it["body"] for it in prefetched["items"] if it.get("body")}
+    else:
+        # 옵션 설계
         try:
-            event, payload = q.get(timeout=0.5)
-            # 본문/완료 이벤트들: id 증가
-            yield sse_event(event, payload, eid=str(next_eid))
-            next_eid += 1
-        except queue.Empty:
-            pass
+            plan = await reply_plan_chain.ainvoke(_plan_inputs(masked_inputs))
+        except Exception as e:
+            print(e)
+            plan = type(
+                "FallbackPlan",
+                (object,),
+                {
+                    "language": masked_inputs.get("language") or "user's original language",
+                    "options": [
+                        type("Opt", (object,), {"type": "Concise reply", "title": "Quick confirmation"})(),
+                        type("Opt", (object,), {"type": "Follow-up", "title": "A few clarifications"})(),
+                    ],
+                },
+            )()
+        language = plan.language
+        items = _option_items(plan, req_id, mapping)
+        bodies = {}
 
-        # 10초마다 ping
-        if time.monotonic() - last_ping > 10:
-            yield sse_event("ping", {})
-            last_ping = time.monotonic()
+    next_eid = 0
+    yield sse_event("options", {"count": len(items), "items": items}, eid=str(next_eid))
+    next_eid += 1
 
-        alive = any(t.is_alive() for t in threads)
+    async def option_events(opt_idx: int, locked_type: str, locked_title: str) -> AsyncGenerator[tuple[str, dict]]:
+        if opt_idx in bodies:
+            yield "option.delta", {"id": opt_idx, "seq": 0, "text": bodies[opt_idx]}
+            yield "option.done", {"id": opt_idx, "total_seq": 1}
+            return
+
+        seq = 0
+        inputs = _option_inputs(masked_inputs, language, locked_type, locked_title)
+        try:
+            async for piece in aunmask_stream(reply_body_chain.astream(inputs), req_id, mapping):
+                if piece:
+                    yield "option.delta", {"id": opt_idx, "seq": seq, "text": piece}
+                    seq += 1
+        except Exception as e:
+            yield "option.error", {"id": opt_idx, "message": str(e)}
+        yield "option.done", {"id": opt_idx, "total_seq": seq}
+
+    # 옵션 스트림들을 한 이벤트 루프에서 동시에 돌리고 도착 순서대로 내보냄 (옵션당 스레드/폴링 없음)
+    merged = merge_async_iterators(*(option_events(it["id"], it["type"], it["title"]) for it in items), idle_timeout=PING_INTERVAL_SECONDS)
+    try:
+        last_ping = time.monotonic()
+        async for item in merged:
+            if item is not IDLE:
+                event, payload = item
+                # 본문/완료 이벤트들: id 증가
+                yield sse_event(event, payload, eid=str(next_eid))
+                next_eid += 1
+
+            # 10초마다 ping
+            if time.monotonic() - last_ping > PING_INTERVAL_SECONDS:
+                yield sse_event("ping", {})
+                last_ping = time.monotonic()
+    finally:
+        # 클라이언트가 끊긴 경우 남은 옵션 스트림 정리
+        await merged.aclose()
+        mapping.clear()
 
-    mapping.clear()
     yield sse_event("done", {"reason": "all_options_finished"}, eid=str(next_eid))
@@ -0,0 +1,58 @@
+"""
+메일을 열 때 미리 만든 답장 옵션 캐시.
+
+- 키: 유저 + message_id + 답장 대상 + 컨텍스트 버전(수신자 컨텍스트/분석/스타일 + 첨부 분석의 정규화 hash)
+  → Gmail 메시지는 바뀌지 않으므로 본문은 message_id 로 식별하고, 연락처/프롬프트 옵션/분석/첨부가 바뀌면 키도 바뀐다
+  (클라이언트는 제목에 "Re:" 를 붙여 보내므로 요청의 subject/body 는 키에 넣지 않는다)
+- 값: 옵션 목록(id/type/title)과 앞쪽 REPLY_PREFETCH_BODY_OPTIONS 개의 본문 — 클라이언트에 그대로 보낼 복원된 텍스트
+- 같은 메일을 여러 번 열어도 한 번만 enqueue 되도록 claim 키를 둔다
+- prefetch 는 celery worker 가 쓰고 웹 서버가 읽으므로, 프로세스 로컬 캐시(CACHE_URL 미설정)에서는 enqueue 하지 않는다
+"""
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+
+from apps.ai.services.suggestion_cache import prompt_digest
+
+# 프롬프트/모델을 바꾸면 올려서 이전 결과를 버림
+REPLY_PREFETCH_VERSION = 1
+REPLY_PREFETCH_KEY = "reply_prefetch:{user_id}:v{version}:{message_id}:{digest}"
+REPLY_PREFETCH_CLAIM_KEY = "reply_prefetch_claim:{user_id}:v{version}:{message_id}"
+REPLY_PREFETCH_TTL_SECONDS = 30 * 60
+REPLY_PREFETCH_CLAIM_SECONDS = 5 * 60
+# 미리 본문까지 만들어 둘 옵션 수 (나머지는 답장을 누를 때 라이브로 스트리밍)
+REPLY_PREFETCH_BODY_OPTIONS = 2
+
+# 프로세스마다 따로 두는 캐시: 다른 프로세스가 쓴 값을 읽을 수 없다
+_PROCESS_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def _key(user_id: int, message_id: str, to_email: str, ctx: dict, attachments: list[dict] | None) -> str:
+    digest = prompt_digest({"to_email": to_email.strip().lower(), "ctx": ctx, "attachments": attachments or []})
+    return REPLY_PREFETCH_KEY.format(user_id=user_id, version=REPLY_PREFETCH_VERSION, message_id=message_id, digest=digest)
+
+
+def shared_cache_configured() -> bool:
+    return settings.CACHES[DEFAULT_CACHE_ALIAS]["BACKEND"] not in _PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def claim_reply_prefetch(user_id: int, message_id: str) -> bool:
+    """
+    이 메일의 prefetch 를 지금 enqueue 해도 되면 True (claim 유효 시간 안의 중복 요청은 False).
+    공유 캐시가 없으면 만든 결과를 답장 요청에서 읽을 수 없으므로 항상 False.
+    """
+    if not shared_cache_configured():
+        return False
+    key = REPLY_PREFETCH_CLAIM_KEY.format(user_id=user_id, version=REPLY_PREFETCH_VERSION, message_id=message_id)
+    return cache.add(key, 1, timeout=REPLY_PREFETCH_CLAIM_SECONDS)
+
+
+def get_prefetched_reply(user_id: int, message_id: str, to_email: str, ctx: dict, attachments: list[dict] | None) -> dict | None:
+    return cache.get(_key(user_id, message_id, to_email, ctx, attachments))
+
+
+def set_prefetched_reply(user_id: int, message_id: str, to_email: str, ctx: dict, attachments: list[dict] | None, prefetched: dict) -> None:
+    cache.set(_key(user_id, message_id, to_email, ctx, attachments), prefetched, timeout=REPLY_PREFETCH_TTL_SECONDS)
@@ -0,0 +1,102 @@
+"""
+suggest_mail_text 응답 캐시.
+
+- 키: 렌더링 직전 prompt inputs 전체(수신자/분석/스타일 컨텍스트 + subject/body/cursor 분할 + target)의 정규화 hash
+  → 같은 입력으로 다시 요청하면(토글, 재시도) LLM 호출 없이 바로 응답. 컨텍스트가 바뀌면 키도 바뀐다
+- 유저별 네임스페이스 (suggest:{user_id}:...) 로 다른 유저와 절대 공유하지 않음
+- 유저마다 최근 사용 순서 인덱스를 두고 SUGGESTION_CACHE_MAX_ENTRIES 개를 넘으면 가장 오래 안 쓴 것부터 지움 (LRU)
+  인덱스 갱신은 원자적이지 않아 동시 요청에서 순서가 어긋날 수 있지만, 놓친 엔트리도 TTL로 만료된다
+- prefix tier: 정확히 같은 입력이 없을 때, 이전 제안을 그대로 따라 타이핑한 경우(이전 body_before + 제안의 앞부분
+  == 현재 body_before) 제안의 남은 부분을 돌려준다
+"""
+
+import hashlib
+import json
+import unicodedata
+
+from django.core.cache import cache
+
+# 프롬프트/모델을 바꾸면 올려서 이전 응답을 버림
+SUGGESTION_CACHE_VERSION = 1
+SUGGESTION_CACHE_ENTRY_KEY = "suggest:{user_id}:v{version}:{digest}"
+SUGGESTION_CACHE_INDEX_KEY = "suggest_idx:{user_id}:v{version}"
+SUGGESTION_CACHE_PREFIX_KEY = "suggest_prefix:{user_id}:v{version}:{digest}"
+SUGGESTION_CACHE_TTL_SECONDS = 30 * 60
+SUGGESTION_CACHE_MAX_ENTRIES = 200
+# prefix tier 에서 입력(본문 앞부분 제외)이 같은 최근 제안을 몇 개까지 비교할지
+SUGGESTION_PREFIX_CANDIDATES = 5
+
+# prefix tier 키에서 빠지는 필드 (나머지는 정확히 같아야 함)
+_TYPED_FIELDS = ("body", "body_before")
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return unicodedata.normalize("NFC", value.replace("\r\n", "\n"))
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, list | tuple):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def prompt_digest(prompt_inputs: dict) -> str:
+    raw = json.dumps(_normalize(prompt_inputs), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _entry_key(user_id: int, prompt_inputs: dict) -> str:
+    return SUGGESTION_CACHE_ENTRY_KEY.format(user_id=user_id, version=SUGGESTION_CACHE_VERSION, digest=prompt_digest(prompt_inputs))
+
+
+def _prefix_key(user_id: int, prompt_inputs: dict) -> str:
+    rest = {k: v for k, v in prompt_inputs.items() if k not in _TYPED_FIELDS}
+    return SUGGESTION_CACHE_PREFIX_KEY.format(user_id=user_id, version=SUGGESTION_CACHE_VERSION, digest=prompt_digest(rest))
+
+
+def _touch(user_id: int, key: str) -> None:
+    index_key = SUGGESTION_CACHE_INDEX_KEY.format(user_id=user_id, version=SUGGESTION_CACHE_VERSION)
+    index = [k for k in cache.get(index_key, []) if k != key]
+    index.append(key)
+    evicted, index = index[:-SUGGESTION_CACHE_MAX_ENTRIES], index[-SUGGESTION_CACHE_MAX_ENTRIES:]
+    if evicted:
+        cache.delete_many(evicted)
+    cache.set(index_key, index, timeout=SUGGESTION_CACHE_TTL_SECONDS)
+
+
+def _typed_through(prompt_inputs: dict, candidates: list[tuple[str, str]]) -> str | None:
+    body_before = _normalize(prompt_inputs.get("body_before") or "")
+    for cached_before, suggestion in reversed(candidates):
+        if not body_before.startswith(cached_before):
+            continue
+        typed = body_before[len(cached_before) :]
+        if typed and suggestion.startswith(typed) and len(suggestion) > len(typed):
+            return suggestion[len(typed) :]
+    return None
+
+
+def get_cached_suggestion(user_id: int, prompt_inputs: dict, use_prefix: bool = True) -> str | None:
+    key = _entry_key(user_id, prompt_inputs)
+    suggestion = cache.get(key)
+    if suggestion is not None:
+        _touch(user_id, key)
+        return suggestion
+
+    if use_prefix and prompt_inputs.get("target") == "body":
+        return _typed_through(prompt_inputs, cache.get(_prefix_key(user_id, prompt_inputs), []))
+    return None
+
+
+def set_cached_suggestion(user_id: int, prompt_inputs: dict, suggestion: str) -> None:
+    if not suggestion:
+        return  # 빈 응답은 일시적인 실패일 수 있으므로 저장하지 않음
+
+    key = _entry_key(user_id, prompt_inputs)
+    cache.set(key, suggestion, timeout=SUGGESTION_CACHE_TTL_SECONDS)
+    _touch(user_id, key)
+
+    if prompt_inputs.get("target") == "body":
+        prefix_key = _prefix_key(user_id, prompt_inputs)
+        candidates = cache.get(prefix_key, [])
+        candidates.append((_normalize(prompt_inputs.get("body_before") or ""), suggestion))
+        cache.set(prefix_key, candidates[-SUGGESTION_PREFIX_CANDIDATES:], timeout=SUGGESTION_CACHE_TTL_SECONDS)
@@ -6,11 +6,13 @@ import tempfile
 from typing import Any
 
 import pandas as pd
+from asgiref.sync import sync_to_async
 from django.db.models import Prefetch
 from django.db.models.functions import Length
 from langchain_community.document_loaders import CSVLoader, Docx2txtLoader, PDFPlumberLoader, TextLoader
 
 from apps.ai.models import ContactAnalysisResult, GroupAnalysisResult
+from apps.ai.services.context_cache import get_cached_prompt_context, prompt_context_key, set_cached_prompt_context
 from apps.contact.models import Contact, PromptOption
 from apps.mail.models import AttachmentAnalysis, SentMail
 from apps.user.models import UserProfile
@@ -59,22 +61,57 @@ def collect_prompt_context(
         "recipient_role": str | None,
         "language": str | None,
       }
+
+    결과는 (user, 정렬된 수신자, 플래그) 단위로 캐시되며 관련 모델 변경 시 apps.ai.signals 에서 무효화된다.
+    recipients 라벨만 호출 순서에 맞춰 매번 다시 만든다.
+    """
+    key = prompt_context_key(
+        user.id,
+        to_emails,
+        include_analysis=include_analysis,
+        include_fewshots=include_fewshots,
+        fewshot_k=fewshot_k,
+        min_body_len=min_body_len,
+    )
+    cached = get_cached_prompt_context(key)
+    if cached is None:
+        cached = _build_prompt_context(user, to_emails, include_analysis, include_fewshots, fewshot_k, min_body_len)
+        set_cached_prompt_context(key, cached)
+
+    names, ctx = cached
+    return {"recipients": _recipient_labels(to_emails, names), **ctx}
+
+
+async def acollect_prompt_context(user, to_emails: list[str], **kwargs) -> dict[str, Any]:
     """
+    async 스트림용: 캐시 조회와 ORM 쿼리를 스트림 시작 전에 한 번의 sync 스레드 hop 으로 끝낸다.
+    (Django async ORM 도 쿼리마다 sync 스레드로 넘어가므로, 쿼리 묶음을 한 번에 보내는 편이 hop 이 적다)
+    """
+    return await sync_to_async(collect_prompt_context)(user, to_emails, **kwargs)
+
+
+def _recipient_labels(to_emails: list[str], names: dict[str, str]) -> list[str]:
+    # 연락처 있으면 이름, 없으면 "Recipient {i}"
+    return [names.get(em) or f"Recipient {i}" for i, em in enumerate(to_emails, start=1)]
+
+
+def _build_prompt_context(
+    user,
+    to_emails: list[str],
+    include_analysis: bool,
+    include_fewshots: bool,
+    fewshot_k: int,
+    min_body_len: int,
+) -> tuple[dict[str, str], dict[str, Any]]:
+    """Uncached body of collect_prompt_context: (email -> contact name, context without "recipients")."""
     contacts = list(
         Contact.objects.select_related("context", "group")
         .prefetch_related(Prefetch("group__options", queryset=PromptOption.objects.all()))
         .filter(user=user, email__in=to_emails)
     )
 
-    # email -> contact 매핑
-    by_email = {c.email: c for c in contacts}
-
-    # 1) recipients: 연락처 있으면 이름, 없으면 "Recipient {i}"
-    recipients: list[str] = []
-    for i, em in enumerate(to_emails, start=1):
-        c = by_email.get(em)
-        label = c.name.strip() if c and getattr(c, "name", None) else None
-        recipients.append(label if label else f"Recipient {i}")
+    # 1) recipients 라벨용 email -> name (이름이 비어 있으면 "Recipient {i}"로 대체되도록 제외)
+    names = {c.email: c.name.strip() for c in contacts if c.name and c.name.strip()}
 
     # 그룹 계산용 등록 그룹만 추출
     groups = [c.group for c in contacts if c.group_id]
@@ -103,7 +140,6 @@ def collect_prompt_context(
         }
 
     base = {
-        "recipients": recipients,
         "group_name": None,
         "group_description": None,
         "prompt_options": [],
@@ -117,7 +153,7 @@ def collect_prompt_context(
     }
 
     if not contacts:
-        return base
+        return names, base
 
     # ========== 단일 '등록' 수신자 ==========
     if len(contacts) == 1 and len(to_emails) == 1:
@@ -140,7 +176,7 @@ def collect_prompt_context(
             out["fewshots"] = _fetch_fewshot_bodies_for_single(user, c, fewshot_k, min_body_len)
         if include_analysis:
             out["analysis"] = _fetch_analysis_for_single(user, c)
-        return out
+        return names, out
 
     # ========== 여러 명, 같은 그룹 ==========
     if len(unique_groups) == 1:
@@ -155,7 +191,7 @@ def collect_prompt_context(
             out["fewshots"] = _fetch_fewshot_bodies_for_group(user, g, fewshot_k, min_body_len)
         if include_analysis:
             out["analysis"] = _fetch_analysis_for_group(user, g)
-        return out
+        return names, out
 
     # ========== 여러 그룹: 공통 옵션 교집합 ==========
     id_sets: list[set[int]] = [set(o.id for o in get_group_opts(g)) for g in unique_groups]
@@ -167,7 +203,7 @@ def collect_prompt_context(
 
     group_names = ", ".join([g.name for g in unique_groups if g and g.name]) or None
 
-    return {
+    return names, {
         **base,
         "group_name": group_names,
         "group_description": None,
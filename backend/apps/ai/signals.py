@@ -0,0 +1,61 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.contact.models import Contact, ContactContext, Group, PromptOption
+from apps.mail.models import SentMail
+from apps.user.models import UserProfile
+
+from .models import ContactAnalysisResult, GroupAnalysisResult
+from .services.context_cache import bump_prompt_context_version
+
+# collect_prompt_context 가 읽는 모델들: 바뀌면 해당 유저의 프롬프트 컨텍스트 캐시를 버린다
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=ContactAnalysisResult)
+@receiver(post_delete, sender=ContactAnalysisResult)
+@receiver(post_save, sender=GroupAnalysisResult)
+@receiver(post_delete, sender=GroupAnalysisResult)
+@receiver(post_save, sender=SentMail)
+@receiver(post_delete, sender=SentMail)
+def invalidate_user_prompt_context(sender, instance, **kwargs):
+    bump_prompt_context_version(instance.user_id)
+
+
+@receiver(post_save, sender=ContactContext)
+@receiver(post_delete, sender=ContactContext)
+def invalidate_contact_context_prompt_context(sender, instance, **kwargs):
+    # Contact 삭제로 인한 cascade 라면 Contact 쪽 signal이 이미 무효화한다
+    user_id = Contact.objects.filter(pk=instance.contact_id).values_list("user_id", flat=True).first()
+    bump_prompt_context_version(user_id)
+
+
+@receiver(post_save, sender=PromptOption)
+@receiver(pre_delete, sender=PromptOption)  # 삭제 후에는 그룹 연결(M2M)이 사라져 대상 유저를 찾을 수 없다
+def invalidate_prompt_option_prompt_context(sender, instance, **kwargs):
+    # 시스템 옵션(created_by=NULL)도 여러 유저의 그룹에 연결될 수 있으므로 연결된 그룹 소유자 전부
+    user_ids = set(Group.objects.filter(options=instance).values_list("user_id", flat=True))
+    user_ids.add(instance.created_by_id)
+    for user_id in user_ids:
+        bump_prompt_context_version(user_id)
+
+
+@receiver(m2m_changed, sender=Group.options.through)
+def invalidate_group_options_prompt_context(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+
+    if not reverse:
+        # group.options.add/remove/clear(...)
+        bump_prompt_context_version(instance.user_id)
+        return
+
+    # option.groups.add/remove(...): pk_set = group ids (clear는 pre_clear 시점에만 연결된 그룹을 알 수 있음)
+    groups = Group.objects.filter(pk__in=pk_set) if pk_set else Group.objects.filter(options=instance)
+    for user_id in set(groups.values_list("user_id", flat=True)):
+        bump_prompt_context_version(user_id)
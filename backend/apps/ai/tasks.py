@@ -1,210 +1,101 @@
+import logging
 from datetime import timedelta
 
 from celery import shared_task
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from django.db.models import Count
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 
 from apps.mail.models import AttachmentAnalysis
 
 from ..contact.models import Contact
-from ..mail.services import list_emails_logic
-from .models import ContactAnalysisResult, GroupAnalysisResult, MailAnalysisResult
-from .services.analysis import analyze_speech_llm, integrate_analysis
+from .models import MailAnalysisResult
+from .services.analysis import analyze_speech_llm
+from .services.analysis_dedup import (
+    content_hash,
+    dedup_report,
+    find_text_analyses,
+    link_text_analysis,
+    purge_text_analyses,
+    record_dedup_stat,
+    save_text_analysis,
+)
+from .services.analysis_integration import integrate_pending_analyses
+from .services.mail_analysis_backfill import BACKFILL_DEBOUNCE_SECONDS, request_contact_backfill, run_backfill
+from .services.reply import prefetch_reply_options
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+# delete_up_n 이 한 번의 DELETE 로 지우는 최대 행 수 (긴 잠금/큰 트랜잭션 방지)
+MAIL_ANALYSIS_DELETE_BATCH_SIZE = 5000
 
 
 @shared_task(bind=True, max_retries=3)
 def analyze_speech(self, user_id, subject, body, to_emails):
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    if not User.objects.filter(id=user_id).exists():
         return None
 
     # langchain 이용하여 주어진 메일로 사용자의 말투를 분석한다.
     try:
-        analysis_result = analyze_speech_llm(subject, body).model_dump()
-        contacts = Contact.objects.filter(email__in=to_emails, user_id=user_id)
-
-        with transaction.atomic():
-            for contact in contacts:
-                result = MailAnalysisResult.objects.create(
-                    user=user,
-                    contact=contact,
-                    lexical_style=analysis_result["lexical_style"],
-                    grammar_patterns=analysis_result["grammar_patterns"],
-                    emotional_tone=analysis_result["emotional_tone"],
-                    representative_sentences=analysis_result["representative_sentences"],
-                )
-
-                # 해당 (user, contact)에 해당하는 ContactAnalysisResult이 없다면 방금 분석된 결과를 필드에 그대로 넣어줌
-                if not ContactAnalysisResult.objects.filter(user=user, contact=contact).exists():
-                    ContactAnalysisResult.objects.create(
-                        user=user,
-                        contact=contact,
-                        last_analysis_id=result.id,
-                        lexical_style=result.lexical_style,
-                        grammar_patterns=result.grammar_patterns,
-                        emotional_tone=result.emotional_tone,
-                        representative_sentences=result.representative_sentences,
-                    )
-
-                # 해당 (user, contact.group)에 해당하는 GroupAnalysisResult이 없다면 방금 분석된 결과를 필드에 그대로 넣어줌
-                if contact.group and not GroupAnalysisResult.objects.filter(user=user, group=contact.group).exists():
-                    GroupAnalysisResult.objects.create(
-                        user=user,
-                        group=contact.group,
-                        last_analysis_id=result.id,
-                        lexical_style=result.lexical_style,
-                        grammar_patterns=result.grammar_patterns,
-                        emotional_tone=result.emotional_tone,
-                        representative_sentences=result.representative_sentences,
-                    )
+        contacts = list(Contact.objects.filter(email__in=to_emails, user_id=user_id).only("id", "group_id"))
+        if not contacts:
+            return None  # 등록된 연락처가 없으면 저장할 곳이 없으므로 LLM 호출도 하지 않음
+
+        # 같은 (정규화된) 제목/본문은 한 번만 분석하고 저장된 결과를 재사용한다
+        digest = content_hash(subject, body)
+        text_analysis = find_text_analyses(user_id, [digest]).get(digest)
+        if text_analysis is None:
+            text_analysis = save_text_analysis(user_id, digest, analyze_speech_llm(subject, body).model_dump())
+            record_dedup_stat(llm_calls=1)
+        else:
+            record_dedup_stat(reused=1)
+        link_text_analysis(user_id, contacts, text_analysis)
 
     except Exception as e:
         self.retry(exc=e, countdown=2**self.request.retries)
 
 
-# 주기적으로 n개의 AnalysisResult를 통합하여 분석 결과를 만드는 task -> group 단위 + contact 단위
+# 주기적으로 새 MailAnalysisResult 가 생긴 (user, contact) / (user, group) 키만 꺼내 통합 분석 결과를 갱신하는 task
+# (키는 analyze_speech 가 mark_analysis_dirty 로 넣는다. 새 분석이 없는 쌍은 건드리지 않음)
 @shared_task(bind=True, max_retries=3)
 def unified_analysis(self, n=10):
     try:
-        # 모든 (user, contact) 쌍에 대해 MailAnalysisResult에 해당하는 row들을 찾는다.
-        # 가장 id가 큰 row의 id와 ContactAanlysisResult의 last_analysis_id 필드를 비교한다. 전자가 더 크면 이후의 작업을 수행한다.
-        # 최근 n개의 row를 반환한다. 각 필드별로 리스트를 묶는다.
-        # integrate_analysis() 함수를 호출한다.
-        # 반환된 결과를 ContactAnalysisResult 필드에 저장(업데이트)한다.
-
-        contact_pairs = MailAnalysisResult.objects.values("user", "contact").distinct()
-
-        for pair in contact_pairs:
-            user_id = pair["user_id"]
-            contact_id = pair["contact_id"]
-
-            results_qs = MailAnalysisResult.objects.filter(user_id=user_id, contact_id=contact_id).order_by("-id")
-            latest = results_qs.first()
-            if not latest:
-                continue
-
-            latest_mail_id = latest.id
-
-            contact_result, _ = ContactAnalysisResult.objects.get_or_create(
-                user_id=user_id,
-                contact_id=contact_id,
-            )
-
-            # 이미 최신 분석이 적용된 경우 skip
-            if contact_result.last_analysis_id == latest_mail_id:
-                continue
-
-            # 최근 n개를 선택
-            latest_n_results = list(results_qs[:n])
-
-            # 각 필드 리스트로 묶기
-            data = [
-                {
-                    "lexical_style": r.lexical_style,
-                    "grammar_patterns": r.grammar_patterns,
-                    "emotional_tone": r.emotional_tone,
-                    "representative_sentences": r.representative_sentences,
-                }
-                for r in latest_n_results
-            ]
-
-            # 통합 분석 수행
-            unified = integrate_analysis(data).model_dump()
-
-            # ContactAnalysisResult 업데이트
-            contact_result.lexical_style = unified["lexical_style"]
-            contact_result.grammar_patterns = unified["grammar_patterns"]
-            contact_result.emotional_tone = unified["emotional_tone"]
-            contact_result.representative_sentences = unified["representative_sentences"]
-            contact_result.last_analysis_id = latest_mail_id
-
-            contact_result.save()
-
-        # 마찬가지로 group 단위 통합 분석을 수행한다.
-        group_pairs = MailAnalysisResult.objects.values("user", "contact__group").distinct()
-
-        for pair in group_pairs:
-            user_id = pair["user_id"]
-            group_id = pair["contact__group_id"]
-
-            # 그룹이 없는 경우(None) 스킵
-            if group_id is None:
-                continue
-
-            results_qs = MailAnalysisResult.objects.filter(user_id=user_id, contact__group_id=group_id).order_by("-id")
-            latest = results_qs.first()
-            if not latest:
-                continue
-
-            latest_mail_id = latest.id
-
-            # GroupAnalysisResult 객체 가져오거나 생성 -> 반드시 존재함
-            group_result, _ = GroupAnalysisResult.objects.get_or_create(
-                user_id=user_id,
-                group_id=group_id,
-            )
-
-            # 이미 최신 분석이 적용된 경우 skip
-            if group_result.last_analysis_id == latest_mail_id:
-                continue
-
-            # 최근 n개를 선택
-            latest_n_results = list(results_qs[:n])
-
-            # 각 필드 리스트로 묶기
-            data = [
-                {
-                    "lexical_style": r.lexical_style,
-                    "grammar_patterns": r.grammar_patterns,
-                    "emotional_tone": r.emotional_tone,
-                    "representative_sentences": r.representative_sentences,
-                }
-                for r in latest_n_results
-            ]
-            # 통합 분석 수행
-            unified = integrate_analysis(data).model_dump()
-
-            # GroupAnalysisResult 업데이트
-            group_result.lexical_style = unified["lexical_style"]
-            group_result.grammar_patterns = unified["grammar_patterns"]
-            group_result.emotional_tone = unified["emotional_tone"]
-            group_result.representative_sentences = unified["representative_sentences"]
-            group_result.last_analysis_id = latest_mail_id
-
-            group_result.save()
-
+        return integrate_pending_analyses(n=n)
     except Exception as e:
         self.retry(exc=e, countdown=2**self.request.retries)
 
 
 @shared_task
-def delete_up_n(n=10):
+def delete_up_n(n=10, batch_size=MAIL_ANALYSIS_DELETE_BATCH_SIZE):
     # MailAnalysis를 주기적으로 정리함. (그룹/개인에 대한 row n개 이상일 경우 가장 최근의 n개만 남겨두고 나머지 row는 삭제)
+    # contact 별 / group 별 순위를 ROW_NUMBER() 로 한 번에 계산해 남길 범위 밖의 id 를 한 쿼리로 찾고, batch_size 씩 나눠 지운다
+    newest_first = [F("created_at").desc(), F("id").desc()]
+    stale_ids = list(
+        MailAnalysisResult.objects.annotate(
+            contact_rank=Window(RowNumber(), partition_by=[F("contact_id")], order_by=newest_first),
+            group_rank=Window(RowNumber(), partition_by=[F("contact__group_id")], order_by=newest_first),
+        )
+        .filter(Q(contact_rank__gt=n) | Q(contact__group__isnull=False, group_rank__gt=n))
+        .values_list("id", flat=True)
+    )
 
-    # Contact 별 정리
-    contacts = MailAnalysisResult.objects.values("contact").annotate(count=Count("id")).filter(count__gt=n)
-
-    for entry in contacts:
-        extra_count = entry["count"] - n
-        old_ids = MailAnalysisResult.objects.filter(contact=entry["contact"]).order_by("created_at").values_list("id", flat=True)[:extra_count]
-        MailAnalysisResult.objects.filter(id__in=list(old_ids)).delete()
+    deleted = 0
+    for start in range(0, len(stale_ids), batch_size):
+        count, _ = MailAnalysisResult.objects.filter(id__in=stale_ids[start : start + batch_size]).delete()
+        deleted += count
+    return deleted
 
-    # Group 별 정리
-    groups = MailAnalysisResult.objects.values("contact__group").annotate(count=Count("id")).filter(count__gt=n)
 
-    for entry in groups:
-        extra_count = entry["count"] - n
-        old_ids = (
-            MailAnalysisResult.objects.filter(contact__group=entry["contact__group"])
-            .order_by("created_at")
-            .values_list("id", flat=True)[:extra_count]
-        )
-        MailAnalysisResult.objects.filter(id__in=list(old_ids)).delete()
+@shared_task
+def report_analysis_dedup(days=1):
+    # 말투 분석 중복 제거로 아낀 LLM 호출 수를 하루 단위로 남기고, 오래된 분석 저장소를 정리한다
+    for stat in dedup_report(days):
+        total = stat["llm_calls"] + stat["reused"]
+        saved = stat["reused"] / total if total else 0
+        logger.info(f"[analysis_dedup] {stat['date']}: llm_calls={stat['llm_calls']} reused={stat['reused']} saved={saved:.0%}")
+    return purge_text_analyses()
 
 
 @shared_task
@@ -213,55 +104,40 @@ def purge_old_attachment_analysis():
     AttachmentAnalysis.objects.filter(created_at__lt=cutoff).delete()
 
 
+@shared_task
+def backfill_contact_mail_analysis(user_id: int, contact_id: int, limit: int = 2) -> bool:
+    # 연락처 추가 시 호출. 바로 Gmail/LLM 을 부르지 않고 대기열에 넣은 뒤, 사용자마다 한 번만 backfill_mail_analysis 를 예약한다
+    if not Contact.objects.filter(id=contact_id, user_id=user_id).exists():
+        return False
+    if request_contact_backfill(user_id, contact_id):
+        backfill_mail_analysis.apply_async(args=[user_id, limit], countdown=BACKFILL_DEBOUNCE_SECONDS)
+    return True
+
+
 @shared_task(bind=True, max_retries=3)
-def backfill_contact_mail_analysis(self, user_id: int, contact_id: int, limit: int = 2) -> int:
+def backfill_mail_analysis(self, user_id: int, limit: int = 2) -> int:
+    # 대기 중인 연락처들에게 보낸 최근 메일(연락처당 limit 개)을 한 번에 찾아 분석한다. 분석/재사용한 본문 수를 돌려줌
     try:
         user = User.objects.get(id=user_id)
-        contact = Contact.objects.get(id=contact_id, user_id=user_id)
-    except (User.DoesNotExist, Contact.DoesNotExist):
+    except User.DoesNotExist:
         return 0
 
     try:
-        result, messages = list_emails_logic(
-            user,
-            max_results=limit,
-            page_token=None,
-            label_ids=["SENT"],
-            q=f"to:{contact.email}",  # ⭐️ Gmail 검색 쿼리
-        )
+        progress = run_backfill(user, per_contact_limit=limit)
     except Exception as e:
         try:
             raise self.retry(exc=e, countdown=2**self.request.retries)
         except self.MaxRetriesExceededError:
             return 0
 
-    if not messages:
-        return 0
-
-    analyzed_count = 0
-
-    for msg in messages:
-        subject = msg.get("subject") or ""
-        body = msg.get("body") or ""
-
-        if not (subject or body):
-            continue
+    return progress.analyzed + progress.reused if progress else 0
 
-        try:
-            analyze_speech.delay(
-                user_id=user_id,
-                subject=subject,
-                body=body,
-                to_emails=[contact.email],
-            )
-            analyzed_count += 1
-        except Exception as e:
-            import logging
-
-            logging.warning(
-                f"[backfill_contact_mail_analysis] failed to enqueue analyze_speech "
-                f"user={user_id}, contact={contact_id}, msg_id={msg.get('id')}: {e}"
-            )
-            continue
 
-    return analyzed_count
+@shared_task
+def prefetch_reply(user_id: int, message_id: str, subject: str, body: str, to_email: str) -> bool:
+    # EmailDetailView 에서 수신 메일을 열 때 enqueue → 답장 버튼을 누르면 ReplyOptionsStreamView 가 캐시를 바로 재생
+    try:
+        user = User.objects.get(id=user_id)
+    except User.DoesNotExist:
+        return False
+    return prefetch_reply_options(user, message_id, subject, body, to_email)
@@ -4,6 +4,7 @@ from .views import (
     AttachmentAnalyzeFromMailView,
     AttachmentAnalyzeUploadView,
     EmailPromptPreviewView,
+    MailAnalysisBackfillView,
     MailGenerateAnalysisTestView,
     MailGenerateStreamTestView,
     MailGenerateStreamView,
@@ -30,4 +31,5 @@ urlpatterns = [
     ),
     path("mail/generate/test/", MailGenerateAnalysisTestView.as_view(), name="mail-generate-test"),
     path("mail/suggest/", MailSuggestView.as_view(), name="mail-suggest"),
+    path("mail/analysis/backfill/", MailAnalysisBackfillView.as_view(), name="mail-analysis-backfill"),
 ]
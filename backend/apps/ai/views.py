@@ -12,10 +12,12 @@ from rest_framework.response import Response
 from ..core.mixins import AuthRequiredMixin
 from ..core.renderers import SSERenderer
 from ..core.utils.docs import extend_schema_with_common_errors
+from .models import MailAnalysisBackfill, PendingContactBackfill
 from .serializers import (
     AttachmentAnalysisResponseSerializer,
     AttachmentAnalyzeFromMailSerializer,
     AttachmentAnalyzeUploadSerializer,
+    MailAnalysisBackfillProgressSerializer,
     MailGenerateAnalysisResponseSerializer,
     MailGenerateRequest,
     MailSuggestRequest,
@@ -162,7 +164,8 @@ class MailGenerateWithPlanStreamView(AuthRequiredMixin, generics.GenericAPIView)
             "6. `body.start` – 본문 스트리밍 시작 알림\n"
             "7. `body.delta` × N – 본문 텍스트 조각(언마스크) 스트리밍, seq는 0부터\n"
             "8. `body.done` – 본문 스트리밍 종료\n"
-            "9. (옵션) `patched` – LLM validator가 본문을 보정한 경우 보정된 전체 텍스트 전송\n"
+            "9. (옵션) `patched.start` → `patched.delta` × N → `patched.done` – 본문 검사(PII placeholder/언어 등)에 걸린 경우 "
+            "보정된 본문을 처음부터 다시 스트리밍 (seq는 0부터, 클라이언트는 본문을 이 내용으로 교체)\n"
             "10. `done` – 모든 처리가 끝났음을 알리는 종료 이벤트\n\n"
             "에러가 발생하면 `error` 이벤트가 먼저 오고 이후 `done` 으로 종료됩니다."
         ),
@@ -215,12 +218,20 @@ class MailGenerateWithPlanStreamView(AuthRequiredMixin, generics.GenericAPIView)
                     "id: 4\n"
                     'data: {"text":"\\n"}\n'
                     "\n"
-                    "event: patched\n"
+                    "event: patched.start\n"
                     "id: 5\n"
-                    'data: {"text":"조교님 안녕하세요... (보정된 전체 본문)"}\n'
+                    "data: {}\n"
                     "\n"
-                    "event: done\n"
+                    "event: patched.delta\n"
                     "id: 6\n"
+                    'data: {"seq":0, "text":"조교님 안녕하세요... (보정된 본문 조각)"}\n'
+                    "\n"
+                    "event: patched.done\n"
+                    "id: 7\n"
+                    "data: {}\n"
+                    "\n"
+                    "event: done\n"
+                    "id: 9\n"
                     'data: {"reason":"stop"}\n'
                     "\n"
                 ),
@@ -281,7 +292,9 @@ class ReplyOptionsStreamView(AuthRequiredMixin, generics.GenericAPIView):
             "- 본문: 다수의 `option.delta` (각 옵션별 id=0.., seq=0부터)\n"
             "- 옵션별 종료: `option.done`\n"
             "- 전체 종료: `done` (정상), 혹은 `option.error`/`done`\n"
-            "- 중간 상태: `ping` (주기적 heartbeat)"
+            "- 중간 상태: `ping` (주기적 heartbeat)\n"
+            "- `message_id` 가 있고 메일을 열 때 미리 만든 옵션이 있으면 `options` 와 앞쪽 옵션 본문"
+            "(단일 `option.delta`)을 LLM 호출 없이 바로 보내고, 나머지 옵션만 라이브로 생성합니다."
         ),
         request=ReplyGenerateRequest,
         responses={200: (OpenApiTypes.STR, "text/event-stream")},
@@ -342,6 +355,7 @@ class ReplyOptionsStreamView(AuthRequiredMixin, generics.GenericAPIView):
                 body=data.get("body"),
                 to_email=data.get("to_email"),
                 attachments=attachments,
+                message_id=message_id or None,
             ),
             content_type="text/event-stream; charset=utf-8",
         )
@@ -581,3 +595,26 @@ class MailSuggestView(AuthRequiredMixin, generics.GenericAPIView):
             }
         )
         return Response(resp.data, status=status.HTTP_200_OK)
+
+
+class MailAnalysisBackfillView(AuthRequiredMixin, generics.GenericAPIView):
+    """
+    연락처 추가/가져오기 후 보낸 메일 말투 분석(backfill) 진행 상황.
+    - pending_contacts: 대기열에 있는 (아직 시작하지 않은) 연락처 수
+    - latest: 가장 최근 실행의 진행 상황 (messages 중 analyzed + reused + failed 만큼 처리됨)
+    """
+
+    serializer_class = MailAnalysisBackfillProgressSerializer
+
+    @extend_schema_with_common_errors(
+        summary="Progress of the sent-mail style analysis backfill",
+        responses={200: MailAnalysisBackfillProgressSerializer},
+    )
+    def get(self, request):
+        resp = self.get_serializer(
+            {
+                "pending_contacts": PendingContactBackfill.objects.filter(user=request.user).count(),
+                "latest": MailAnalysisBackfill.objects.filter(user=request.user).order_by("-id").first(),
+            }
+        )
+        return Response(resp.data, status=status.HTTP_200_OK)
@@ -1,34 +1,46 @@
-from collections.abc import AsyncGenerator, Callable, Generator
-from functools import wraps
-
-from asgiref.sync import sync_to_async
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterable
 
 _SENTINEL = object()
+# merge_async_iterators 가 idle_timeout 동안 아무것도 받지 못했을 때 내보내는 값
+IDLE = object()
 
 
-def as_async_stream(func: Callable[..., Generator[str, None, None]]) -> Callable[..., AsyncGenerator[str, None]]:
-    @wraps(func)
-    async def wrapper(*args, **kwargs) -> AsyncGenerator[str, None]:
-        gen = func(*args, **kwargs)
-
-        def _next() -> object:
-            try:
-                return next(gen)
-            except StopIteration:
-                return _SENTINEL
+async def merge_async_iterators[T](*iterables: AsyncIterable[T], idle_timeout: float | None = None) -> AsyncGenerator[T, None]:
+    """
+    여러 async iterable 을 같은 이벤트 루프에서 동시에 돌리고, 도착하는 순서대로 하나의 스트림으로 내보낸다.
 
-        next_async = sync_to_async(_next, thread_sensitive=True)
+    - 입력마다 태스크 하나 (스레드/별도 이벤트 루프 없음), 모두 끝나면 종료
+    - 입력 중 하나가 예외를 내면 나머지를 취소하고 그 예외를 그대로 올린다
+    - idle_timeout 초 동안 새 항목이 없으면 IDLE 을 내보낸다 (ping 등을 끼워 넣을 때 사용)
+    - 소비자가 중간에 끊으면(aclose/취소) 남은 태스크를 모두 취소한다
+    """
+    queue: asyncio.Queue[tuple[object, object]] = asyncio.Queue()
 
+    async def drain(iterable: AsyncIterable[T]) -> None:
         try:
-            while True:
-                chunk = await next_async()
-                if chunk is _SENTINEL:
-                    break
-                yield chunk
-        finally:
+            async for item in iterable:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((_SENTINEL, e))
+        else:
+            await queue.put((_SENTINEL, None))
+
+    tasks = [asyncio.create_task(drain(it)) for it in iterables]
+    pending = len(tasks)
+    try:
+        while pending:
             try:
-                gen.close()
-            except Exception:
-                pass
-
-    return wrapper
+                item, error = await asyncio.wait_for(queue.get(), timeout=idle_timeout)
+            except TimeoutError:
+                yield IDLE
+                continue
+            if item is not _SENTINEL:
+                yield item
+                continue
+            if error is not None:
+                raise error
+            pending -= 1
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mail", "0004_attachmentanalysis"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MailboxSyncState",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("history_id", models.CharField(blank=True, max_length=32)),
+                ("backfill_page_token", models.CharField(blank=True, max_length=255)),
+                ("is_complete", models.BooleanField(default=False)),
+                ("last_synced_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="mailbox_sync_state", to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="MailboxMessage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("message_id", models.CharField(max_length=255)),
+                ("thread_id", models.CharField(blank=True, max_length=255)),
+                ("label_ids", models.JSONField(blank=True, default=list)),
+                ("subject", models.TextField(blank=True)),
+                ("from_address", models.TextField(blank=True)),
+                ("to_address", models.TextField(blank=True)),
+                ("snippet", models.TextField(blank=True)),
+                ("body", models.TextField(blank=True)),
+                ("attachments", models.JSONField(blank=True, default=list)),
+                ("date", models.DateTimeField(blank=True, null=True)),
+                ("date_raw", models.CharField(blank=True, max_length=255)),
+                ("internal_date", models.BigIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="mailbox_messages", to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+            options={
+                "ordering": ["-internal_date", "-id"],
+                "indexes": [
+                    models.Index(fields=["user", "-internal_date"], name="mail_mailbo_user_id_6e5986_idx"),
+                    models.Index(fields=["user", "date"], name="mail_mailbo_user_id_a45d50_idx"),
+                ],
+                "constraints": [models.UniqueConstraint(fields=("user", "message_id"), name="uniq_mailboxmessage_user_message_id")],
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from django.db import models
 from django.db.models import Q
@@ -97,3 +97,120 @@ class AttachmentAnalysis(models.Model):
             content_key=content_key,
             created_at__gte=one_day_ago,
         ).first()
+
+
+class MailboxSyncState(models.Model):
+    """Per-user cursor of the local Gmail mailbox mirror"""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="mailbox_sync_state",
+    )
+    # 마지막으로 반영한 Gmail historyId (users.history.list 의 startHistoryId로 사용)
+    history_id = models.CharField(max_length=32, blank=True)
+    # 아직 미러에 내려받지 않은 더 오래된 메일을 이어 받기 위한 messages.list 토큰
+    backfill_page_token = models.CharField(max_length=255, blank=True)
+    # 메일함 전체가 미러에 들어왔는지 여부
+    is_complete = models.BooleanField(default=False)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_ready(self) -> bool:
+        return bool(self.history_id)
+
+    def __str__(self):
+        return f"MailboxSyncState for {self.user_id} @ {self.history_id or '-'}"
+
+
+class MailboxMessage(models.Model):
+    """Mirrored Gmail message (same shape as GmailService._parse_message())"""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="mailbox_messages",
+    )
+    message_id = models.CharField(max_length=255)
+    thread_id = models.CharField(max_length=255, blank=True)
+    label_ids = models.JSONField(default=list, blank=True)
+
+    subject = models.TextField(blank=True)
+    from_address = models.TextField(blank=True)
+    to_address = models.TextField(blank=True)
+    snippet = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    attachments = models.JSONField(default=list, blank=True)
+
+    date = models.DateTimeField(null=True, blank=True)
+    date_raw = models.CharField(max_length=255, blank=True)
+    # Gmail internalDate (epoch ms) — Gmail 목록과 같은 정렬 기준
+    internal_date = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "message_id"],
+                name="uniq_mailboxmessage_user_message_id",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-internal_date"]),
+            models.Index(fields=["user", "date"]),
+        ]
+        ordering = ["-internal_date", "-id"]
+
+    def __str__(self):
+        return f"[{self.message_id}] {self.subject or '(no subject)'}"
+
+    @classmethod
+    def from_message_dict(cls, user_id: int, message: dict) -> "MailboxMessage":
+        return cls(
+            user_id=user_id,
+            message_id=message["id"],
+            thread_id=message.get("thread_id") or "",
+            label_ids=message.get("label_ids") or [],
+            subject=message.get("subject") or "",
+            from_address=message.get("from") or "",
+            to_address=message.get("to") or "",
+            snippet=message.get("snippet") or "",
+            body=message.get("body") or "",
+            attachments=message.get("attachments") or [],
+            date=datetime.fromisoformat(message["date"]) if message.get("date") else None,
+            date_raw=message.get("date_raw") or "",
+            internal_date=message.get("internal_date") or 0,
+        )
+
+    def to_message_dict(self, include_body: bool = True) -> dict:
+        if not include_body:
+            return {
+                "id": self.message_id,
+                "thread_id": self.thread_id,
+                "label_ids": self.label_ids,
+                "snippet": self.snippet,
+                "subject": self.subject,
+                "from": self.from_address,
+                "to": self.to_address,
+                "date": self.date.isoformat() if self.date else None,
+                "date_raw": self.date_raw,
+                "is_unread": "UNREAD" in (self.label_ids or []),
+                "internal_date": self.internal_date or None,
+            }
+        return {
+            "id": self.message_id,
+            "thread_id": self.thread_id,
+            "label_ids": self.label_ids,
+            "snippet": self.snippet,
+            "subject": self.subject,
+            "from": self.from_address,
+            "to": self.to_address,
+            "date": self.date.isoformat() if self.date else None,
+            "date_raw": self.date_raw,
+            "body": self.body,
+            "is_unread": "UNREAD" in (self.label_ids or []),
+            "attachments": self.attachments,
+            "internal_date": self.internal_date or None,
+        }
@@ -8,8 +8,8 @@ class EmailAttachmentSerializer(serializers.Serializer):
     size = serializers.IntegerField(allow_null=True, required=False)
 
 
-class EmailListSerializer(serializers.Serializer):
-    """Email list response serializer"""
+class EmailListMetadataSerializer(serializers.Serializer):
+    """Compact email list response serializer (view=metadata, no body / attachments)"""
 
     id = serializers.CharField()
     thread_id = serializers.CharField()
@@ -19,9 +19,14 @@ class EmailListSerializer(serializers.Serializer):
     snippet = serializers.CharField()
     date = serializers.DateTimeField(allow_null=True)
     date_raw = serializers.CharField()
-    body = serializers.CharField()
     is_unread = serializers.BooleanField()
     label_ids = serializers.ListField(child=serializers.CharField())
+
+
+class EmailListSerializer(EmailListMetadataSerializer):
+    """Email list response serializer"""
+
+    body = serializers.CharField()
     attachments = EmailAttachmentSerializer(many=True, required=False)
 
 
@@ -116,6 +121,24 @@ class EmailListQuerySerializer(serializers.Serializer):
         required=False,
         help_text=("ISO8601 timestamp of the newest email the client already has, " "e.g. 2025-10-31T19:14:08+09:00. "),
     )
+    view = serializers.ChoiceField(
+        choices=["full", "metadata"],
+        required=False,
+        default="full",
+        help_text='"metadata" returns headers + snippet only; hydrate bodies via the detail endpoints.',
+    )
+
+
+class EmailBatchDetailQuerySerializer(serializers.Serializer):
+    ids = serializers.CharField(help_text="Comma-separated Gmail message IDs (max 100)")
+
+    def validate_ids(self, value):
+        ids = list(dict.fromkeys(s.strip() for s in value.split(",") if s.strip()))
+        if not ids:
+            raise serializers.ValidationError("At least one message id is required.")
+        if len(ids) > 100:
+            raise serializers.ValidationError("Too many message ids (max 100).")
+        return ids
 
 
 class EmailMarkReadRequestSerializer(serializers.Serializer):
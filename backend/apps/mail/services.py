@@ -2,26 +2,121 @@
 
 import base64
 import datetime
+import functools
+import hashlib
 import html
+import json
 import logging
 import mimetypes
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from email import encoders
 from email.header import Header
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.utils import parsedate_to_datetime
+from email.utils import getaddresses, parsedate_to_datetime
 
+import httplib2
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
 from googleapiclient.errors import HttpError
-from googleapiclient.http import BatchHttpRequest
 
-from apps.mail.utils import compare_iso_datetimes, html_to_text, text_to_html
+from apps.mail.utils import compare_iso_datetimes, html_to_text, normalize_email, text_to_html
 from apps.user.utils import google_token_required
 
 logger = logging.getLogger(__name__)
 
+GMAIL_BATCH_CHUNK_SIZE = 50
+GMAIL_BATCH_MAX_WORKERS = 16
+GMAIL_BATCH_PER_USER_CONCURRENCY = 4
+GMAIL_BATCH_MAX_RETRIES = 3
+GMAIL_BATCH_BACKOFF_SECONDS = 0.5
+GMAIL_HTTP_TIMEOUT_SECONDS = 30
+
+# 받는 사람 여러 명을 한 검색어로 묶을 때 한 쿼리에 넣는 주소 수 / 쿼리마다 넘겨 볼 최대 페이지 수
+GMAIL_SEARCH_RECIPIENTS_PER_QUERY = 20
+GMAIL_SEARCH_MAX_PAGES = 5
+
+# 목록 화면에 필요한 헤더만 (format="metadata")
+LIST_METADATA_HEADERS = ["Subject", "From", "To", "Date"]
+
+_RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+_RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+_BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=GMAIL_BATCH_MAX_WORKERS, thread_name_prefix="gmail-batch")
+_thread_local = threading.local()
+_user_semaphores: "weakref.WeakValueDictionary[str, threading.BoundedSemaphore]" = weakref.WeakValueDictionary()
+_user_semaphores_lock = threading.Lock()
+
+
+@functools.cache
+def _gmail_discovery_document() -> dict:
+    """Gmail v1 discovery document, parsed once per process."""
+    return json.loads(discovery_cache.get_static_doc("gmail", "v1"))
+
+
+class _UnboundHttp(httplib2.Http):
+    """Transport of the shared resource: every request must pass the user's http to execute()."""
+
+    def request(self, *args, **kwargs):
+        raise RuntimeError("Gmail request executed without per-user credentials; pass http= to execute()")
+
+
+@functools.cache
+def _gmail_resource():
+    """
+    Gmail v1 Resource, built once per process.
+    build()/build_from_document()는 호출마다 문서에서 메서드를 다시 만들므로 Resource 자체를 공유하고,
+    유저 자격 증명은 요청마다 execute(http=...) 로 넘긴다 (Resource 에는 인증 없는 transport 만 둔다).
+    """
+    return build_from_document(_gmail_discovery_document(), http=_UnboundHttp())
+
+
+def _pooled_http() -> httplib2.Http:
+    """
+    Keep-alive connection pool for the current thread.
+    httplib2.Http는 스레드 안전하지 않으므로 스레드마다 하나씩 두고, 같은 스레드의 요청끼리 TLS 연결을 재사용한다.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        http = _thread_local.http = httplib2.Http(timeout=GMAIL_HTTP_TIMEOUT_SECONDS)
+    return http
+
+
+def _authorized_http(credentials: Credentials) -> AuthorizedHttp:
+    """Attach per-user credentials to the shared transport of the current thread."""
+    return AuthorizedHttp(credentials, http=_pooled_http())
+
+
+def _user_batch_semaphore(access_token: str) -> threading.BoundedSemaphore:
+    """Concurrency limiter shared by every in-flight batch of the same user (keyed by token hash)."""
+    key = hashlib.sha256((access_token or "").encode()).hexdigest()
+    with _user_semaphores_lock:
+        semaphore = _user_semaphores.get(key)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(GMAIL_BATCH_PER_USER_CONCURRENCY)
+            _user_semaphores[key] = semaphore
+        return semaphore
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, HttpError):
+        status = getattr(exc.resp, "status", None)
+        if status in _RETRYABLE_STATUSES:
+            return True
+        if status == 403:
+            reasons = {d.get("reason") for d in (exc.error_details or []) if isinstance(d, dict)}
+            return bool(reasons & _RATE_LIMIT_REASONS)
+        return False
+    # 연결 끊김 / 타임아웃 등 전송 계층 오류
+    return isinstance(exc, OSError | httplib2.HttpLib2Error)
+
 
 class GmailService:
     """Service for fetching emails using Gmail API"""
@@ -30,24 +125,77 @@ class GmailService:
         """
         Initialize Gmail API client
 
+        The discovery Resource and the underlying keep-alive connections are shared
+        process-wide (per thread for connections); only the credentials are per user
+        and are attached to each request via execute(http=self._http()).
+
         Args:
             access_token: Google OAuth2 access token
         """
-        credentials = Credentials(token=access_token)
-        self.service = build("gmail", "v1", credentials=credentials)
+        self.credentials = Credentials(token=access_token)
+        self.service = _gmail_resource()
+
+    def _http(self) -> AuthorizedHttp:
+        return _authorized_http(self.credentials)
 
-    def get_messages_batch(self, message_ids: list[str]) -> list[dict]:
+    def get_messages_batch(self, message_ids: list[str], metadata_only: bool = False) -> list[dict]:
         """
-        Fetch multiple messages in a single batch HTTP request.
+        Fetch multiple messages with chunked batch HTTP requests.
+
+        - IDs are split into chunks of GMAIL_BATCH_CHUNK_SIZE (Gmail caps a batch at 100)
+        - chunks run concurrently on a shared thread pool, at most
+          GMAIL_BATCH_PER_USER_CONCURRENCY at a time for the same user
+        - throttled / transient sub-requests (429, 5xx, rate-limit 403) are retried with backoff
 
         Args:
             message_ids (list[str]): Gmail message IDs.
+            metadata_only (bool): fetch format="metadata" (LIST_METADATA_HEADERS only, no body/attachments)
 
         Returns:
-            list[dict]: List of parsed message dicts (same shape as get_message()).
+            list[dict]: Parsed message dicts (same shape as get_message(), or _parse_metadata() when
+            metadata_only), in message_ids order.
+        """
+        results: dict[str, dict] = {}
+        pending = list(dict.fromkeys(message_ids))
+        semaphore = _user_batch_semaphore(self.credentials.token)
+
+        for attempt in range(GMAIL_BATCH_MAX_RETRIES + 1):
+            if not pending:
+                break
+            if attempt:
+                time.sleep(GMAIL_BATCH_BACKOFF_SECONDS * (2 ** (attempt - 1)) * (1 + random.random()))
+
+            futures = []
+            for i in range(0, len(pending), GMAIL_BATCH_CHUNK_SIZE):
+                # 호출 스레드에서 세마포어를 잡아, 풀 스레드가 다른 유저 작업을 막지 않게 한다
+                semaphore.acquire()
+                future = _BATCH_EXECUTOR.submit(self._execute_batch_chunk, pending[i : i + GMAIL_BATCH_CHUNK_SIZE], metadata_only)
+                future.add_done_callback(lambda _f: semaphore.release())
+                futures.append(future)
+
+            retry_ids: list[str] = []
+            for future in futures:
+                fetched, failed = future.result()
+                results.update(fetched)
+                retry_ids.extend(failed)
+            pending = retry_ids
+
+        if pending:
+            logger.warning(f"Giving up on {len(pending)} messages after {GMAIL_BATCH_MAX_RETRIES} retries: {pending[:10]}")
+
+        return [results[mid] for mid in message_ids if mid in results]
+
+    def _execute_batch_chunk(self, message_ids: list[str], metadata_only: bool = False) -> tuple[dict[str, dict], list[str]]:
         """
+        Run one batch request on the calling (pool) thread.
 
-        results: list[dict] = []
+        Returns:
+            (parsed messages by id, ids worth retrying)
+        """
+        fetched: dict[str, dict] = {}
+        retry_ids: list[str] = []
+        parse = self._parse_metadata if metadata_only else self._parse_message
+        get_kwargs = {"format": "metadata", "metadataHeaders": LIST_METADATA_HEADERS} if metadata_only else {"format": "full"}
 
         # callback will be called once per each sub-request added to the batch
         def _callback(request_id, response, exception):
@@ -57,36 +205,34 @@ class GmailService:
             exception: HttpError (if failed)
             """
             if exception is not None:
-                logger.warning(f"Failed to fetch message in batch [{request_id}]: {exception}")
+                if _is_retryable(exception):
+                    retry_ids.append(request_id)
+                else:
+                    logger.warning(f"Failed to fetch message in batch [{request_id}]: {exception}")
                 return
 
             try:
-                parsed = self._parse_message(response)
-                results.append(parsed)
+                fetched[request_id] = parse(response)
             except Exception as e:
                 logger.warning(f"Failed to parse message in batch [{request_id}]: {e}")
 
-        batch = BatchHttpRequest(
-            callback=_callback,
-            batch_uri="https://gmail.googleapis.com/batch/gmail/v1",
-        )
+        batch = self.service.new_batch_http_request(callback=_callback)
+        # users().messages()는 호출할 때마다 하위 Resource를 새로 만들므로 한 번만 만든다
+        messages = self.service.users().messages()
 
         for mid in message_ids:
-            batch.add(
-                self.service.users()
-                .messages()
-                .get(
-                    userId="me",
-                    id=mid,
-                    format="full",  # full so we can parse headers/body like before
-                ),
-                request_id=mid,
-            )
+            batch.add(messages.get(userId="me", id=mid, **get_kwargs), request_id=mid)
 
-        # execute the whole batch in one HTTP roundtrip
-        batch.execute()
+        try:
+            # httplib2.Http은 스레드 간 공유가 안전하지 않으므로 풀 스레드별 연결을 사용
+            batch.execute(http=self._http())
+        except Exception as e:
+            if not _is_retryable(e):
+                logger.warning(f"Batch request failed for {len(message_ids)} messages: {e}")
+                return fetched, []
+            return fetched, [mid for mid in message_ids if mid not in fetched]
 
-        return results
+        return fetched, retry_ids
 
     def list_messages(
         self,
@@ -94,6 +240,7 @@ class GmailService:
         page_token: str = None,
         label_ids: list = None,
         q: str | None = None,
+        include_spam_trash: bool = False,
     ):
         """
         List messages from Gmail
@@ -101,8 +248,9 @@ class GmailService:
         Args:
             max_results: Maximum number of results
             page_token: Pagination token
-            label_ids: Label filters (default: ['INBOX'])
+            label_ids: Label filters (default: ['INBOX'], [] for the whole mailbox)
             q: Gmail search query (ex: 'after:1730379248 label:INBOX')
+            include_spam_trash: Include SPAM/TRASH messages in the listing
 
         Returns:
             dict: {
@@ -117,6 +265,8 @@ class GmailService:
         if label_ids is None:
             label_ids = ["INBOX"]
 
+        extra = {"includeSpamTrash": True} if include_spam_trash else {}
+
         try:
             results = (
                 self.service.users()
@@ -125,15 +275,113 @@ class GmailService:
                     userId="me",
                     maxResults=max_results,
                     pageToken=page_token,
-                    labelIds=label_ids,
+                    labelIds=label_ids or None,
                     q=q,
+                    **extra,
                 )
-                .execute()
+                .execute(http=self._http())
             )
             return results
         except HttpError:
             raise
 
+    def list_sent_to_recipients(self, emails: list[str], per_recipient_limit: int) -> tuple[list[dict], dict[str, list[str]]]:
+        """
+        Find the most recent SENT messages addressed to each of several recipients
+
+        Recipients are searched GMAIL_SEARCH_RECIPIENTS_PER_QUERY at a time with one
+        `{to:a to:b ...}` query (instead of one query per recipient), paging until every
+        recipient of the query has per_recipient_limit messages or GMAIL_SEARCH_MAX_PAGES
+        pages were read. A message sent to several of them is fetched once.
+
+        Args:
+            emails: Recipient addresses
+            per_recipient_limit: Messages to keep per recipient (newest first)
+
+        Returns:
+            (full messages in the get_message() shape, {message id: [recipient emails it was selected for]})
+
+        Raises:
+            HttpError: Gmail API error (listing)
+        """
+        wanted = sorted({normalize_email(e) for e in emails} - {""})
+        counts = dict.fromkeys(wanted, 0)
+        recipients_by_message: dict[str, list[str]] = {}
+        to_by_message: dict[str, set[str]] = {}  # 여러 쿼리에 걸친 메일의 헤더는 한 번만 받는다
+
+        for i in range(0, len(wanted), GMAIL_SEARCH_RECIPIENTS_PER_QUERY):
+            chunk = wanted[i : i + GMAIL_SEARCH_RECIPIENTS_PER_QUERY]
+            q = "{" + " ".join(f"to:{email}" for email in chunk) + "}"
+            page_token = None
+            for _ in range(GMAIL_SEARCH_MAX_PAGES):
+                resp = self.list_messages(max_results=100, page_token=page_token, label_ids=["SENT"], q=q)
+                message_ids = [m["id"] for m in resp.get("messages", []) if "id" in m]
+                unseen = [mid for mid in message_ids if mid not in to_by_message]
+                for meta in self.get_messages_batch(unseen, metadata_only=True) if unseen else []:
+                    to_by_message[meta["id"]] = {normalize_email(addr) for _, addr in getaddresses([meta.get("to") or ""])}
+
+                # 목록은 최신순 → 아직 모자란 받는 사람에게 배정
+                for mid in message_ids:
+                    selected = [email for email in chunk if email in to_by_message.get(mid, ()) and counts[email] < per_recipient_limit]
+                    for email in selected:
+                        counts[email] += 1
+                    if selected:
+                        recipients_by_message.setdefault(mid, []).extend(selected)
+
+                page_token = resp.get("nextPageToken")
+                if not page_token or all(counts[email] >= per_recipient_limit for email in chunk):
+                    break
+
+        messages = self.get_messages_batch(list(recipients_by_message)) if recipients_by_message else []
+        return messages, recipients_by_message
+
+    def get_profile(self) -> dict:
+        """
+        Get the mailbox profile
+
+        Returns:
+            dict: {'emailAddress': ..., 'messagesTotal': ..., 'historyId': '...'}
+
+        Raises:
+            HttpError: Gmail API error
+        """
+        try:
+            return self.service.users().getProfile(userId="me").execute(http=self._http())
+        except HttpError:
+            raise
+
+    def list_history(self, start_history_id: str, page_token: str | None = None) -> dict:
+        """
+        List mailbox changes after a history cursor
+
+        Args:
+            start_history_id: historyId the caller already applied
+            page_token: Pagination token
+
+        Returns:
+            dict: {
+                'history': [...],
+                'nextPageToken': '...',
+                'historyId': '...'
+            }
+
+        Raises:
+            HttpError: Gmail API error (404 when start_history_id is too old)
+        """
+        try:
+            return (
+                self.service.users()
+                .history()
+                .list(
+                    userId="me",
+                    startHistoryId=start_history_id,
+                    pageToken=page_token,
+                )
+                .execute(http=self._http())
+            )
+        except HttpError:
+            raise
+
     def get_message(self, message_id: str):
         """
         Get message details
@@ -148,7 +396,7 @@ class GmailService:
             HttpError: Gmail API error
         """
         try:
-            message = self.service.users().messages().get(userId="me", id=message_id, format="full").execute()
+            message = self.service.users().messages().get(userId="me", id=message_id, format="full").execute(http=self._http())
             return self._parse_message(message)
         except HttpError:
             raise
@@ -182,6 +430,8 @@ class GmailService:
 
         attachments = self._get_attachments_meta(message["payload"])
 
+        internal_date = message.get("internalDate")
+
         return {
             "id": message["id"],
             "thread_id": message["threadId"],
@@ -195,6 +445,37 @@ class GmailService:
             "body": body,
             "is_unread": "UNREAD" in message.get("labelIds", []),
             "attachments": attachments,
+            "internal_date": int(internal_date) if internal_date else None,
+        }
+
+    def _parse_metadata(self, message: dict) -> dict:
+        """
+        Parse a format="metadata" Gmail response into the compact list shape
+        (no body / attachments — those are hydrated from the detail endpoints).
+        """
+        headers_dict = {h["name"].lower(): h["value"] for h in message.get("payload", {}).get("headers", [])}
+
+        date_str = headers_dict.get("date", "")
+        try:
+            received_at = parsedate_to_datetime(date_str)
+        except Exception as e:
+            logger.warning(f"Failed to parse date '{date_str}' for message {message['id']}: {e}")
+            received_at = None
+
+        internal_date = message.get("internalDate")
+
+        return {
+            "id": message["id"],
+            "thread_id": message["threadId"],
+            "label_ids": message.get("labelIds", []),
+            "snippet": message.get("snippet", ""),
+            "subject": headers_dict.get("subject", "(No Subject)"),
+            "from": headers_dict.get("from", ""),
+            "to": headers_dict.get("to", ""),
+            "date": received_at.isoformat() if received_at else None,
+            "date_raw": date_str,
+            "is_unread": "UNREAD" in message.get("labelIds", []),
+            "internal_date": int(internal_date) if internal_date else None,
         }
 
     def _get_attachments_meta(self, payload: dict) -> list[dict]:
@@ -229,7 +510,7 @@ class GmailService:
         mime_type: str,
     ) -> dict:
         try:
-            att = self.service.users().messages().attachments().get(userId="me", messageId=message_id, id=attachment_id).execute()
+            att = self.service.users().messages().attachments().get(userId="me", messageId=message_id, id=attachment_id).execute(http=self._http())
         except Exception as e:
             logging.warning(f"Failed to fetch attachment {attachment_id} for message {message_id}: {e}")
             raise
@@ -382,7 +663,7 @@ class GmailService:
                 outer.attach(part)
 
             raw = base64.urlsafe_b64encode(outer.as_bytes()).decode("utf-8")
-            result = self.service.users().messages().send(userId="me", body={"raw": raw}).execute()
+            result = self.service.users().messages().send(userId="me", body={"raw": raw}).execute(http=self._http())
 
             return {
                 "id": result["id"],
@@ -406,7 +687,9 @@ class GmailService:
             HttpError: Gmail API error
         """
         try:
-            result = self.service.users().messages().modify(userId="me", id=message_id, body={"removeLabelIds": ["UNREAD"]}).execute()
+            result = (
+                self.service.users().messages().modify(userId="me", id=message_id, body={"removeLabelIds": ["UNREAD"]}).execute(http=self._http())
+            )
             return result
         except HttpError:
             raise
@@ -425,7 +708,7 @@ class GmailService:
             HttpError: Gmail API error
         """
         try:
-            result = self.service.users().messages().modify(userId="me", id=message_id, body={"addLabelIds": ["UNREAD"]}).execute()
+            result = self.service.users().messages().modify(userId="me", id=message_id, body={"addLabelIds": ["UNREAD"]}).execute(http=self._http())
             return result
         except HttpError:
             raise
@@ -449,12 +732,12 @@ class GmailService:
                 self.service.users().messages().delete(
                     userId="me",
                     id=message_id,
-                ).execute()
+                ).execute(http=self._http())
             else:
                 self.service.users().messages().trash(
                     userId="me",
                     id=message_id,
-                ).execute()
+                ).execute(http=self._http())
 
             return {
                 "id": message_id,
@@ -465,7 +748,7 @@ class GmailService:
 
 
 @google_token_required
-def list_emails_logic(access_token, max_results, page_token, label_ids, q=None):
+def list_emails_logic(access_token, max_results, page_token, label_ids, q=None, metadata_only=False):
     """Helper function to list emails using Google access token"""
     gmail_service = GmailService(access_token)
     result = gmail_service.list_messages(
@@ -481,7 +764,7 @@ def list_emails_logic(access_token, max_results, page_token, label_ids, q=None):
 
     # 2. batch get full details
     if message_ids:
-        messages = gmail_service.get_messages_batch(message_ids)
+        messages = gmail_service.get_messages_batch(message_ids, metadata_only=metadata_only)
     else:
         messages = []
 
@@ -489,12 +772,19 @@ def list_emails_logic(access_token, max_results, page_token, label_ids, q=None):
 
 
 @google_token_required
-def list_newer_emails_logic(access_token, max_results, label_ids, since_date):
+def list_sent_to_recipients_logic(access_token, emails: list[str], per_recipient_limit: int):
+    """Helper function to find the latest SENT messages to several recipients with shared queries"""
+    return GmailService(access_token).list_sent_to_recipients(emails, per_recipient_limit)
+
+
+@google_token_required
+def list_newer_emails_logic(access_token, max_results, label_ids, since_date, metadata_only=False):
     """
     Incremental refresh mode:
     - since_date: tz-aware datetime (the newest email timestamp the client ALREADY has)
     - Fetch ALL emails after that timestamp (via `after:<epochSeconds>` query),
       across ALL pages.
+    - metadata_only: fetch the compact list shape (no body / attachments)
     """
     gmail_service = GmailService(access_token)
 
@@ -529,7 +819,7 @@ def list_newer_emails_logic(access_token, max_results, label_ids, since_date):
             if mid:
                 collected_ids.append(mid)
 
-        all_full_msgs.extend(gmail_service.get_messages_batch(collected_ids))
+        all_full_msgs.extend(gmail_service.get_messages_batch(collected_ids, metadata_only=metadata_only))
 
         page_token = resp.get("nextPageToken")
         if not page_token:
@@ -547,6 +837,13 @@ def get_email_detail_logic(access_token, message_id):
     return gmail_service.get_message(message_id)
 
 
+@google_token_required
+def get_email_details_batch_logic(access_token, message_ids: list[str]) -> list[dict]:
+    """Helper function to hydrate several emails (body + attachments) in one batch"""
+    gmail_service = GmailService(access_token)
+    return gmail_service.get_messages_batch(message_ids)
+
+
 @google_token_required
 def send_email_logic(access_token, to, subject, body, is_html=True, cc=None, bcc=None, attachments=None):
     """Helper function to send email using Google access token"""
@@ -0,0 +1,287 @@
+"""Local Gmail mailbox mirror kept current through users.history.list"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+
+from apps.mail.models import MailboxMessage, MailboxSyncState
+from apps.mail.services import GmailService, list_newer_emails_logic
+from apps.user.utils import google_token_required
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_PAGE_SIZE = 100
+BACKFILL_MAX_PAGES = 3
+MIRROR_PAGE_TOKEN_PREFIX = "mirror:"
+
+
+class HistoryExpiredError(Exception):
+    """Stored historyId is older than what Gmail keeps — the mirror must be rebuilt."""
+
+
+def is_mirror_page_token(page_token: str | None) -> bool:
+    return not page_token or page_token.startswith(MIRROR_PAGE_TOKEN_PREFIX)
+
+
+def _parse_mirror_page_token(page_token: str | None) -> int:
+    if not page_token:
+        return 0
+    try:
+        return max(0, int(page_token[len(MIRROR_PAGE_TOKEN_PREFIX) :]))
+    except ValueError:
+        return 0
+
+
+class MailboxSyncer:
+    """
+    Keep MailboxMessage rows in step with a user's Gmail mailbox.
+
+    - bootstrap(): profile historyId + newest page of the whole mailbox
+    - sync(): apply users.history.list deltas (added / deleted / label changes) since the cursor
+    - backfill(): pull older pages on demand until the mirror covers the mailbox
+    """
+
+    def __init__(self, user_id: int, gmail_service: GmailService):
+        self.user_id = user_id
+        self.gmail = gmail_service
+
+    def _upsert(self, messages: list[dict]) -> None:
+        if not messages:
+            return
+        MailboxMessage.objects.bulk_create(
+            [MailboxMessage.from_message_dict(self.user_id, m) for m in messages],
+            update_conflicts=True,
+            unique_fields=["user", "message_id"],
+            update_fields=[
+                "thread_id",
+                "label_ids",
+                "subject",
+                "from_address",
+                "to_address",
+                "snippet",
+                "body",
+                "attachments",
+                "date",
+                "date_raw",
+                "internal_date",
+            ],
+            batch_size=500,
+        )
+
+    def _fetch_page(self, page_token: str | None) -> tuple[list[dict], str]:
+        resp = self.gmail.list_messages(
+            max_results=BOOTSTRAP_PAGE_SIZE,
+            page_token=page_token,
+            label_ids=[],
+            include_spam_trash=True,
+        )
+        ids = [m["id"] for m in resp.get("messages", []) if "id" in m]
+        messages = self.gmail.get_messages_batch(ids) if ids else []
+        return messages, resp.get("nextPageToken") or ""
+
+    def bootstrap(self) -> MailboxSyncState:
+        # historyId를 먼저 받아야 목록 조회 중에 생긴 변경을 다음 sync()에서 놓치지 않는다
+        history_id = str(self.gmail.get_profile()["historyId"])
+        messages, next_token = self._fetch_page(None)
+
+        with transaction.atomic():
+            MailboxMessage.objects.filter(user_id=self.user_id).delete()
+            self._upsert(messages)
+            state, _ = MailboxSyncState.objects.update_or_create(
+                user_id=self.user_id,
+                defaults={
+                    "history_id": history_id,
+                    "backfill_page_token": next_token,
+                    "is_complete": not next_token,
+                    "last_synced_at": timezone.now(),
+                },
+            )
+        return state
+
+    def sync(self) -> int:
+        """
+        Apply every history record after the stored cursor.
+
+        Returns:
+            int: number of mirrored messages touched
+
+        Raises:
+            HistoryExpiredError: Gmail no longer has history for the cursor
+        """
+        state = MailboxSyncState.objects.get(user_id=self.user_id)
+        if not state.is_ready:
+            raise HistoryExpiredError("Mailbox mirror is not bootstrapped")
+
+        labels: dict[str, list[str]] = {}
+        added: set[str] = set()
+        deleted: set[str] = set()
+        latest_history_id = state.history_id
+        page_token = None
+
+        while True:
+            try:
+                resp = self.gmail.list_history(state.history_id, page_token=page_token)
+            except HttpError as e:
+                if e.resp.status == 404:
+                    raise HistoryExpiredError(str(e)) from e
+                raise
+
+            # 기록 순서대로 접어서, 같은 메일의 마지막 상태만 남긴다
+            for record in resp.get("history", []):
+                for item in record.get("messagesAdded", []):
+                    mid = item["message"]["id"]
+                    added.add(mid)
+                    deleted.discard(mid)
+                    labels[mid] = item["message"].get("labelIds", [])
+                for item in record.get("messagesDeleted", []):
+                    mid = item["message"]["id"]
+                    deleted.add(mid)
+                    added.discard(mid)
+                    labels.pop(mid, None)
+                for key in ("labelsAdded", "labelsRemoved"):
+                    for item in record.get(key, []):
+                        mid = item["message"]["id"]
+                        if mid not in deleted:
+                            labels[mid] = item["message"].get("labelIds", [])
+
+            latest_history_id = resp.get("historyId") or latest_history_id
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
+
+        existing = set(MailboxMessage.objects.filter(user_id=self.user_id, message_id__in=added).values_list("message_id", flat=True))
+        to_fetch = [mid for mid in added if mid not in existing]
+        fetched = self.gmail.get_messages_batch(to_fetch) if to_fetch else []
+        fetched_ids = {m["id"] for m in fetched}
+
+        with transaction.atomic():
+            state = MailboxSyncState.objects.select_for_update().get(user_id=self.user_id)
+
+            if deleted:
+                MailboxMessage.objects.filter(user_id=self.user_id, message_id__in=deleted).delete()
+
+            relabel = [
+                row
+                for row in MailboxMessage.objects.filter(user_id=self.user_id, message_id__in=labels.keys())
+                if row.message_id not in fetched_ids and row.label_ids != labels[row.message_id]
+            ]
+            for row in relabel:
+                row.label_ids = labels[row.message_id]
+            MailboxMessage.objects.bulk_update(relabel, ["label_ids"], batch_size=500)
+
+            self._upsert(fetched)
+
+            # 동시에 돈 sync가 먼저 더 앞선 커서를 저장했다면 되돌리지 않는다
+            if int(latest_history_id) > int(state.history_id or 0):
+                state.history_id = str(latest_history_id)
+            state.last_synced_at = timezone.now()
+            state.save(update_fields=["history_id", "last_synced_at", "updated_at"])
+
+        return len(deleted) + len(relabel) + len(fetched)
+
+    def backfill(self, max_pages: int = BACKFILL_MAX_PAGES) -> int:
+        """Pull up to max_pages older pages into the mirror. Returns the number of messages added."""
+        state = MailboxSyncState.objects.get(user_id=self.user_id)
+        count = 0
+
+        for _ in range(max_pages):
+            if state.is_complete:
+                break
+            messages, next_token = self._fetch_page(state.backfill_page_token or None)
+            with transaction.atomic():
+                self._upsert(messages)
+                state.backfill_page_token = next_token
+                state.is_complete = not next_token
+                state.save(update_fields=["backfill_page_token", "is_complete", "updated_at"])
+            count += len(messages)
+
+        return count
+
+
+def _mirror_queryset(user_id: int, label_ids: list[str], metadata_only: bool = False):
+    qs = MailboxMessage.objects.filter(user_id=user_id)
+    if metadata_only:
+        qs = qs.defer("body", "attachments")
+    # Gmail labelIds 필터와 동일하게 모든 라벨을 가진 메일만
+    if label_ids:
+        qs = qs.filter(label_ids__contains=label_ids)
+    return qs
+
+
+@google_token_required
+def bootstrap_mailbox_logic(access_token, user_id: int) -> MailboxSyncState:
+    """Helper function to (re)build the mailbox mirror using Google access token"""
+    return MailboxSyncer(user_id, GmailService(access_token)).bootstrap()
+
+
+@google_token_required
+def sync_mailbox_logic(access_token, user_id: int) -> int:
+    """Helper function to apply Gmail history deltas to the mailbox mirror"""
+    return MailboxSyncer(user_id, GmailService(access_token)).sync()
+
+
+@google_token_required
+def backfill_mailbox_logic(access_token, user_id: int, max_pages: int = BACKFILL_MAX_PAGES) -> int:
+    """Helper function to extend the mailbox mirror with older pages"""
+    return MailboxSyncer(user_id, GmailService(access_token)).backfill(max_pages=max_pages)
+
+
+def list_mirrored_emails_logic(user, max_results: int, page_token: str | None, label_ids: list[str], metadata_only: bool = False):
+    """
+    Serve one list page from the mailbox mirror.
+
+    Returns:
+        (result, messages) in the same shape as list_emails_logic(), with
+        'nextPageToken' being a mirror page token ("mirror:<offset>").
+    """
+    offset = _parse_mirror_page_token(page_token)
+    qs = _mirror_queryset(user.id, label_ids, metadata_only)
+    rows = list(qs[offset : offset + max_results + 1])
+
+    # 미러에 아직 없는 오래된 메일이 필요하면 Gmail에서 이어 받는다
+    if len(rows) <= max_results:
+        state = MailboxSyncState.objects.get(user=user)
+        if not state.is_complete and backfill_mailbox_logic(user, user.id):
+            rows = list(qs[offset : offset + max_results + 1])
+            state.refresh_from_db()
+
+        has_more = len(rows) > max_results or not state.is_complete
+    else:
+        has_more = True
+
+    rows = rows[:max_results]
+    next_offset = offset + len(rows)
+    result = {
+        "nextPageToken": f"{MIRROR_PAGE_TOKEN_PREFIX}{next_offset}" if has_more else None,
+        "resultSizeEstimate": qs.count(),
+    }
+    return result, [r.to_message_dict(include_body=not metadata_only) for r in rows]
+
+
+def list_newer_mirrored_emails_logic(user, max_results: int, label_ids: list[str], since_date, metadata_only: bool = False) -> list[dict]:
+    """
+    Mirror counterpart of list_newer_emails_logic(): messages dated after since_date.
+    Falls back to the Gmail query when the mirror does not reach back to since_date yet.
+    """
+
+    def _covers() -> bool:
+        # 미러는 최신 메일부터 연속으로 채워지므로, since_date 이전 메일이 있으면 그 이후는 모두 미러에 있다
+        return MailboxMessage.objects.filter(user_id=user.id, date__lte=since_date).exists()
+
+    state = MailboxSyncState.objects.get(user=user)
+    if not state.is_complete and not _covers():
+        backfill_mailbox_logic(user, user.id)
+        state.refresh_from_db()
+        if not state.is_complete and not _covers():
+            return list_newer_emails_logic(
+                user,
+                max_results=max_results,
+                label_ids=label_ids,
+                since_date=since_date,
+                metadata_only=metadata_only,
+            )
+
+    qs = _mirror_queryset(user.id, label_ids, metadata_only).filter(date__gt=since_date)
+    return [r.to_message_dict(include_body=not metadata_only) for r in qs]
@@ -0,0 +1,31 @@
+import logging
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+
+from .sync import bootstrap_mailbox_logic
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def bootstrap_mailbox_mirror(self, user_id: int) -> bool:
+    try:
+        user = User.objects.get(id=user_id)
+    except User.DoesNotExist:
+        return False
+
+    try:
+        bootstrap_mailbox_logic(user, user.id)
+    except ValueError as e:
+        # Google 계정 미연동 / 토큰 복호화 실패 → 재시도해도 의미 없음
+        logger.warning(f"[bootstrap_mailbox_mirror] user={user_id}: {e}")
+        return False
+    except Exception as e:
+        try:
+            raise self.retry(exc=e, countdown=2**self.request.retries)
+        except self.MaxRetriesExceededError:
+            return False
+
+    return True
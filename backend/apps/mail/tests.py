@@ -2,6 +2,7 @@ from datetime import timedelta
 from unittest.mock import ANY, MagicMock, patch
 
 from cryptography.fernet import Fernet
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 from django.utils import timezone
 from rest_framework import status
@@ -9,6 +10,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from apps.mail.views import (
+    EmailBatchDetailView,
     EmailDetailView,
     EmailListView,
     EmailMarkReadView,
@@ -480,6 +482,81 @@ class EmailListViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn("detail", response.data)
 
+    @patch("apps.mail.views.list_emails_logic")
+    def test_list_emails_metadata_view_returns_compact_payload(self, mock_list_logic):
+        mock_list_logic.return_value = (
+            {"nextPageToken": None, "resultSizeEstimate": 1},
+            [
+                {
+                    "id": "m1",
+                    "thread_id": "t1",
+                    "subject": "Hello",
+                    "from": "a@b.com",
+                    "to": "user@example.com",
+                    "snippet": "preview...",
+                    "date": timezone.now(),
+                    "date_raw": "Mon, 1 Oct 2025 09:00:00 +0900",
+                    "label_ids": ["INBOX"],
+                    "is_unread": False,
+                }
+            ],
+        )
+
+        request = self.factory.get("/api/mail/emails/", {"view": "metadata"})
+        force_authenticate(request, user=self.user)
+
+        response = EmailListView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["messages"][0]["subject"], "Hello")
+        self.assertNotIn("body", response.data["messages"][0])
+        self.assertTrue(mock_list_logic.call_args.kwargs["metadata_only"])
+
+
+class EmailBatchDetailViewTest(TestCase):
+    """EmailBatchDetailView GET tests"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create(email="user@example.com")
+
+    @patch("apps.mail.views.get_email_details_batch_logic")
+    def test_returns_found_messages_and_missing_ids(self, mock_batch_logic):
+        mock_batch_logic.return_value = [
+            {
+                "id": "m2",
+                "thread_id": "t2",
+                "subject": "Hi",
+                "from": "a@b.com",
+                "to": "user@example.com",
+                "date": None,
+                "date_raw": "",
+                "body": "full body",
+                "snippet": "hi",
+                "is_unread": True,
+                "label_ids": ["INBOX", "UNREAD"],
+                "attachments": [],
+            }
+        ]
+
+        request = self.factory.get("/api/mail/emails/batch/", {"ids": "m2, m9,m2"})
+        force_authenticate(request, user=self.user)
+
+        response = EmailBatchDetailView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["messages"][0]["body"], "full body")
+        self.assertEqual(response.data["not_found"], ["m9"])
+        mock_batch_logic.assert_called_once_with(self.user, ["m2", "m9"])
+
+    def test_requires_ids(self):
+        request = self.factory.get("/api/mail/emails/batch/")
+        force_authenticate(request, user=self.user)
+
+        response = EmailBatchDetailView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class EmailDetailViewTest(TestCase):
     """EmailDetailView GET tests"""
@@ -487,14 +564,20 @@ class EmailDetailViewTest(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
         self.user = User.objects.create(email="user2@example.com")
+        cache.clear()
+        # 테스트 캐시(LocMem)는 프로세스 로컬이라 기본으로는 prefetch 를 enqueue 하지 않으므로, 공유 캐시가 있는 배포로 가정
+        shared = patch("apps.ai.services.reply_prefetch.shared_cache_configured", return_value=True)
+        shared.start()
+        self.addCleanup(shared.stop)
 
+    @patch("apps.mail.views.prefetch_reply")
     @patch("apps.mail.views.get_email_detail_logic")
-    def test_email_detail_success(self, mock_detail_logic):
+    def test_email_detail_success(self, mock_detail_logic, mock_prefetch):
         mock_detail_logic.return_value = {
             "id": "m-detail",
             "thread_id": "thread-abc",
             "subject": "Test subject",
-            "from": "someone@example.com",
+            "from": "Someone <Someone@example.com>",
             "to": "user2@example.com",
             "snippet": "short preview",
             "body": "Hello body",
@@ -516,6 +599,62 @@ class EmailDetailViewTest(TestCase):
         self.assertEqual(response.data["thread_id"], "thread-abc")
 
         mock_detail_logic.assert_called_once_with(self.user, "m-detail")
+        # 받은 메일 → 답장 옵션 prefetch
+        mock_prefetch.delay.assert_called_once_with(self.user.id, "m-detail", "Test subject", "Hello body", "someone@example.com")
+
+    @patch("apps.mail.views.prefetch_reply")
+    @patch("apps.mail.views.get_email_detail_logic")
+    def test_reply_prefetch_skips_sent_mail_and_repeated_opens(self, mock_detail_logic, mock_prefetch):
+        message = {
+            "id": "m-in",
+            "thread_id": "t-1",
+            "subject": "s",
+            "from": "someone@example.com",
+            "to": "user2@example.com",
+            "snippet": "",
+            "body": "b",
+            "date": timezone.now(),
+            "date_raw": "",
+            "label_ids": ["INBOX"],
+            "is_unread": False,
+        }
+        mock_detail_logic.side_effect = [
+            {**message, "id": "m-sent", "from": "user2@example.com", "label_ids": ["SENT"]},
+            message,
+            message,
+        ]
+
+        for message_id in ("m-sent", "m-in", "m-in"):
+            request = self.factory.get(f"/api/mail/emails/{message_id}/")
+            force_authenticate(request, user=self.user)
+            self.assertEqual(EmailDetailView.as_view()(request, message_id=message_id).status_code, status.HTTP_200_OK)
+
+        mock_prefetch.delay.assert_called_once_with(self.user.id, "m-in", "s", "b", "someone@example.com")
+
+    @patch("apps.mail.views.prefetch_reply")
+    @patch("apps.mail.views.get_email_detail_logic")
+    def test_reply_prefetch_needs_shared_cache(self, mock_detail_logic, mock_prefetch):
+        mock_detail_logic.return_value = {
+            "id": "m-in",
+            "thread_id": "t-1",
+            "subject": "s",
+            "from": "someone@example.com",
+            "to": "user2@example.com",
+            "snippet": "",
+            "body": "b",
+            "date": timezone.now(),
+            "date_raw": "",
+            "label_ids": ["INBOX"],
+            "is_unread": False,
+        }
+        request = self.factory.get("/api/mail/emails/m-in/")
+        force_authenticate(request, user=self.user)
+
+        # worker 가 쓴 prefetch 를 웹 서버가 읽을 수 없으므로 LLM 호출을 만들지 않는다
+        with patch("apps.ai.services.reply_prefetch.shared_cache_configured", return_value=False):
+            self.assertEqual(EmailDetailView.as_view()(request, message_id="m-in").status_code, status.HTTP_200_OK)
+
+        mock_prefetch.delay.assert_not_called()
 
     @patch("apps.mail.views.get_email_detail_logic")
     def test_email_detail_not_found(self, mock_detail_logic):
@@ -794,3 +933,435 @@ class MailTestViewTest(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn("detail", response.data)
+
+
+# ---------------------------------------------------------------------
+# Mailbox mirror (history sync) tests
+# ---------------------------------------------------------------------
+
+
+class _FakeRequest:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self, http=None):
+        return self._fn()
+
+
+class _FakeBatch:
+    def __init__(self, callback):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, request_id=None):
+        self._requests.append((request_id, request))
+
+    def execute(self, http=None):
+        for request_id, request in self._requests:
+            try:
+                self._callback(request_id, request.execute(), None)
+            except Exception as e:
+                self._callback(request_id, None, e)
+
+
+class FakeGmailResource:
+    """
+    googleapiclient discovery resource 대체품.
+    users().messages().list/get, users().history().list, users().getProfile(),
+    new_batch_http_request() 만 흉내낸다.
+    """
+
+    def __init__(self):
+        self.messages_by_id: dict[str, dict] = {}
+        self.order: list[str] = []  # newest first
+        self.history_records: list[dict] = []
+        self.history_id = 100
+        self.calls: list[str] = []
+        self.throttled: set[str] = set()  # ids answered once with 429
+
+    # ----- helpers for tests -----
+    def add_message(self, mid, labels=("INBOX",), date="Mon, 1 Oct 2025 09:00:00 +0900", internal_date=None, record=True, to=None):
+        self.messages_by_id[mid] = {
+            "id": mid,
+            "threadId": f"t-{mid}",
+            "labelIds": list(labels),
+            "snippet": f"snippet {mid}",
+            "internalDate": str(internal_date or (1_700_000_000_000 + len(self.order))),
+            "payload": {
+                "headers": [
+                    {"name": "Subject", "value": f"Subject {mid}"},
+                    {"name": "From", "value": "a@example.com"},
+                    {"name": "Date", "value": date},
+                    *([{"name": "To", "value": to}] if to else []),
+                ],
+                "body": {},
+            },
+        }
+        self.order.insert(0, mid)
+        if record:
+            self._record(messagesAdded=[{"message": {"id": mid, "labelIds": list(labels)}}])
+
+    def _header(self, mid, name):
+        return next((h["value"] for h in self.messages_by_id[mid]["payload"]["headers"] if h["name"] == name), "")
+
+    def delete_message(self, mid):
+        self.messages_by_id.pop(mid)
+        self.order.remove(mid)
+        self._record(messagesDeleted=[{"message": {"id": mid}}])
+
+    def set_labels(self, mid, labels):
+        self.messages_by_id[mid]["labelIds"] = list(labels)
+        self._record(labelsAdded=[{"message": {"id": mid, "labelIds": list(labels)}, "labelIds": list(labels)}])
+
+    def _record(self, **changes):
+        self.history_id += 1
+        self.history_records.append({"id": str(self.history_id), **changes})
+
+    # ----- discovery surface -----
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def getProfile(self, userId):
+        self.calls.append("getProfile")
+        return _FakeRequest(lambda: {"historyId": str(self.history_id)})
+
+    def list(self, userId, maxResults=20, pageToken=None, labelIds=None, q=None, includeSpamTrash=False, startHistoryId=None):
+        if startHistoryId is not None:
+            return self._history_list(startHistoryId)
+
+        def _run():
+            self.calls.append("messages.list")
+            ids = [m for m in self.order if not labelIds or set(labelIds) <= set(self.messages_by_id[m]["labelIds"])]
+            if q and q.startswith("{"):
+                # "{to:a to:b}" 형태의 OR 검색만 흉내낸다
+                wanted = {term.removeprefix("to:") for term in q.strip("{}").split()}
+                ids = [m for m in ids if wanted & set(self._header(m, "To").lower().replace(",", " ").split())]
+            start = int(pageToken or 0)
+            page = ids[start : start + maxResults]
+            resp = {"messages": [{"id": m} for m in page], "resultSizeEstimate": len(ids)}
+            if start + maxResults < len(ids):
+                resp["nextPageToken"] = str(start + maxResults)
+            return resp
+
+        return _FakeRequest(_run)
+
+    def get(self, userId, id, format="full", metadataHeaders=None):
+        def _run():
+            self.calls.append("messages.get" if format == "full" else f"messages.get:{format}")
+            if id in self.throttled:
+                self.throttled.discard(id)
+                resp = MagicMock()
+                resp.status = 429
+                from googleapiclient.errors import HttpError
+
+                raise HttpError(resp, b"Too many requests")
+            if id not in self.messages_by_id:
+                resp = MagicMock()
+                resp.status = 404
+                from googleapiclient.errors import HttpError
+
+                raise HttpError(resp, b"Not found")
+            message = self.messages_by_id[id]
+            if format == "metadata":
+                headers = [h for h in message["payload"]["headers"] if h["name"] in (metadataHeaders or [])]
+                return {**message, "payload": {"headers": headers}}
+            return message
+
+        return _FakeRequest(_run)
+
+    def history(self):
+        return self
+
+    def _history_list(self, start_history_id):
+        def _run():
+            self.calls.append("history.list")
+            if self.history_records and int(start_history_id) < int(self.history_records[0]["id"]) - 1:
+                resp = MagicMock()
+                resp.status = 404
+                from googleapiclient.errors import HttpError
+
+                raise HttpError(resp, b"historyId too old")
+            records = [h for h in self.history_records if int(h["id"]) > int(start_history_id)]
+            return {"history": records, "historyId": str(self.history_id)}
+
+        return _FakeRequest(_run)
+
+    def new_batch_http_request(self, callback):
+        self.calls.append("batch")
+        return _FakeBatch(callback)
+
+
+class GmailServiceClientReuseTest(TestCase):
+    def test_services_share_resource_and_connection_pool(self):
+        from apps.mail import services
+
+        with patch("apps.mail.services.build_from_document", wraps=services.build_from_document) as mock_build:
+            services._gmail_resource.cache_clear()
+            first = GmailService("token-a")
+            second = GmailService("token-b")
+
+        mock_build.assert_called_once()
+        self.assertIs(first.service, second.service)
+        # 유저별 자격 증명은 분리, 하위 연결 풀은 공유
+        self.assertIsNot(first._http(), second._http())
+        self.assertIs(first._http().http, second._http().http)
+        self.assertEqual(second._http().credentials.token, "token-b")
+
+    def test_shared_resource_refuses_requests_without_user_http(self):
+        request = GmailService("token-a").service.users().getProfile(userId="me")
+
+        with self.assertRaises(RuntimeError):
+            request.execute()
+
+
+class GmailServiceBatchTest(TestCase):
+    def setUp(self):
+        self.fake = FakeGmailResource()
+        for i in range(120):
+            self.fake.add_message(f"m{i}", record=False)
+
+        with patch("googleapiclient.discovery.build"):
+            self.gmail = GmailService("fake_access_token")
+        self.gmail.service = self.fake
+
+    def test_splits_into_chunks_and_preserves_input_order(self):
+        ids = [f"m{i}" for i in range(120)][::-1]
+
+        with patch("apps.mail.services.GMAIL_BATCH_CHUNK_SIZE", 50):
+            result = self.gmail.get_messages_batch(ids)
+
+        self.assertEqual([m["id"] for m in result], ids)
+        self.assertEqual(self.fake.calls.count("batch"), 3)
+
+    def test_retries_only_throttled_sub_requests(self):
+        self.fake.throttled = {"m3", "m7"}
+
+        with patch("apps.mail.services.time.sleep") as mock_sleep:
+            result = self.gmail.get_messages_batch([f"m{i}" for i in range(10)])
+
+        self.assertEqual([m["id"] for m in result], [f"m{i}" for i in range(10)])
+        self.assertEqual(self.fake.calls.count("batch"), 2)
+        # 첫 배치 10건 + 재시도 2건
+        self.assertEqual(self.fake.calls.count("messages.get"), 12)
+        mock_sleep.assert_called_once()
+
+    def test_metadata_only_skips_body_and_attachments(self):
+        result = self.gmail.get_messages_batch(["m1", "m2"], metadata_only=True)
+
+        self.assertEqual([m["id"] for m in result], ["m1", "m2"])
+        self.assertEqual(result[0]["subject"], "Subject m1")
+        self.assertNotIn("body", result[0])
+        self.assertNotIn("attachments", result[0])
+        self.assertEqual(self.fake.calls.count("messages.get:metadata"), 2)
+
+    def test_missing_messages_are_dropped_without_retry(self):
+        with patch("apps.mail.services.time.sleep") as mock_sleep:
+            result = self.gmail.get_messages_batch(["m1", "gone", "m2"])
+
+        self.assertEqual([m["id"] for m in result], ["m1", "m2"])
+        mock_sleep.assert_not_called()
+
+
+class GmailServiceListSentToRecipientsTest(TestCase):
+    def setUp(self):
+        self.fake = FakeGmailResource()
+        # 오래된 것부터 추가 → order 는 최신순
+        self.fake.add_message("old-a", labels=("SENT",), to="a@test.com", record=False)
+        self.fake.add_message("inbox", labels=("INBOX",), to="a@test.com", record=False)
+        self.fake.add_message("b-only", labels=("SENT",), to="b@test.com", record=False)
+        self.fake.add_message("shared", labels=("SENT",), to="A@test.com, b@test.com", record=False)
+        self.fake.add_message("other", labels=("SENT",), to="z@test.com", record=False)
+
+        with patch("googleapiclient.discovery.build"):
+            self.gmail = GmailService("fake_access_token")
+        self.gmail.service = self.fake
+
+    def test_one_query_for_several_recipients_and_shared_messages_fetched_once(self):
+        messages, recipients = self.gmail.list_sent_to_recipients(["a@test.com", "b@test.com", "c@test.com"], per_recipient_limit=1)
+
+        self.assertEqual(self.fake.calls.count("messages.list"), 1)
+        self.assertEqual(recipients, {"shared": ["a@test.com", "b@test.com"]})
+        self.assertEqual([m["id"] for m in messages], ["shared"])
+        self.assertEqual(self.fake.calls.count("messages.get"), 1)
+
+    def test_recipients_are_split_across_queries(self):
+        with patch("apps.mail.services.GMAIL_SEARCH_RECIPIENTS_PER_QUERY", 1):
+            messages, recipients = self.gmail.list_sent_to_recipients(["a@test.com", "b@test.com"], per_recipient_limit=2)
+
+        self.assertEqual(self.fake.calls.count("messages.list"), 2)
+        self.assertEqual(recipients, {"shared": ["a@test.com", "b@test.com"], "old-a": ["a@test.com"], "b-only": ["b@test.com"]})
+        # 두 쿼리에 모두 나온 메일의 헤더/본문은 한 번씩만 받는다
+        self.assertEqual(self.fake.calls.count("messages.get:metadata"), 3)
+        self.assertCountEqual([m["id"] for m in messages], ["shared", "old-a", "b-only"])
+
+
+class MailboxSyncerTest(TestCase):
+    def setUp(self):
+        from apps.mail.sync import MailboxSyncer
+
+        self.user = User.objects.create(email="mirror@example.com")
+        self.fake = FakeGmailResource()
+        for i in range(3):
+            self.fake.add_message(f"m{i}", record=False)
+
+        with patch("googleapiclient.discovery.build"):
+            gmail = GmailService("fake_access_token")
+        gmail.service = self.fake
+        self.syncer = MailboxSyncer(self.user.id, gmail)
+
+    def _labels(self):
+        from apps.mail.models import MailboxMessage
+
+        return dict(MailboxMessage.objects.filter(user=self.user).values_list("message_id", "label_ids"))
+
+    def test_bootstrap_mirrors_newest_page_and_stores_cursor(self):
+        state = self.syncer.bootstrap()
+
+        self.assertEqual(state.history_id, "100")
+        self.assertTrue(state.is_complete)
+        self.assertEqual(set(self._labels()), {"m0", "m1", "m2"})
+
+    def test_sync_applies_only_deltas(self):
+        self.syncer.bootstrap()
+        self.fake.calls.clear()
+
+        self.fake.add_message("m3", labels=("INBOX", "UNREAD"))
+        self.fake.set_labels("m0", ["INBOX", "STARRED"])
+        self.fake.delete_message("m1")
+
+        touched = self.syncer.sync()
+
+        self.assertEqual(touched, 3)
+        labels = self._labels()
+        self.assertEqual(set(labels), {"m0", "m2", "m3"})
+        self.assertEqual(labels["m0"], ["INBOX", "STARRED"])
+        self.assertEqual(labels["m3"], ["INBOX", "UNREAD"])
+        # 새 메일 1건만 get, messages.list 재호출 없음
+        self.assertEqual(self.fake.calls.count("messages.get"), 1)
+        self.assertNotIn("messages.list", self.fake.calls)
+
+        from apps.mail.models import MailboxSyncState
+
+        self.assertEqual(MailboxSyncState.objects.get(user=self.user).history_id, str(self.fake.history_id))
+
+    def test_sync_without_changes_costs_one_history_call(self):
+        self.syncer.bootstrap()
+        self.fake.calls.clear()
+
+        self.assertEqual(self.syncer.sync(), 0)
+        self.assertEqual(self.fake.calls, ["history.list"])
+
+    def test_added_then_deleted_message_is_not_fetched(self):
+        self.syncer.bootstrap()
+        self.fake.calls.clear()
+
+        self.fake.add_message("tmp")
+        self.fake.delete_message("tmp")
+        self.syncer.sync()
+
+        self.assertNotIn("tmp", self._labels())
+        self.assertNotIn("messages.get", self.fake.calls)
+
+    def test_expired_history_raises(self):
+        from apps.mail.models import MailboxSyncState
+        from apps.mail.sync import HistoryExpiredError
+
+        self.syncer.bootstrap()
+        for i in range(3):
+            self.fake.add_message(f"n{i}")
+        MailboxSyncState.objects.filter(user=self.user).update(history_id="1")
+
+        with self.assertRaises(HistoryExpiredError):
+            self.syncer.sync()
+
+    def test_backfill_extends_incomplete_mirror(self):
+        from apps.mail import sync as sync_module
+
+        for i in range(3, 8):
+            self.fake.add_message(f"m{i}", record=False)
+
+        with patch.object(sync_module, "BOOTSTRAP_PAGE_SIZE", 3):
+            state = self.syncer.bootstrap()
+            self.assertFalse(state.is_complete)
+            self.assertEqual(len(self._labels()), 3)
+
+            added = self.syncer.backfill()
+
+        self.assertEqual(added, 5)
+        self.assertEqual(len(self._labels()), 8)
+
+
+class EmailListViewMirrorTest(TestCase):
+    def setUp(self):
+        from apps.mail.models import MailboxMessage, MailboxSyncState
+
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create(email="mirrorview@example.com")
+        MailboxSyncState.objects.create(user=self.user, history_id="10", is_complete=True)
+        for i in range(5):
+            MailboxMessage.objects.create(
+                user=self.user,
+                message_id=f"m{i}",
+                thread_id=f"t{i}",
+                label_ids=["INBOX"] if i % 2 == 0 else ["SENT"],
+                subject=f"Subject {i}",
+                date=timezone.now() - timedelta(hours=5 - i),
+                internal_date=i,
+            )
+
+    @patch("apps.mail.views.list_emails_logic")
+    @patch("apps.mail.views.sync_mailbox_logic", return_value=0)
+    def test_list_served_from_mirror(self, mock_sync, mock_list_logic):
+        request = self.factory.get("/api/mail/emails/", {"max_results": 2, "labels": "INBOX"})
+        force_authenticate(request, user=self.user)
+
+        response = EmailListView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_sync.assert_called_once_with(self.user, self.user.id)
+        mock_list_logic.assert_not_called()
+        self.assertEqual([m["id"] for m in response.data["messages"]], ["m4", "m2"])
+        self.assertEqual(response.data["next_page_token"], "mirror:2")
+        self.assertEqual(response.data["result_size_estimate"], 3)
+
+        request = self.factory.get("/api/mail/emails/", {"max_results": 2, "labels": "INBOX", "page_token": "mirror:2"})
+        force_authenticate(request, user=self.user)
+        response = EmailListView.as_view()(request)
+
+        self.assertEqual([m["id"] for m in response.data["messages"]], ["m0"])
+        self.assertIsNone(response.data["next_page_token"])
+
+    @patch("apps.mail.views.list_newer_emails_logic")
+    @patch("apps.mail.views.sync_mailbox_logic", return_value=0)
+    def test_since_date_served_from_mirror(self, mock_sync, mock_newer_logic):
+        since = (timezone.now() - timedelta(hours=2, minutes=30)).isoformat()
+        request = self.factory.get("/api/mail/emails/", {"since_date": since, "labels": "INBOX"})
+        force_authenticate(request, user=self.user)
+
+        response = EmailListView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_newer_logic.assert_not_called()
+        self.assertEqual([m["id"] for m in response.data["messages"]], ["m4"])
+
+    @patch("apps.mail.views.bootstrap_mailbox_mirror")
+    @patch("apps.mail.views.list_emails_logic")
+    @patch("apps.mail.views.sync_mailbox_logic")
+    def test_expired_history_falls_back_and_rebuilds(self, mock_sync, mock_list_logic, mock_task):
+        from apps.mail.models import MailboxSyncState
+        from apps.mail.sync import HistoryExpiredError
+
+        mock_sync.side_effect = HistoryExpiredError("too old")
+        mock_list_logic.return_value = ({"nextPageToken": "gmail-token", "resultSizeEstimate": 0}, [])
+
+        request = self.factory.get("/api/mail/emails/")
+        force_authenticate(request, user=self.user)
+        response = EmailListView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_list_logic.assert_called_once()
+        mock_task.delay.assert_called_once_with(self.user.id)
+        self.assertFalse(MailboxSyncState.objects.get(user=self.user).is_ready)
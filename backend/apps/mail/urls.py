@@ -3,6 +3,7 @@ from django.urls import path
 
 from .views import (
     EmailAttachmentDownloadView,
+    EmailBatchDetailView,
     EmailDetailView,
     EmailListView,
     EmailMarkReadView,
@@ -13,6 +14,7 @@ from .views import (
 urlpatterns = [
     path("emails/", EmailListView.as_view(), name="email_list"),
     path("emails/send/", EmailSendView.as_view(), name="email_send"),
+    path("emails/batch/", EmailBatchDetailView.as_view(), name="email_batch_detail"),
     path("emails/<str:message_id>/", EmailDetailView.as_view(), name="email_detail"),
     path("emails/<str:message_id>/read/", EmailMarkReadView.as_view(), name="email_mark_read"),
     path(
@@ -15,6 +15,11 @@ def text_to_html(text_str: str) -> str:
     return esc.replace("\n", "<br>")
 
 
+def normalize_email(email: str | None) -> str:
+    """Address in the form used for comparisons (surrounding whitespace and case ignored)."""
+    return (email or "").strip().lower()
+
+
 def compare_iso_datetimes(s1, s2) -> int:
     """
     Compare two ISO8601 datetime strings.
@@ -1,4 +1,6 @@
+import logging
 import urllib
+from datetime import timedelta
 from email.utils import parseaddr
 
 from cryptography.fernet import Fernet
@@ -22,14 +24,18 @@ from rest_framework.views import APIView
 from apps.user.models import GoogleAccount, User
 from apps.user.services import google_refresh
 
-from ..ai.tasks import analyze_speech
+from ..ai.services.context_cache import bump_prompt_context_version
+from ..ai.services.reply_prefetch import claim_reply_prefetch
+from ..ai.tasks import analyze_speech, prefetch_reply
 from ..contact.models import Contact
 from ..core.mixins import AuthRequiredMixin
 from ..core.utils.docs import extend_schema_with_common_errors
-from .models import SentMail
+from .models import MailboxSyncState, SentMail
 from .serializers import (
     AttachmentQuerySerializer,
+    EmailBatchDetailQuerySerializer,
     EmailDetailSerializer,
+    EmailListMetadataSerializer,
     EmailListQuerySerializer,
     EmailListSerializer,
     EmailMarkReadRequestSerializer,
@@ -42,11 +48,24 @@ from .services import (
     delete_email_logic,
     get_attachment_logic,
     get_email_detail_logic,
+    get_email_details_batch_logic,
     list_emails_logic,
     list_newer_emails_logic,
     mark_read_logic,
     send_email_logic,
 )
+from .sync import (
+    HistoryExpiredError,
+    is_mirror_page_token,
+    list_mirrored_emails_logic,
+    list_newer_mirrored_emails_logic,
+    sync_mailbox_logic,
+)
+from .tasks import bootstrap_mailbox_mirror
+
+logger = logging.getLogger(__name__)
+
+MIRROR_BOOTSTRAP_RETRY_AFTER = timedelta(minutes=10)
 
 
 class EmailListView(AuthRequiredMixin, generics.GenericAPIView):
@@ -94,6 +113,17 @@ class EmailListView(AuthRequiredMixin, generics.GenericAPIView):
                     "If provided, only newer emails will be returned."
                 ),
             ),
+            OpenApiParameter(
+                name="view",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=["full", "metadata"],
+                description=(
+                    'Default "full". "metadata" skips body / attachments (Gmail format=metadata); '
+                    "hydrate them via /emails/<id>/ or /emails/batch/?ids=..."
+                ),
+            ),
         ],
         responses={
             200: OpenApiResponse(
@@ -119,6 +149,7 @@ class EmailListView(AuthRequiredMixin, generics.GenericAPIView):
         - max_results: int (default 20, max 100)
         - page_token: str (for pagination)
         - labels: str (comma-separated, e.g. "INBOX,UNREAD")
+        - view: "full" (default) | "metadata"
         """
         user = request.user
 
@@ -130,19 +161,51 @@ class EmailListView(AuthRequiredMixin, generics.GenericAPIView):
         labels = qs.validated_data.get("labels") or "INBOX"
         label_ids = [s.strip() for s in labels.split(",")] if labels else ["INBOX"]
         since_date = qs.validated_data.get("since_date", None)
+        metadata_only = qs.validated_data.get("view") == "metadata"
+        # 기존 호출 시그니처는 유지하고, metadata 모드일 때만 인자를 넘긴다
+        mode_kwargs = {"metadata_only": True} if metadata_only else {}
+
+        mirror = MailboxSyncState.objects.filter(user=user).first()
+        use_mirror = mirror is not None and mirror.is_ready and is_mirror_page_token(page_token)
+
+        if use_mirror:
+            # 미러를 Gmail history 기준으로 최신화 (변경이 없으면 history.list 1회)
+            try:
+                sync_mailbox_logic(user, user.id)
+            except HistoryExpiredError:
+                use_mirror = False
+                mirror.history_id = ""
+                mirror.save(update_fields=["history_id", "updated_at"])
+                self._enqueue_mirror_bootstrap(user)
+            except (ValueError, HttpError):
+                use_mirror = False
+        elif mirror is None or (not mirror.is_ready and mirror.updated_at < timezone.now() - MIRROR_BOOTSTRAP_RETRY_AFTER):
+            self._enqueue_mirror_bootstrap(user)
 
         # Call Gmail API with decorator
         try:
-            if since_date is not None:
+            if use_mirror and since_date is not None:
+                result = None
+                messages = list_newer_mirrored_emails_logic(
+                    user,
+                    max_results=max_results,
+                    label_ids=label_ids,
+                    since_date=since_date,
+                    **mode_kwargs,
+                )
+            elif use_mirror:
+                result, messages = list_mirrored_emails_logic(user, max_results, page_token, label_ids, **mode_kwargs)
+            elif since_date is not None:
                 result = None
                 messages = list_newer_emails_logic(
                     user,
                     max_results=max_results,
                     label_ids=label_ids,
                     since_date=since_date,
+                    **mode_kwargs,
                 )
             else:
-                result, messages = list_emails_logic(user, max_results, page_token, label_ids)
+                result, messages = list_emails_logic(user, max_results, page_token, label_ids, **mode_kwargs)
         except ValueError as e:
             return Response({"detail": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
         except HttpError as e:
@@ -165,7 +228,8 @@ class EmailListView(AuthRequiredMixin, generics.GenericAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        serializer = EmailListSerializer(messages, many=True)
+        serializer_class = EmailListMetadataSerializer if metadata_only else EmailListSerializer
+        serializer = serializer_class(messages, many=True)
 
         return Response(
             {
@@ -176,6 +240,89 @@ class EmailListView(AuthRequiredMixin, generics.GenericAPIView):
             status=status.HTTP_200_OK,
         )
 
+    @staticmethod
+    def _enqueue_mirror_bootstrap(user):
+        try:
+            # 빈 상태 row를 먼저 만들어 두어 요청마다 중복으로 enqueue 되지 않게 한다
+            state, created = MailboxSyncState.objects.get_or_create(user=user)
+            if not created:
+                state.save(update_fields=["updated_at"])
+            bootstrap_mailbox_mirror.delay(user.id)
+        except Exception as e:
+            logger.warning(f"Failed to enqueue mailbox mirror bootstrap for user={user.id}: {e}")
+
+
+class EmailBatchDetailView(AuthRequiredMixin, generics.GenericAPIView):
+    """
+    GET /api/mail/emails/batch/?ids=<id>,<id>,...
+    Hydrate body + attachments for several emails listed with view=metadata
+    """
+
+    query_serializer_class = EmailBatchDetailQuerySerializer
+
+    @extend_schema_with_common_errors(
+        summary="Get email details in bulk",
+        request=None,
+        parameters=[
+            OpenApiParameter(
+                name="ids",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=True,
+                description="Comma-separated Gmail message IDs (max 100)",
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=inline_serializer(
+                    name="EmailBatchDetailResponse",
+                    fields={
+                        "messages": EmailDetailSerializer(many=True),
+                        "not_found": serializers.ListField(child=serializers.CharField()),
+                    },
+                ),
+                description="messages (in ids order) + ids that could not be fetched",
+            ),
+        },
+    )
+    def get(self, request):
+        user = request.user
+
+        qs = self.query_serializer_class(data=request.query_params)
+        qs.is_valid(raise_exception=True)
+        message_ids = qs.validated_data["ids"]
+
+        try:
+            messages = get_email_details_batch_logic(user, message_ids)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+        except HttpError as e:
+            if e.resp.status == 403:
+                return Response(
+                    {"detail": "Rate limit exceeded or permission denied"},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                )
+            elif e.resp.status == 401:
+                return Response({"detail": "Authentication failed"}, status=status.HTTP_401_UNAUTHORIZED)
+            return Response(
+                {"detail": f"Gmail API error: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        except Exception as e:
+            return Response(
+                {"detail": f"Unexpected error: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        found = {m["id"] for m in messages}
+        return Response(
+            {
+                "messages": EmailDetailSerializer(messages, many=True).data,
+                "not_found": [mid for mid in message_ids if mid not in found],
+            },
+            status=status.HTTP_200_OK,
+        )
+
 
 class EmailDetailView(AuthRequiredMixin, generics.GenericAPIView):
     """
@@ -218,9 +365,25 @@ class EmailDetailView(AuthRequiredMixin, generics.GenericAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+        self._enqueue_reply_prefetch(user, message)
         serializer = EmailDetailSerializer(message)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @staticmethod
+    def _enqueue_reply_prefetch(user, message: dict):
+        # 받은 메일을 열면 답장 옵션을 미리 만들어 둔다 (보낸/임시 메일, 본인이 보낸 메일은 제외)
+        label_ids = message.get("label_ids") or []
+        if "SENT" in label_ids or "DRAFT" in label_ids:
+            return
+        sender = parseaddr(message.get("from") or "")[1].strip().lower()
+        if not sender or sender == (user.email or "").lower():
+            return
+        try:
+            if claim_reply_prefetch(user.id, message["id"]):
+                prefetch_reply.delay(user.id, message["id"], message.get("subject") or "", message.get("body") or "", sender)
+        except Exception as e:
+            logger.warning(f"Failed to enqueue reply prefetch for user={user.id}, message={message.get('id')}: {e}")
+
     @extend_schema_with_common_errors(
         summary="Delete email",
         description=(
@@ -364,6 +527,8 @@ class EmailSendView(AuthRequiredMixin, generics.GenericAPIView):
                     ]
                     with transaction.atomic():
                         SentMail.objects.bulk_create(rows, batch_size=1000)
+                    # bulk_create는 signal이 없으므로 few-shot이 바뀐 프롬프트 컨텍스트 캐시를 직접 무효화
+                    bump_prompt_context_version(user.id)
         except Exception:
             # 기록 실패는 메일 전송까지 실패하게 하지는 않음
             pass
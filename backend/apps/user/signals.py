@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import GoogleAccount
+from .utils import invalidate_cached_token
+
+
+@receiver(post_save, sender=GoogleAccount)
+@receiver(post_delete, sender=GoogleAccount)
+def invalidate_google_token_cache(sender, instance, **kwargs):
+    # 재연동 / 토큰 갱신 / 연동 해제 시 캐시된 access token을 버린다
+    invalidate_cached_token(instance.user_id)
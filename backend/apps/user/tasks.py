@@ -0,0 +1,31 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .models import GoogleAccount
+from .utils import recently_active_user_ids, refresh_google_token
+
+logger = logging.getLogger(__name__)
+
+# beat 주기(5분)보다 넉넉하게 잡아, 요청 스레드에서 동기 refresh가 일어나지 않게 한다
+PREREFRESH_WINDOW = timedelta(minutes=10)
+
+
+@shared_task
+def refresh_expiring_google_tokens():
+    """Refresh soon-to-expire Google access tokens of recently active users and warm the token cache."""
+    expiring = GoogleAccount.objects.filter(expires_at__lte=timezone.now() + PREREFRESH_WINDOW).values_list("user_id", flat=True)
+    user_ids = recently_active_user_ids(expiring)
+
+    refreshed = 0
+    for user_id in sorted(user_ids):
+        try:
+            refresh_google_token(user_id, min_valid=PREREFRESH_WINDOW)
+            refreshed += 1
+        except Exception as e:
+            # 폐기된 refresh token 등은 다음 요청에서 다시 처리되므로 건너뛴다
+            logger.warning(f"Failed to pre-refresh Google token for user={user_id}: {e}")
+
+    return refreshed
@@ -481,6 +481,92 @@ class GoogleTokenRequiredDecoratorTest(TestCase):
         self.assertIn("Google account not linked", str(ctx.exception))
 
 
+class GoogleTokenCacheTest(TestCase):
+    """
+    get_google_access_token / refresh_google_token 캐시 + single-flight 동작 테스트
+    """
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        from apps.user.utils import _local_tokens
+
+        _local_tokens.clear()
+        cache.clear()
+
+        self.fernet = Fernet(settings.ENCRYPTION_KEY)
+        self.user = User.objects.create(email="cache@example.com", name="C")
+        self.ga = GoogleAccount.objects.create(
+            user=self.user,
+            access_token=self.fernet.encrypt(b"ACCESS_1").decode(),
+            refresh_token=self.fernet.encrypt(b"REFRESH").decode(),
+            expires_at=timezone.now() + timedelta(minutes=30),
+        )
+
+    def test_second_call_hits_no_database_and_no_decrypt(self):
+        from apps.user.utils import get_google_access_token
+
+        self.assertEqual(get_google_access_token(User.objects.get(pk=self.user.pk)), "ACCESS_1")
+
+        with self.assertNumQueries(0), patch("apps.user.utils.Fernet") as mock_fernet:
+            self.assertEqual(get_google_access_token(self.user), "ACCESS_1")
+        mock_fernet.assert_not_called()
+
+    def test_shared_cache_serves_other_processes(self):
+        from apps.user.utils import _local_tokens, get_google_access_token
+
+        get_google_access_token(self.user)
+        _local_tokens.clear()  # 다른 프로세스 흉내
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_google_access_token(self.user), "ACCESS_1")
+
+    def test_saving_account_invalidates_cache(self):
+        from apps.user.utils import get_google_access_token
+
+        get_google_access_token(self.user)
+        self.ga.access_token = self.fernet.encrypt(b"ACCESS_2").decode()
+        self.ga.save()
+
+        self.assertEqual(get_google_access_token(User.objects.get(pk=self.user.pk)), "ACCESS_2")
+
+    @patch("apps.user.utils.google_refresh")
+    def test_refresh_is_skipped_when_already_refreshed(self, mock_google_refresh):
+        """lock을 기다리는 동안 다른 요청이 갱신했다면 google_refresh를 다시 부르지 않는다"""
+        from apps.user.utils import refresh_google_token
+
+        self.assertEqual(refresh_google_token(self.user.id), "ACCESS_1")
+        mock_google_refresh.assert_not_called()
+
+    def test_refresh_locks_do_not_grow_with_users(self):
+        from apps.user.utils import REFRESH_LOCK_STRIPES, _refresh_lock, _refresh_locks
+
+        locks = {id(_refresh_lock(user_id)) for user_id in range(10 * REFRESH_LOCK_STRIPES)}
+
+        self.assertEqual(len(locks), REFRESH_LOCK_STRIPES)
+        self.assertEqual(len(_refresh_locks), REFRESH_LOCK_STRIPES)
+        self.assertIs(_refresh_lock(self.user.id), _refresh_lock(self.user.id + REFRESH_LOCK_STRIPES))
+
+    @patch("apps.user.utils.google_refresh", return_value="REFRESHED")
+    def test_beat_task_refreshes_only_recently_active_users(self, mock_google_refresh):
+        from apps.user.tasks import refresh_expiring_google_tokens
+        from apps.user.utils import get_google_access_token
+
+        idle = User.objects.create(email="idle@example.com", name="I")
+        GoogleAccount.objects.create(
+            user=idle,
+            access_token=self.fernet.encrypt(b"IDLE").decode(),
+            refresh_token="x",
+            expires_at=timezone.now() + timedelta(minutes=3),
+        )
+        get_google_access_token(self.user)
+        GoogleAccount.objects.filter(pk=self.ga.pk).update(expires_at=timezone.now() + timedelta(minutes=3))
+
+        self.assertEqual(refresh_expiring_google_tokens(), 1)
+        mock_google_refresh.assert_called_once()
+        self.assertEqual(mock_google_refresh.call_args.args[0].user_id, self.user.id)
+
+
 # ============================================================
 # NEW 2: google_refresh (services.py) 테스트
 # ============================================================
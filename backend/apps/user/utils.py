@@ -1,28 +1,173 @@
 # myapp/utils.py
+import threading
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
 from functools import wraps
 
 from cryptography.fernet import Fernet
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 
 from .models import GoogleAccount
 from .services import google_refresh  # 필요 시 import
 
+# 만료 직전 토큰으로 Gmail 호출이 실패하지 않도록 조금 일찍 만료로 본다
+TOKEN_EXPIRY_MARGIN = timedelta(seconds=60)
+# 다른 프로세스에서 재연동/폐기된 토큰을 너무 오래 쥐고 있지 않도록 로컬 캐시 수명 상한
+LOCAL_TOKEN_TTL = timedelta(minutes=5)
+LOCAL_TOKEN_CACHE_SIZE = 1024
+SHARED_TOKEN_CACHE_KEY = "google_access_token:{user_id}"
+# 최근에 토큰을 쓴 유저만 beat에서 미리 갱신한다 (비활성 유저 토큰을 계속 연장하지 않도록)
+ACTIVE_TOKEN_CACHE_KEY = "google_token_active:{user_id}"
+ACTIVE_TOKEN_WINDOW = timedelta(hours=1)
+
+
+class _LocalTokenCache:
+    """Bounded LRU of decrypted access tokens: user_id -> (access_token, valid_until)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[int, tuple[str, datetime]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> str | None:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] <= timezone.now():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return entry[0]
+
+    def set(self, user_id: int, access_token: str, valid_until: datetime) -> None:
+        with self._lock:
+            self._data[user_id] = (access_token, valid_until)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_local_tokens = _LocalTokenCache(LOCAL_TOKEN_CACHE_SIZE)
+# 유저마다 Lock을 두면 프로세스가 오래 돌수록 한 번이라도 갱신한 유저 수만큼 쌓이므로 고정 개수를 user_id로 나눠 쓴다
+# (같은 칸의 다른 유저와는 갱신이 직렬화되지만, 갱신은 토큰 수명마다 한 번뿐이라 드묾)
+REFRESH_LOCK_STRIPES = 64
+_refresh_locks = tuple(threading.Lock() for _ in range(REFRESH_LOCK_STRIPES))
+
+
+def _refresh_lock(user_id: int) -> threading.Lock:
+    return _refresh_locks[user_id % REFRESH_LOCK_STRIPES]
+
+
+def _remember_token(user_id: int, access_token: str, encrypted_token: str, expires_at: datetime) -> None:
+    valid_until = expires_at - TOKEN_EXPIRY_MARGIN
+    now = timezone.now()
+    if valid_until <= now:
+        return
+
+    _local_tokens.set(user_id, access_token, min(valid_until, now + LOCAL_TOKEN_TTL))
+    _mark_active(user_id)
+    # Redis에는 암호문만 둔다 (복호화는 프로세스 로컬 캐시가 비었을 때만)
+    cache.set(
+        SHARED_TOKEN_CACHE_KEY.format(user_id=user_id),
+        (encrypted_token, valid_until.timestamp()),
+        timeout=int((valid_until - now).total_seconds()),
+    )
+
+
+def _mark_active(user_id: int) -> None:
+    cache.set(ACTIVE_TOKEN_CACHE_KEY.format(user_id=user_id), 1, timeout=int(ACTIVE_TOKEN_WINDOW.total_seconds()))
+
+
+def recently_active_user_ids(user_ids) -> set[int]:
+    """Subset of user_ids whose token was served within ACTIVE_TOKEN_WINDOW."""
+    keys = {ACTIVE_TOKEN_CACHE_KEY.format(user_id=uid): uid for uid in user_ids}
+    return {keys[k] for k in cache.get_many(list(keys))}
+
+
+def invalidate_cached_token(user_id: int) -> None:
+    _local_tokens.pop(user_id)
+    cache.delete(SHARED_TOKEN_CACHE_KEY.format(user_id=user_id))
+
+
+def refresh_google_token(user_id: int, min_valid: timedelta = TOKEN_EXPIRY_MARGIN) -> str:
+    """
+    Single-flight refresh: return an access token valid for at least min_valid,
+    calling google_refresh() only if nobody else has already done so.
+
+    - 같은 프로세스의 스레드는 유저별 Lock으로, 다른 프로세스는 GoogleAccount row lock으로 직렬화
+    - lock을 얻은 뒤 만료 시각을 다시 확인하므로 동시 요청이 몰려도 Google 호출과 row 쓰기는 한 번뿐
+    """
+    with _refresh_lock(user_id):
+        with transaction.atomic():
+            try:
+                google_account = GoogleAccount.objects.select_for_update().get(user_id=user_id)
+            except GoogleAccount.DoesNotExist as e:
+                raise ValueError("Google account not linked") from e
+
+            if google_account.expires_at > timezone.now() + min_valid:
+                fernet = Fernet(settings.ENCRYPTION_KEY)
+                access_token = fernet.decrypt(google_account.access_token.encode()).decode()
+            else:
+                access_token = google_refresh(google_account)
+
+        _remember_token(user_id, access_token, google_account.access_token, google_account.expires_at)
+        return access_token
+
+
+def get_google_access_token(user) -> str:
+    """
+    Decrypted Google access token for user.
+
+    Lookup order: process-local LRU -> shared cache (Redis) -> DB (+ single-flight refresh if expired).
+    """
+    access_token = _local_tokens.get(user.id)
+    if access_token is not None:
+        return access_token
+
+    fernet = Fernet(settings.ENCRYPTION_KEY)
+
+    shared = cache.get(SHARED_TOKEN_CACHE_KEY.format(user_id=user.id))
+    if shared is not None:
+        encrypted_token, valid_until = shared
+        if valid_until > timezone.now().timestamp():
+            access_token = fernet.decrypt(encrypted_token.encode()).decode()
+            _local_tokens.set(
+                user.id,
+                access_token,
+                min(datetime.fromtimestamp(valid_until, tz=UTC), timezone.now() + LOCAL_TOKEN_TTL),
+            )
+            _mark_active(user.id)
+            return access_token
+
+    try:
+        google_account = user.google_accounts
+    except GoogleAccount.DoesNotExist as e:
+        raise ValueError("Google account not linked") from e
+
+    if google_account.expires_at <= timezone.now() + TOKEN_EXPIRY_MARGIN:
+        return refresh_google_token(user.id)
+
+    access_token = fernet.decrypt(google_account.access_token.encode()).decode()
+    _remember_token(user.id, access_token, google_account.access_token, google_account.expires_at)
+    return access_token
+
 
 def google_token_required(func):
     @wraps(func)
     def wrapper(user, *args, **kwargs):
-        try:
-            google_account = user.google_accounts
-        except GoogleAccount.DoesNotExist as e:
-            raise ValueError("Google account not linked") from e
-
-        if google_account.expires_at <= timezone.now():
-            access_token = google_refresh(google_account)
-        else:
-            fernet = Fernet(settings.ENCRYPTION_KEY)
-            access_token = fernet.decrypt(google_account.access_token.encode()).decode()
-
+        access_token = get_google_access_token(user)
         return func(access_token, *args, **kwargs)
 
     return wrapper
@@ -23,4 +23,13 @@ app.conf.beat_schedule = {
         "schedule": crontab(hour="*/3", minute=30),  # 매 3시간마다 30분에 실행
         "args": [10],
     },
+    "report_analysis_dedup": {
+        "task": "apps.ai.tasks.report_analysis_dedup",
+        "schedule": crontab(hour=9, minute=10),  # 통계 날짜는 UTC 기준 → UTC 자정 직후 전날 통계까지 남김
+        "args": [2],
+    },
+    "refresh_google_tokens": {
+        "task": "apps.user.tasks.refresh_expiring_google_tokens",
+        "schedule": crontab(minute="*/5"),  # 5분마다 곧 만료될 토큰을 미리 갱신
+    },
 }
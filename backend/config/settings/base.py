@@ -140,15 +140,18 @@ DATABASES = {
     }
 }
 
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django_redis.cache.RedisCache",
-#         "LOCATION": env("CACHE_URL"),
-#         "OPTIONS": {
-#             "CLIENT_CLASS": "django_redis.client.DefaultClient",
-#         },
-#     }
-# }
+# CACHE_URL이 없으면 Django 기본(프로세스 로컬 LocMemCache)을 사용 (테스트용)
+# 서버와 celery worker 가 캐시를 공유해야 하므로 docker-compose / .env_example 에서 redis 를 지정한다
+if env("CACHE_URL", default=""):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": env("CACHE_URL"),
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
+    }
 
 # CELERY
 CELERY_ALWAYS_EAGER = False
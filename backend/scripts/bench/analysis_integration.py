@@ -0,0 +1,136 @@
+"""
+unified_analysis cost: scanning every (user, contact) / (user, group) pair vs draining the dirty set.
+
+Creates one throwaway user with --contacts contacts spread over --groups groups, each already
+integrated (one MailAnalysisResult + Contact/GroupAnalysisResult pointing at it). --dirty of the
+contacts then receive a new analysis. integrate_chain is a RunnableLambda sleeping --llm-latency
+seconds. Everything runs inside a transaction that is rolled back at the end.
+
+  scan : previous unified_analysis — every pair of MailAnalysisResult is looked up, stale ones
+         integrated one invoke() at a time from their latest n rows
+  dirty: integrate_pending_analyses — only keys marked by analyze_speech, folded into the
+         existing result, integrate_chain.batch with bounded concurrency
+
+Usage (from backend/, with the usual .env and a migrated database):
+    python scripts/bench/analysis_integration.py [--contacts 300] [--groups 30] [--dirty 0.05]
+"""
+
+import argparse
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from apps.ai.models import ContactAnalysisResult, GroupAnalysisResult, MailAnalysisResult  # noqa: E402
+from apps.ai.services import analysis  # noqa: E402
+from apps.ai.services.analysis_integration import ANALYSIS_FIELDS, integrate_pending_analyses, mark_analysis_dirty  # noqa: E402
+from apps.contact.models import Contact, Group  # noqa: E402
+from apps.user.models import User  # noqa: E402
+
+FIELDS = {
+    "lexical_style": {"tone": "polite"},
+    "grammar_patterns": {"ending": "-요"},
+    "emotional_tone": {"warmth": 0.7},
+    "representative_sentences": ["안녕하세요."],
+}
+
+
+class Unified:
+    def model_dump(self):
+        return dict(FIELDS)
+
+
+def scan(n: int) -> int:
+    # 이전 unified_analysis 의 골격 (모든 쌍을 훑고, 최신 분석이 반영되지 않은 쌍을 하나씩 통합)
+    integrated = 0
+    for model, key, lookup in (
+        (ContactAnalysisResult, "contact_id", "contact_id"),
+        (GroupAnalysisResult, "group_id", "contact__group_id"),
+    ):
+        for pair in MailAnalysisResult.objects.values("user_id", lookup).distinct():
+            if pair[lookup] is None:
+                continue
+            results_qs = MailAnalysisResult.objects.filter(user_id=pair["user_id"], **{lookup: pair[lookup]}).order_by("-id")
+            latest = results_qs.first()
+            result, _ = model.objects.get_or_create(user_id=pair["user_id"], **{key: pair[lookup]}, defaults=FIELDS)
+            if result.last_analysis_id == latest.id:
+                continue
+            data = [{field: getattr(r, field) for field in ANALYSIS_FIELDS} for r in results_qs[:n]]
+            unified = analysis.integrate_analysis(data).model_dump()
+            for field in ANALYSIS_FIELDS:
+                setattr(result, field, unified[field])
+            result.last_analysis_id = latest.id
+            result.save()
+            integrated += 1
+    return integrated
+
+
+def seed(contacts: int, groups: int, dirty: float) -> None:
+    user = User.objects.create(email=f"bench-integration-{os.getpid()}@example.com")
+    group_objs = [Group.objects.create(user=user, name=f"g{i}", description="") for i in range(groups)]
+    contact_objs = Contact.objects.bulk_create([Contact(user=user, email=f"c{i}@example.com", group=group_objs[i % groups]) for i in range(contacts)])
+    rows = MailAnalysisResult.objects.bulk_create([MailAnalysisResult(user=user, contact=c, **FIELDS) for c in contact_objs])
+    ContactAnalysisResult.objects.bulk_create(
+        [ContactAnalysisResult(user=user, contact=c, last_analysis_id=r.id, **FIELDS) for c, r in zip(contact_objs, rows, strict=True)]
+    )
+    last_by_group = {c.group_id: r.id for c, r in zip(contact_objs, rows, strict=True)}
+    GroupAnalysisResult.objects.bulk_create(
+        [GroupAnalysisResult(user=user, group_id=g, last_analysis_id=i, **FIELDS) for g, i in last_by_group.items()]
+    )
+
+    changed = contact_objs[: int(contacts * dirty)]
+    MailAnalysisResult.objects.bulk_create([MailAnalysisResult(user=user, contact=c, **FIELDS) for c in changed])
+    mark_analysis_dirty(user.id, contact_ids=[c.id for c in changed], group_ids=[c.group_id for c in changed])
+
+
+def measure(fn, n: int, rollback: bool) -> tuple[int, float, int]:
+    sid = transaction.savepoint()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        integrated = fn(n)
+        elapsed = time.perf_counter() - started
+    if rollback:
+        transaction.savepoint_rollback(sid)
+    return integrated, elapsed, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contacts", type=int, default=300)
+    parser.add_argument("--groups", type=int, default=30)
+    parser.add_argument("--dirty", type=float, default=0.05, help="fraction of contacts with a new analysis")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("-n", type=int, default=10)
+    args = parser.parse_args()
+
+    def fake_integrate(inputs):
+        time.sleep(args.llm_latency)
+        return Unified()
+
+    print(f"{args.contacts} contacts in {args.groups} groups, {args.dirty:.0%} with a new analysis, " f"integrate {args.llm_latency * 1000:.0f} ms")
+    with transaction.atomic(), patch.object(analysis, "integrate_chain", RunnableLambda(fake_integrate)):
+        seed(args.contacts, args.groups, args.dirty)
+        # scan 은 되돌려서 dirty 가 같은 상태에서 시작하게 하고, dirty 의 두 번째 실행 = 새 분석이 없는 주기
+        for name, fn, rollback in (
+            ("scan", scan, True),
+            ("dirty", integrate_pending_analyses, False),
+            ("dirty/idle", integrate_pending_analyses, False),
+        ):
+            integrated, elapsed, queries = measure(fn, args.n, rollback)
+            print(f"[{name:10}] integrated {integrated:4d} | queries {queries:5d} | wall {elapsed * 1000:7.0f} ms")
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+delete_up_n: per-key select + delete round-trips vs one ROW_NUMBER() statement + batched deletes.
+
+Creates one throwaway user with --contacts contacts (every --group-size of them share a group),
+each with --rows MailAnalysisResult rows, then runs both retention passes on the same data
+(savepoint rollback in between). Everything is rolled back at the end.
+
+  per-key : previous delete_up_n — values().annotate(Count) per contact and per group,
+            then one select + one delete for every over-limit key
+  window  : delete_up_n — ROW_NUMBER() OVER (PARTITION BY contact / group) once, DELETE in batches
+
+Usage (from backend/, with the usual .env and a migrated database):
+    python scripts/bench/analysis_retention.py [--contacts 2000] [--rows 15] [-n 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.db.models import Count  # noqa: E402
+
+from apps.ai.models import MailAnalysisResult  # noqa: E402
+from apps.ai.tasks import delete_up_n  # noqa: E402
+from apps.contact.models import Contact, Group  # noqa: E402
+from apps.user.models import User  # noqa: E402
+
+FIELDS = {
+    "lexical_style": {"tone": "polite"},
+    "grammar_patterns": {"ending": "-요"},
+    "emotional_tone": {"warmth": 0.7},
+    "representative_sentences": ["안녕하세요."],
+}
+
+
+def per_key(n: int) -> int:
+    # 이전 delete_up_n 의 골격
+    deleted = 0
+    for key in ("contact", "contact__group"):
+        for entry in MailAnalysisResult.objects.values(key).annotate(count=Count("id")).filter(count__gt=n):
+            old_ids = MailAnalysisResult.objects.filter(**{key: entry[key]}).order_by("created_at").values_list("id", flat=True)[: entry["count"] - n]
+            deleted += MailAnalysisResult.objects.filter(id__in=list(old_ids)).delete()[0]
+    return deleted
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def seed(contacts: int, rows: int, group_size: int) -> None:
+    user = User.objects.create(email=f"bench-retention-{os.getpid()}@example.com")
+    groups = Group.objects.bulk_create([Group(user=user, name=f"g{i}", description="") for i in range(contacts // group_size)])
+    contact_objs = Contact.objects.bulk_create(
+        [
+            Contact(user=user, email=f"c{i}@example.com", group=groups[i // group_size] if i // group_size < len(groups) else None)
+            for i in range(contacts)
+        ]
+    )
+    MailAnalysisResult.objects.bulk_create(
+        [MailAnalysisResult(user=user, contact=c, **FIELDS) for c in contact_objs for _ in range(rows)], batch_size=5000
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contacts", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=15)
+    parser.add_argument("--group-size", type=int, default=20)
+    parser.add_argument("-n", type=int, default=10)
+    args = parser.parse_args()
+
+    with transaction.atomic():
+        seed(args.contacts, args.rows, args.group_size)
+        total = MailAnalysisResult.objects.count()
+        print(f"{total} MailAnalysisResult rows ({args.contacts} contacts x {args.rows}, groups of {args.group_size}), keep {args.n}")
+        for name, fn in (("per-key", per_key), ("window", lambda n: delete_up_n(n=n))):
+            sid = transaction.savepoint()
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                deleted = fn(args.n)
+                elapsed = time.perf_counter() - started
+            transaction.savepoint_rollback(sid)
+            print(f"[{name:7}] deleted {deleted:7d} | queries {queries.count:5d} | wall {elapsed * 1000:7.0f} ms")
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Simulated typing: GPU work spent per typed character by the autocomplete relay.
+
+Each simulated socket types a Korean sentence with human-like timing (~110 ms between
+keys, longer pauses between words and after punctuation) through MailGenerateConsumer.receive.
+A stub GPU server (uvicorn, separate thread) models the inference queue of gpu-server:
+--slots concurrent generations of --inference seconds each, split into decode steps.
+
+  legacy : every keystroke is relayed immediately and every queued /predict is generated
+  current: keystroke bursts are debounced into one request, every request carries (session, seq),
+           and the stub — like gpu-server's SessionTracker — skips queued requests whose seq
+           is stale and stops a generation as soon as a newer keystroke of the session arrives
+
+Reported per mode: /predict calls and full generations per typed character, generations whose
+result was already superseded when they finished (wasted), GPU busy time, and the latency from
+each socket's last keystroke until a suggestion for the final text is ready.
+
+No Redis / DB access: prompt contexts are pre-warmed in the context cache.
+
+Usage (from backend/, with the usual .env):
+    python scripts/bench/autocomplete_typing.py [--sockets 20] [--slots 4] [--inference 0.2] [--seed 7]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+import uvicorn  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from apps.ai import consumers  # noqa: E402
+from apps.ai.services import gpu_relay  # noqa: E402
+from apps.ai.services.context_cache import prompt_context_key, set_cached_prompt_context  # noqa: E402
+
+SENTENCE = "안녕하세요 오늘 회의 진행을 맡은 홍길동 대리입니다. 자료는 미리 공유드리겠습니다."
+TO_EMAILS = ["alice@example.com"]
+WARM_CONTEXT = {
+    "group_name": "Team Alpha",
+    "group_description": "Internal team comms",
+    "prompt_options": ["Please respond politely."],
+    "personal_prompt": None,
+    "sender_role": None,
+    "recipient_role": None,
+    "language": "ko",
+    "fewshots": [],
+    "analysis": None,
+    "profile": None,
+}
+DECODE_STEPS = 10
+
+
+class StubInferenceServer:
+    """ASGI /predict stub with a FIFO inference queue served by `slots` workers."""
+
+    def __init__(self, slots: int, inference: float, skip_stale: bool):
+        self.slots = slots
+        self.inference = inference
+        self.skip_stale = skip_stale
+        self.latest: dict[str, int] = {}
+        self.queue: deque = deque()
+        self.wakeup: asyncio.Event | None = None
+        self.workers: list[asyncio.Task] = []
+        self.requests = 0
+        self.generated = 0
+        self.wasted = 0
+        self.skipped = 0
+        self.stopped = 0
+        self.busy = 0.0
+        # session -> (seq, 완료 시각): 해당 세션에서 마지막으로 끝난 유효한 생성
+        self.fresh_done: dict[str, tuple[int, float]] = {}
+
+    def _stale(self, job) -> bool:
+        return job["seq"] < self.latest.get(job["session_id"], job["seq"])
+
+    async def _worker(self):
+        while True:
+            while not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+            job = self.queue.popleft()
+            if self.skip_stale and self._stale(job):
+                self.skipped += 1
+                continue
+
+            started = time.perf_counter()
+            for _ in range(DECODE_STEPS):
+                if self.skip_stale and self._stale(job):
+                    break
+                await asyncio.sleep(self.inference / DECODE_STEPS)
+            self.busy += time.perf_counter() - started
+
+            if self.skip_stale and self._stale(job):
+                self.stopped += 1
+                continue
+            self.generated += 1
+            if self._stale(job):
+                self.wasted += 1  # 끝까지 생성했지만 이미 더 새 키 입력이 있었음
+            else:
+                self.fresh_done[job["session_id"]] = (job["seq"], time.perf_counter())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    self.wakeup = asyncio.Event()
+                    self.workers = [asyncio.create_task(self._worker()) for _ in range(self.slots)]
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    for worker in self.workers:
+                        worker.cancel()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        body, more_body = b"", True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        job = json.loads(body)
+        self.requests += 1
+        self.latest[job["session_id"]] = max(job["seq"], self.latest.get(job["session_id"], 0))
+        self.queue.append(job)
+        self.wakeup.set()
+
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps({"status": "started"}).encode()})
+
+
+def start_stub(app: StubInferenceServer) -> tuple[uvicorn.Server, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}/"
+
+
+def typing_delays(rng: random.Random) -> list[float]:
+    delays = []
+    for ch in SENTENCE:
+        delay = max(0.04, rng.gauss(0.11, 0.04))
+        if ch == " ":
+            delay += rng.uniform(0.1, 0.5)  # 단어 사이에 잠깐 멈춤
+        elif ch == ".":
+            delay += rng.uniform(0.6, 1.2)  # 문장 끝에서 제안을 읽는 시간
+        delays.append(delay)
+    return delays
+
+
+def make_socket(idx: int):
+    consumer = consumers.MailGenerateConsumer()
+    consumer.user = SimpleNamespace(id=200_000 + idx, is_authenticated=True)
+    consumer.suggest_task = None
+    consumer.session_id = f"typing-{idx}"
+    consumer.seq = 0
+    consumer.gpu_semaphore = gpu_relay.user_semaphore(consumer.user.id)
+
+    async def send(text_data=None, bytes_data=None, close=False):
+        pass
+
+    consumer.send = send
+    return consumer
+
+
+async def type_sentence(consumer, delays: list[float]) -> float:
+    for i, delay in enumerate(delays):
+        await consumer.receive(json.dumps({"to_emails": TO_EMAILS, "text": SENTENCE[: i + 1], "body": ""}))
+        if i < len(delays) - 1:
+            await asyncio.sleep(delay)
+    if consumer.suggest_task is not None:
+        await asyncio.gather(consumer.suggest_task, return_exceptions=True)
+    return time.perf_counter()
+
+
+async def run_mode(stub: StubInferenceServer, args) -> list[float]:
+    rng = random.Random(args.seed)
+    sockets = [make_socket(i) for i in range(args.sockets)]
+    finished = await asyncio.gather(*(type_sentence(c, typing_delays(rng)) for c in sockets))
+
+    # 마지막 키 입력(= 최종 seq)에 대한 제안이 준비될 때까지
+    latencies = []
+    for consumer, typed_at in zip(sockets, finished, strict=True):
+        while stub.fresh_done.get(consumer.session_id, (0, 0))[0] < consumer.seq:
+            await asyncio.sleep(0.01)
+        latencies.append(stub.fresh_done[consumer.session_id][1] - typed_at)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=20)
+    parser.add_argument("--slots", type=int, default=4, help="concurrent generations on the stub GPU")
+    parser.add_argument("--inference", type=float, default=0.2, help="seconds per full generation")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for i in range(args.sockets):
+        key = prompt_context_key(200_000 + i, TO_EMAILS, include_analysis=True, include_fewshots=False, fewshot_k=3, min_body_len=0)
+        set_cached_prompt_context(key, ({"alice@example.com": "Alice"}, WARM_CONTEXT))
+
+    typed = args.sockets * len(SENTENCE)
+    print(
+        f"{args.sockets} sockets typing {len(SENTENCE)} chars each ({typed} keystrokes), "
+        f"stub GPU {args.slots} slots x {args.inference * 1000:.0f} ms/generation"
+    )
+
+    for name, debounce, skip_stale in (("legacy", 0, False), ("current", consumers.AUTOCOMPLETE_DEBOUNCE_SECONDS, True)):
+        stub = StubInferenceServer(args.slots, args.inference, skip_stale)
+        server, base_url = start_stub(stub)
+        settings.GPU_SERVER_BASEURL = base_url
+
+        with patch.object(consumers, "AUTOCOMPLETE_DEBOUNCE_SECONDS", debounce):
+            latencies = asyncio.run(run_mode(stub, args))
+        server.should_exit = True
+
+        print(
+            f"[{name:7}] /predict {stub.requests / typed:.2f}/char | generations {stub.generated / typed:.2f}/char "
+            f"(wasted {stub.wasted}, skipped in queue {stub.skipped}, stopped early {stub.stopped}) | "
+            f"GPU busy {stub.busy:.1f} s | final suggestion p50 {statistics.median(latencies) * 1000:.0f} ms, "
+            f"max {max(latencies) * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
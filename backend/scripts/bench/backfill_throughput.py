@@ -0,0 +1,170 @@
+"""
+Contact import throughput: per-contact backfill fan-out vs the batched backfill pipeline.
+
+--contacts contacts (in groups of --group-size) each have --per-contact recent SENT mails;
+--shared of those mails went to the whole group (same message for every member). Gmail calls
+cost --gmail-latency seconds each, the analysis model is a RunnableLambda sleeping --llm-latency.
+
+  per-contact: previous flow on --workers Celery worker threads — one list + one batch get per
+               contact, then one analyze_speech task (analysis_chain.invoke) per message
+               (persistence not included, which favours this side)
+  pipeline   : run_backfill — recipients searched 20 per query, shared mails fetched once,
+               identical bodies analyzed once through analysis_chain.batch (bounded concurrency);
+               runs inside a transaction that is rolled back
+
+Usage (from backend/, with the usual .env and a migrated database):
+    python scripts/bench/backfill_throughput.py [--contacts 200] [--workers 4] [--llm-latency 0.3]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from apps.ai.services import analysis, mail_analysis_backfill  # noqa: E402
+from apps.contact.models import Contact, Group  # noqa: E402
+from apps.mail.services import GMAIL_SEARCH_RECIPIENTS_PER_QUERY  # noqa: E402
+from apps.user.models import User  # noqa: E402
+
+FIELDS = {
+    "lexical_style": {"tone": "polite"},
+    "grammar_patterns": {"ending": "-요"},
+    "emotional_tone": {"warmth": 0.7},
+    "representative_sentences": ["안녕하세요."],
+}
+
+
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gmail = 0
+        self.llm = 0
+
+    def add(self, field: str, n: int = 1):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + n)
+
+
+class Analysis:
+    def model_dump(self):
+        return dict(FIELDS)
+
+
+def build_mailbox(contacts: int, group_size: int, per_contact: int, shared: float, seed: int):
+    # {email: [message ids newest first]}, {message id: (subject, body)}
+    rng = random.Random(seed)
+    emails = [f"c{i}@example.com" for i in range(contacts)]
+    sent: dict[str, list[str]] = {e: [] for e in emails}
+    bodies: dict[str, tuple[str, str]] = {}
+    for g in range(0, contacts, group_size):
+        members = emails[g : g + group_size]
+        for n in range(per_contact):
+            if rng.random() < shared:
+                mid = f"group{g}-{n}"
+                bodies[mid] = ("팀 공지", f"{g}번 팀 여러분, {n}차 회의 일정 공유드립니다.")
+                for e in members:
+                    sent[e].append(mid)
+            else:
+                for e in members:
+                    mid = f"{e}-{n}"
+                    bodies[mid] = ("안부", f"{e}님께 드리는 {n}번째 메일입니다.")
+                    sent[e].append(mid)
+    return emails, sent, bodies
+
+
+def per_contact(emails, sent, bodies, args, counter: Counter) -> None:
+    def invoke(inputs):
+        counter.add("llm")
+        time.sleep(args.llm_latency)
+        return Analysis()
+
+    def analyze_speech(subject, body):
+        invoke({"incoming_subject": subject, "incoming_body": body})
+
+    def backfill(email):
+        counter.add("gmail", 2)  # list + batch get
+        time.sleep(2 * args.gmail_latency)
+        return [bodies[mid] for mid in sent[email][: args.per_contact]]
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        tasks = [m for batch in pool.map(backfill, emails) for m in batch]
+        list(pool.map(lambda t: analyze_speech(*t), tasks))
+
+
+def pipeline(emails, sent, bodies, args, counter: Counter) -> None:
+    def fake_list(user, recipients, limit):
+        queries = math.ceil(len(recipients) / GMAIL_SEARCH_RECIPIENTS_PER_QUERY)
+        selected: dict[str, list[str]] = {}
+        for email in recipients:
+            for mid in sent[email.lower()][:limit]:
+                selected.setdefault(mid, []).append(email.lower())
+        counter.add("gmail", 2 * queries + 1)  # list + metadata batch per query, one full batch
+        time.sleep((2 * queries + 1) * args.gmail_latency)
+        return [{"id": mid, "subject": bodies[mid][0], "body": bodies[mid][1]} for mid in selected], selected
+
+    def fake_invoke(inputs):
+        counter.add("llm")
+        time.sleep(args.llm_latency)
+        return Analysis()
+
+    with (
+        transaction.atomic(),
+        patch.object(mail_analysis_backfill, "list_sent_to_recipients_logic", fake_list),
+        patch.object(analysis, "analysis_chain", RunnableLambda(fake_invoke)),
+    ):
+        user = User.objects.create(email=f"bench-backfill-{os.getpid()}@example.com")
+        groups = Group.objects.bulk_create([Group(user=user, name=f"g{i}", description="") for i in range(0, len(emails), args.group_size)])
+        contacts = Contact.objects.bulk_create([Contact(user=user, email=e, group=groups[i // args.group_size]) for i, e in enumerate(emails)])
+        for c in contacts:
+            mail_analysis_backfill.request_contact_backfill(user.id, c.id)
+        progress = mail_analysis_backfill.run_backfill(user, per_contact_limit=args.per_contact)
+        print(f"             progress: messages {progress.messages} analyzed {progress.analyzed} reused {progress.reused} failed {progress.failed}")
+        transaction.set_rollback(True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contacts", type=int, default=200)
+    parser.add_argument("--group-size", type=int, default=10)
+    parser.add_argument("--per-contact", type=int, default=2)
+    parser.add_argument("--shared", type=float, default=0.3, help="fraction of mails sent to the whole group")
+    parser.add_argument("--workers", type=int, default=4, help="Celery worker concurrency for the per-contact flow")
+    parser.add_argument("--gmail-latency", type=float, default=0.15)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    emails, sent, bodies = build_mailbox(args.contacts, args.group_size, args.per_contact, args.shared, args.seed)
+    print(
+        f"{args.contacts} contacts x {args.per_contact} mails ({args.shared:.0%} group mails, groups of {args.group_size}), "
+        f"gmail {args.gmail_latency * 1000:.0f} ms, llm {args.llm_latency * 1000:.0f} ms, "
+        f"{mail_analysis_backfill.BACKFILL_MAX_CONCURRENCY} concurrent LLM calls / {args.workers} workers"
+    )
+    for name, fn in (("per-contact", per_contact), ("pipeline", pipeline)):
+        counter = Counter()
+        started = time.perf_counter()
+        fn(emails, sent, bodies, args, counter)
+        wall = time.perf_counter() - started
+        print(
+            f"[{name:11}] gmail calls {counter.gmail:5d} | llm calls {counter.llm:5d} | wall {wall:6.1f} s | "
+            f"{args.contacts / wall:6.1f} contacts/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark: per-request Gmail client setup cost.
+
+  before: googleapiclient.discovery.build("gmail", "v1", credentials=...) per request
+          (re-parses the discovery document, new httplib2.Http => new TLS connection)
+  after : GmailService(access_token) (process-wide Resource + per-thread keep-alive Http per request)
+
+No network access is needed; only client construction and request building are timed.
+
+Usage (from backend/):
+    python scripts/bench/gmail_client_setup.py [-n 500]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from google.oauth2.credentials import Credentials  # noqa: E402
+from googleapiclient.discovery import build  # noqa: E402
+
+from apps.mail import services  # noqa: E402
+
+
+def legacy_setup():
+    service = build("gmail", "v1", credentials=Credentials(token="bench-token"))
+    service.users().messages().get(userId="me", id="m1", format="full")
+    return service._http.http
+
+
+def shared_setup():
+    gmail = services.GmailService("bench-token")
+    gmail.service.users().messages().get(userId="me", id="m1", format="full")
+    return gmail._http().http
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=500, help="iterations per variant")
+    args = parser.parse_args()
+
+    # 첫 호출(정적 문서 로딩)은 양쪽 모두 제외하고 정상 상태만 비교
+    legacy_setup()
+    shared_setup()
+
+    for name, fn in (("before (build per request)", legacy_setup), ("after  (shared client)", shared_setup)):
+        seconds = min(timeit.repeat(fn, number=args.n, repeat=3))
+        connections = len({id(fn()) for _ in range(10)})
+        print(f"{name}: {seconds / args.n * 1000:.3f} ms/request, distinct connection pools over 10 requests: {connections}")
+
+
+if __name__ == "__main__":
+    main()
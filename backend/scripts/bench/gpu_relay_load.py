@@ -0,0 +1,234 @@
+"""
+Load test: MailGenerateConsumer keystroke relay against a stub GPU server.
+
+Many simulated sockets type keystrokes concurrently; each keystroke goes through
+MailGenerateConsumer.receive exactly as Channels would dispatch it. The stub GPU
+server (uvicorn, separate thread) answers /predict after --latency seconds.
+
+  legacy : the previous receive() (blocking requests.post inside the event loop)
+  current: async relay on the shared httpx pool, previous suggestion cancelled per keystroke
+
+Reported per mode: wall time, event loop stall (a 10 ms ticker's worst / p99 lateness),
+latency of each socket's last suggestion, and how many /predict calls reached the stub.
+
+No Redis / DB access: prompt contexts are pre-warmed in the context cache as a real
+compose session would after its first keystroke.
+
+Usage (from backend/, with the usual .env):
+    python scripts/bench/gpu_relay_load.py [--sockets 50] [--users 50] [--keystrokes 5] [--interval 0.05] [--latency 0.1]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+import requests  # noqa: E402
+import uvicorn  # noqa: E402
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from apps.ai.consumers import MailGenerateConsumer  # noqa: E402
+from apps.ai.services import gpu_relay  # noqa: E402
+from apps.ai.services.context_cache import prompt_context_key, set_cached_prompt_context  # noqa: E402
+from apps.ai.services.utils import collect_prompt_context  # noqa: E402
+
+TO_EMAILS = ["alice@example.com"]
+WARM_CONTEXT = {
+    "group_name": "Team Alpha",
+    "group_description": "Internal team comms",
+    "prompt_options": ["Please respond politely."],
+    "personal_prompt": None,
+    "sender_role": None,
+    "recipient_role": None,
+    "language": "ko",
+    "fewshots": [],
+    "analysis": None,
+    "profile": None,
+}
+
+
+class StubGpuServer:
+    """ASGI /predict stub: sleeps `latency` then answers like gpu-server ({"status": "started"})."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        more_body = True
+        while more_body:
+            more_body = (await receive()).get("more_body", False)
+
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        body = json.dumps({"status": "started"}).encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    def reset(self):
+        self.requests = self.in_flight = self.max_in_flight = 0
+
+
+def start_stub(app: StubGpuServer) -> tuple[uvicorn.Server, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}/"
+
+
+class LegacyRelayConsumer(MailGenerateConsumer):
+    """receive() before the async relay: blocking requests.post(timeout=5) on the event loop."""
+
+    async def receive(self, text_data):
+        data = json.loads(text_data)
+        ctx = await sync_to_async(collect_prompt_context)(self.user, data.get("to_emails", []))
+        try:
+            response = requests.post(
+                settings.GPU_SERVER_BASEURL + "predict",
+                json={"user_id": self.user.id, "system_prompt": str(ctx), "user_input": data.get("text"), "max_tokens": 30},
+                timeout=5,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            await self.send(text_data=json.dumps({"type": "error", "message": f"GPU 요청 실패: {str(e)}"}))
+
+
+def make_socket(consumer_cls, user_id: int):
+    consumer = consumer_cls()
+    consumer.user = SimpleNamespace(id=user_id, is_authenticated=True)
+    consumer.suggest_task = None
+    consumer.session_id = f"bench-{id(consumer)}"
+    consumer.seq = 0
+    consumer.gpu_semaphore = gpu_relay.user_semaphore(user_id)
+    consumer.errors = []
+
+    async def send(text_data=None, bytes_data=None, close=False):
+        event = json.loads(text_data)
+        if event.get("type") == "error":
+            consumer.errors.append(event["message"])
+
+    consumer.send = send
+    return consumer
+
+
+async def drive_socket(consumer, keystrokes: int, interval: float) -> float:
+    text = ""
+    for i in range(keystrokes):
+        text += "안녕하세요 "[i % 6]
+        last_keystroke = time.perf_counter()
+        await consumer.receive(json.dumps({"to_emails": TO_EMAILS, "text": text, "body": ""}))
+        if i < keystrokes - 1:
+            await asyncio.sleep(interval)
+
+    # 마지막 키 입력부터 그 제안 요청이 GPU 서버에 전달될 때까지
+    if consumer.suggest_task is not None:
+        await consumer.suggest_task
+    return time.perf_counter() - last_keystroke
+
+
+async def ticker(stop: asyncio.Event, lateness: list[float], period: float = 0.01):
+    while not stop.is_set():
+        expected = time.perf_counter() + period
+        await asyncio.sleep(period)
+        lateness.append(max(0.0, time.perf_counter() - expected))
+
+
+async def run_mode(consumer_cls, args) -> dict:
+    # 한 유저가 여러 탭을 여는 경우처럼 소켓을 users명에게 나눠 배정 (유저별 동시 요청 제한도 함께 측정)
+    sockets = [make_socket(consumer_cls, 100_000 + i % args.users) for i in range(args.sockets)]
+    stop, lateness = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lateness))
+
+    started = time.perf_counter()
+    last_latencies = await asyncio.gather(*(drive_socket(c, args.keystrokes, args.interval) for c in sockets))
+    wall = time.perf_counter() - started
+
+    stop.set()
+    await tick
+    return {
+        "wall": wall,
+        "stall_max": max(lateness, default=0.0),
+        "stall_p99": sorted(lateness)[int(len(lateness) * 0.99)] if lateness else 0.0,
+        "last_p50": statistics.median(last_latencies),
+        "last_max": max(last_latencies),
+        "errors": sum(len(c.errors) for c in sockets),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=50)
+    parser.add_argument("--keystrokes", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between keystrokes per socket")
+    parser.add_argument("--latency", type=float, default=0.1, help="stub GPU /predict latency in seconds")
+    parser.add_argument("--users", type=int, default=50, help="distinct users the sockets are spread over")
+    parser.add_argument("--skip-legacy", action="store_true", help="legacy mode serializes every request; slow for large runs")
+    args = parser.parse_args()
+
+    stub = StubGpuServer(args.latency)
+    server, base_url = start_stub(stub)
+    settings.GPU_SERVER_BASEURL = base_url
+
+    for i in range(args.users):
+        key = prompt_context_key(100_000 + i, TO_EMAILS, include_analysis=True, include_fewshots=False, fewshot_k=3, min_body_len=0)
+        set_cached_prompt_context(key, ({"alice@example.com": "Alice"}, WARM_CONTEXT))
+
+    total = args.sockets * args.keystrokes
+    print(
+        f"{args.sockets} sockets ({args.users} users) x {args.keystrokes} keystrokes every {args.interval * 1000:.0f} ms, "
+        f"stub latency {args.latency * 1000:.0f} ms"
+    )
+
+    modes = [("current", MailGenerateConsumer)]
+    if not args.skip_legacy:
+        modes.insert(0, ("legacy", LegacyRelayConsumer))
+
+    for name, consumer_cls in modes:
+        stub.reset()
+        r = asyncio.run(run_mode(consumer_cls, args))
+        print(
+            f"[{name:7}] wall {r['wall']:.2f} s | loop stall max {r['stall_max'] * 1000:.0f} ms, p99 {r['stall_p99'] * 1000:.0f} ms | "
+            f"last suggestion p50 {r['last_p50'] * 1000:.0f} ms, max {r['last_max'] * 1000:.0f} ms | "
+            f"/predict calls {stub.requests}/{total} (max concurrent {stub.max_in_flight}) | errors {r['errors']}"
+        )
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Time to first plan.delta of stream_mail_generation_with_plan: serial vs fan-out graph.
+
+subject/plan/body/validator chains are replaced by stubs with LLM-like latency
+(--subject-latency for the subject call, --plan-ttft then one paragraph every
+--plan-interval for the plan stream); prompt context is stubbed, masking is real.
+
+  serial : build_context -> masking -> subject -> plan -> body_prep
+           (previous behaviour: plan starts only after the subject call returns)
+  fan-out: build_context -> masking -> (subject | plan) -> body_prep
+
+Usage (from backend/, with the usual .env):
+    python scripts/bench/plan_fanout.py [--runs 5] [--subject-latency 1.2] [--plan-ttft 0.4]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from langgraph.graph import END, StateGraph  # noqa: E402
+
+from apps.ai.services import graph, mail_generation  # noqa: E402
+
+PLAN = ["[1] 인사 및 목적\n\n", "[2] 일정 공유\n\n", "[3] 요청 사항\n\n", "[4] 마무리 인사"]
+
+
+class StubSubject:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(self.latency)
+        return "다음 주 회의 일정 안내"
+
+
+class StubPlan:
+    def __init__(self, ttft: float, interval: float):
+        self.ttft = ttft
+        self.interval = interval
+
+    async def astream(self, inputs):
+        await asyncio.sleep(self.ttft)
+        for i, paragraph in enumerate(PLAN):
+            if i:
+                await asyncio.sleep(self.interval)
+            yield paragraph
+
+
+def serial_graph():
+    g = StateGraph(graph.State)
+    for name, node in (
+        ("build_context", graph.build_context_node),
+        ("masking", graph.masking_node),
+        ("subject", graph.subject_node),
+        ("plan", graph.plan_node),
+        ("body_prep", graph.body_prep_node),
+    ):
+        g.add_node(name, node)
+    g.set_entry_point("build_context")
+    g.add_edge("build_context", "masking")
+    g.add_edge("masking", "subject")
+    g.add_edge("subject", "plan")
+    g.add_edge("plan", "body_prep")
+    g.add_edge("body_prep", END)
+    return g.compile()
+
+
+async def one_run() -> dict[str, float]:
+    started = time.perf_counter()
+    marks: dict[str, float] = {}
+    async for ev in mail_generation.stream_mail_generation_with_plan(user=None, subject="", body="회의 일정 공유", to_emails=["a@a.com"]):
+        for name in ("plan.delta", "plan.done", "subject", "done"):
+            if f"event: {name}\n" in ev and name not in marks:
+                marks[name] = time.perf_counter() - started
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--subject-latency", type=float, default=1.2)
+    parser.add_argument("--plan-ttft", type=float, default=0.4)
+    parser.add_argument("--plan-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    async def body_astream(inputs):
+        yield "안녕하세요."
+
+    body_chain = MagicMock()
+    body_chain.astream.side_effect = body_astream
+
+    print(
+        f"stub subject {args.subject_latency * 1000:.0f} ms, plan first paragraph {args.plan_ttft * 1000:.0f} ms "
+        f"+ {len(PLAN) - 1} x {args.plan_interval * 1000:.0f} ms, {args.runs} runs"
+    )
+    with (
+        patch.object(graph, "subject_chain", StubSubject(args.subject_latency)),
+        patch.object(graph, "plan_chain", StubPlan(args.plan_ttft, args.plan_interval)),
+        patch.object(graph, "acollect_prompt_context", AsyncMock(return_value={"recipients": ["Alice"], "language": "ko"})),
+        patch.object(mail_generation, "body_chain", body_chain),
+    ):
+        for name, compiled in (("serial", serial_graph()), ("fan-out", graph.mail_graph)):
+            with patch.object(mail_generation, "mail_graph", compiled):
+                runs = [asyncio.run(one_run()) for _ in range(args.runs)]
+            marks = ("plan.delta", "plan.done", "subject", "done")
+            line = " | ".join(f"{mark} p50 {statistics.median(r[mark] for r in runs) * 1000:5.0f} ms" for mark in marks)
+            print(f"[{name:7}] first {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Total stream duration of stream_mail_generation_with_plan: blocking vs pipelined body validation.
+
+Graph (context/subject/plan) is stubbed to return instantly, so the numbers cover body
+streaming + validation only. The stub body chain streams --chunks pieces every
+--interval seconds; --broken of the requests contain an altered PII placeholder in the
+first paragraph. The stub validator answers after --judge-latency seconds and fails
+exactly the broken bodies.
+
+  blocking : after body.done, validator_chain.ainvoke on the full body, then a rewrite
+             (previous behaviour: every request pays the judge round-trip before done)
+  pipelined: BodyValidation — local checks per paragraph, judge only when they fail
+             (started on the partial body, overlapping the rest of the stream),
+             rewrite streamed as patched.delta
+
+Usage (from backend/, with the usual .env):
+    python scripts/bench/post_stream_validation.py [--requests 30] [--broken 0.1] [--judge-latency 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from apps.ai.services import mail_generation  # noqa: E402
+from apps.ai.services.pii_masker import PiiMasker  # noqa: E402
+
+REQ_ID = "bench0000001"
+MASKED, MAPPING = PiiMasker(REQ_ID).mask_text("문의는 hello@example.com 으로 부탁드립니다.")
+BROKEN = MASKED.replace("}}", "}", 1)
+
+
+class BlockingValidation:
+    """Previous tail of the stream: one validator_chain.ainvoke on the whole body after body.done."""
+
+    def __init__(self, subject, constraints, req_id, mapping, judge):
+        self.subject = subject
+        self.constraints = constraints
+        self.judge = judge
+        self.chunks: list[str] = []
+
+    @property
+    def body(self) -> str:
+        return "".join(self.chunks)
+
+    def feed(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+
+    async def finish(self) -> str | None:
+        judge = await self.judge.ainvoke({"subject": self.subject, "body": self.body, "constraints": self.constraints})
+        return None if judge.passed else judge.rewrite_instructions
+
+    def cancel(self) -> None:
+        pass
+
+
+class StubBody:
+    def __init__(self, chunks: int, interval: float):
+        self.chunks = chunks
+        self.interval = interval
+        self.broken_next = False
+
+    async def astream(self, inputs):
+        first = BROKEN if self.broken_next and "Fix" not in (inputs.get("prompt_text") or "") else MASKED
+        pieces = [first, "\n\n"] + ["회의 일정 관련해서 공유드립니다. "] * (self.chunks - 2)
+        for piece in pieces:
+            await asyncio.sleep(self.interval)
+            yield piece
+
+
+class StubJudge:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        broken = BROKEN in inputs["body"]
+        return MagicMock(passed=not broken, rewrite_instructions="Fix the PII placeholders." if broken else "")
+
+
+async def graph_updates():
+    for update in (
+        ("updates", {"masking": {"req_id": REQ_ID, "mask_mapping": dict(MAPPING)}}),
+        ("updates", {"plan": {"plan_text": ""}}),
+        ("updates", {"subject": {"locked_title": "회의 일정 안내"}}),
+        ("updates", {"body_prep": {"body_inputs": {"body": "", "language": "ko", "prompt_text": ""}}}),
+    ):
+        yield update
+
+
+async def one_stream() -> float:
+    started = time.perf_counter()
+    async for _ in mail_generation.stream_mail_generation_with_plan(user=None, subject="", body="", to_emails=["a@a.com"]):
+        pass
+    return time.perf_counter() - started
+
+
+def _pct(values: list[float], q: float) -> float:
+    return values[max(0, int(len(values) * q) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--broken", type=float, default=0.1, help="fraction of bodies failing the checks")
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.02)
+    parser.add_argument("--judge-latency", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests, body {args.chunks} chunks x {args.interval * 1000:.0f} ms, "
+        f"{args.broken:.0%} broken, judge {args.judge_latency * 1000:.0f} ms"
+    )
+    for name, validation_cls in (("blocking", BlockingValidation), ("pipelined", mail_generation.BodyValidation)):
+        rng = random.Random(args.seed)
+        body, judge = StubBody(args.chunks, args.interval), StubJudge(args.judge_latency)
+        graph = MagicMock()
+        durations = []
+        with (
+            patch.object(mail_generation, "mail_graph", graph),
+            patch.object(mail_generation, "body_chain", body),
+            patch.object(mail_generation, "validator_chain", judge),
+            patch.object(mail_generation, "BodyValidation", validation_cls),
+        ):
+            for _ in range(args.requests):
+                graph.astream.return_value = graph_updates()
+                body.broken_next = rng.random() < args.broken
+                durations.append(asyncio.run(one_stream()))
+
+        durations.sort()
+        print(
+            f"[{name:9}] total p50 {_pct(durations, 0.5) * 1000:5.0f} ms | p95 {_pct(durations, 0.95) * 1000:5.0f} ms | "
+            f"max {durations[-1] * 1000:5.0f} ms | judge calls {judge.calls}/{args.requests}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Reply option fan-in of stream_reply_options_llm: thread per option vs one event loop.
+
+The plan chain is stubbed to return --options options instantly; the body chain streams
+--chunks tokens per option with a random --interval-ish delay. Every token carries an id so
+the client can measure how long it sat between the producer and the SSE consumer.
+
+  thread-per-option: previous implementation — a sync generator (wrapped in as_async_stream)
+                     starting a thread + asyncio.run per option and polling queue.Queue(timeout=0.5)
+  event-loop       : stream_reply_options_llm (merge_async_iterators over option streams)
+
+Usage (from backend/, with the usual .env):
+    python scripts/bench/reply_option_fanin.py [--requests 10] [--options 4] [--chunks 40]
+"""
+
+import argparse
+import asyncio
+import os
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from legacy_stream import as_async_stream  # noqa: E402
+
+from apps.ai.services import reply  # noqa: E402
+from apps.ai.services.utils import sse_event  # noqa: E402
+
+CONTEXT = {"recipients": ["Alice"], "language": "ko"}
+EMITTED: dict[str, float] = {}
+
+
+class StubBody:
+    def __init__(self, chunks: int, interval: float, seed: int):
+        self.chunks = chunks
+        self.interval = interval
+        self.rng = random.Random(seed)
+
+    async def astream(self, inputs):
+        for n in range(self.chunks):
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.interval))
+            token = f"<{inputs['locked_title']}:{n}:{self.rng.random():.6f}>"
+            EMITTED[token] = time.perf_counter()
+            yield token
+
+
+@as_async_stream
+def thread_per_option(*, user, subject, body, to_email, attachments=None):
+    # 이전 구현의 골격: 옵션마다 스레드 + asyncio.run, 메인 제너레이터는 queue.Queue 폴링
+    plan = reply.reply_plan_chain.invoke({})
+    yield sse_event("ready", {"ts": int(time.time() * 1000)}, retry_ms=5000)
+    yield sse_event("options", {"count": len(plan.options)}, eid="0")
+
+    q: queue.Queue[tuple[str, dict]] = queue.Queue()
+
+    def worker(opt_idx: int, locked_title: str):
+        async def produce():
+            seq = 0
+            try:
+                async for chunk in reply.reply_body_chain.astream({"locked_title": locked_title}):
+                    q.put(("option.delta", {"id": opt_idx, "seq": seq, "text": chunk}))
+                    seq += 1
+            finally:
+                q.put(("option.done", {"id": opt_idx, "total_seq": seq}))
+
+        asyncio.run(produce())
+
+    threads = [threading.Thread(target=worker, args=(i, opt.title), daemon=True) for i, opt in enumerate(plan.options)]
+    for t in threads:
+        t.start()
+
+    next_eid = 1
+    alive = True
+    while alive or not q.empty():
+        try:
+            event, payload = q.get(timeout=0.5)
+            yield sse_event(event, payload, eid=str(next_eid))
+            next_eid += 1
+        except queue.Empty:
+            pass
+        alive = any(t.is_alive() for t in threads)
+    yield sse_event("done", {"reason": "all_options_finished"}, eid=str(next_eid))
+
+
+async def one_request(stream_fn) -> tuple[list[float], int, float]:
+    baseline = threading.active_count()
+    peak = baseline
+    latencies = []
+    started = time.perf_counter()
+    async for ev in stream_fn(user=None, subject="", body="회의 일정 문의", to_email="alice@example.com"):
+        peak = max(peak, threading.active_count())
+        if "event: option.delta\n" not in ev:
+            continue
+        received = time.perf_counter()
+        token = ev.split('"text": "', 1)[1].split('"', 1)[0]
+        latencies.append(received - EMITTED.pop(token))
+    return latencies, peak - baseline, time.perf_counter() - started
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * q) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.01, help="mean seconds between tokens per option")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    plan = SimpleNamespace(language="ko", options=[SimpleNamespace(type="t", title=f"opt{i}") for i in range(args.options)])
+    print(f"{args.requests} requests x {args.options} options x {args.chunks} tokens, ~{args.interval * 1000:.0f} ms between tokens")
+    for name, stream_fn in (("thread-per-option", thread_per_option), ("event-loop", reply.stream_reply_options_llm)):
+        with (
+            patch.object(reply, "reply_body_chain", StubBody(args.chunks, args.interval, args.seed)),
+            patch.object(reply, "reply_plan_chain", SimpleNamespace(invoke=lambda inputs: plan, ainvoke=AsyncMock(return_value=plan))),
+            patch.object(reply, "acollect_prompt_context", AsyncMock(return_value=CONTEXT)),
+        ):
+            latencies, extra_threads, durations = [], [], []
+            for _ in range(args.requests):
+                lat, threads, duration = asyncio.run(one_request(stream_fn))
+                latencies += lat
+                extra_threads.append(threads)
+                durations.append(duration)
+
+        print(
+            f"[{name:17}] extra threads/request max {max(extra_threads)} | "
+            f"producer->client p50 {statistics.median(latencies) * 1000:6.2f} ms p99 {_pct(latencies, 0.99) * 1000:6.2f} ms "
+            f"max {max(latencies) * 1000:6.2f} ms | request p50 {statistics.median(durations):5.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
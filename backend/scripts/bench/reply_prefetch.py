@@ -0,0 +1,118 @@
+"""
+Perceived latency of ReplyOptionsStreamView's stream: cold vs prefetched on email open.
+
+reply_plan_chain answers after --plan-latency seconds, reply_body_chain streams --chunks tokens
+after a --body-ttft first-token delay (batch() for the prefetch simply runs the same stub).
+Prompt context is stubbed; the cache is whatever CACHES["default"] is configured.
+
+  cold      : the user taps reply without a prefetch (plan call + live option streams)
+  prefetched: prefetch_reply_options ran when the mail was opened (Celery in production,
+              called inline here), then the user taps reply
+
+Usage (from backend/, with the usual .env):
+    python scripts/bench/reply_prefetch.py [--mails 10] [--plan-latency 1.5] [--body-ttft 0.6]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from apps.ai.services import reply  # noqa: E402
+
+CONTEXT = {"recipients": ["Alice"], "language": "ko"}
+PLAN = SimpleNamespace(language="ko", options=[SimpleNamespace(type=f"유형{i}", title=f"옵션 {i}") for i in range(4)])
+
+
+class StubPlan:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, inputs):
+        time.sleep(self.latency)
+        return PLAN
+
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(self.latency)
+        return PLAN
+
+
+class StubBody:
+    def __init__(self, ttft: float, chunks: int, interval: float):
+        self.ttft = ttft
+        self.chunks = chunks
+        self.interval = interval
+
+    def batch(self, inputs, return_exceptions=False):
+        time.sleep(self.ttft + self.chunks * self.interval)
+        return ["안녕하세요. " * self.chunks for _ in inputs]
+
+    async def astream(self, inputs):
+        await asyncio.sleep(self.ttft)
+        for _ in range(self.chunks):
+            await asyncio.sleep(self.interval)
+            yield "안녕하세요. "
+
+
+async def tap_reply(user, message_id: str) -> dict[str, float]:
+    started = time.perf_counter()
+    marks: dict[str, float] = {}
+    async for ev in reply.stream_reply_options_llm(
+        user=user,
+        subject="Re: 회의 일정",
+        body="다음 주 회의 일정 확인 부탁드립니다.",
+        to_email="alice@example.com",
+        attachments=[],
+        message_id=message_id,
+    ):
+        for name in ("options", "option.delta", "done"):
+            if f"event: {name}\n" in ev and name not in marks:
+                marks[name] = time.perf_counter() - started
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mails", type=int, default=10)
+    parser.add_argument("--plan-latency", type=float, default=1.5)
+    parser.add_argument("--body-ttft", type=float, default=0.6)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.03)
+    args = parser.parse_args()
+
+    user = SimpleNamespace(id=400_000 + os.getpid())
+    print(
+        f"stub plan {args.plan_latency * 1000:.0f} ms, option body first token {args.body_ttft * 1000:.0f} ms "
+        f"+ {args.chunks} x {args.interval * 1000:.0f} ms, {args.mails} mails"
+    )
+    with (
+        patch.object(reply, "reply_plan_chain", StubPlan(args.plan_latency)),
+        patch.object(reply, "reply_body_chain", StubBody(args.body_ttft, args.chunks, args.interval)),
+        patch.object(reply, "collect_prompt_context", return_value=CONTEXT),
+        patch.object(reply, "acollect_prompt_context", AsyncMock(return_value=CONTEXT)),
+        patch.object(reply, "get_attachments_for_message", return_value=[]),
+    ):
+        for name in ("cold", "prefetched"):
+            runs = []
+            for i in range(args.mails):
+                message_id = f"bench-{name}-{os.getpid()}-{i}"
+                if name == "prefetched":
+                    reply.prefetch_reply_options(user, message_id, "회의 일정", "다음 주 회의 일정 확인 부탁드립니다.", "alice@example.com")
+                runs.append(asyncio.run(tap_reply(user, message_id)))
+            line = " | ".join(f"{mark} p50 {statistics.median(r[mark] for r in runs) * 1000:6.1f} ms" for mark in ("options", "option.delta", "done"))
+            print(f"[{name:10}] first {line}")
+
+
+if __name__ == "__main__":
+    main()
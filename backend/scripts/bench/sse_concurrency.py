@@ -0,0 +1,144 @@
+"""
+N simultaneous SSE clients of stream_mail_generation: as_async_stream thread hopping vs native asyncio.
+
+subject/body chains are prompt | langchain FakeListChatModel | StrOutputParser (the body streams one
+character every --token-interval seconds), prompt context is stubbed, masking/unmasking is real.
+
+  thread-hop: the previous sync generator wrapped in as_async_stream — every next() is a
+              sync_to_async(thread_sensitive=True) hop, so all streams of the process share
+              one thread and run one token at a time
+  native    : stream_mail_generation (ainvoke/astream on the event loop, context collected once)
+
+Reported per client: time to first body.delta, total stream time, and the worst gap between
+two consecutive body.delta events.
+
+Usage (from backend/, with the usual .env):
+    python scripts/bench/sse_concurrency.py [--clients 20] [--token-interval 0.01]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+from langchain_core.output_parsers import StrOutputParser  # noqa: E402
+from langchain_core.prompts import ChatPromptTemplate  # noqa: E402
+from legacy_stream import as_async_stream  # noqa: E402
+
+from apps.ai.services import mail_generation  # noqa: E402
+from apps.ai.services.pii_masker import PiiMasker, make_req_id, unmask_stream  # noqa: E402
+from apps.ai.services.utils import build_prompt_inputs, sse_event  # noqa: E402
+
+CONTEXT = {"recipients": ["Alice"], "group_name": "Team Alpha", "prompt_options": [], "language": "ko"}
+SUBJECT = "다음 주 회의 일정 안내"
+BODY = "안녕하세요, 다음 주 회의 일정 관련해서 연락드립니다. 화요일 오후 2시에 3층 회의실에서 진행할 예정입니다."
+
+
+@as_async_stream
+def thread_hop_stream(user, subject, body, to_emails):
+    # 이전 구현의 골격: 동기 제너레이터를 as_async_stream 으로 감싼 것
+    raw_inputs = build_prompt_inputs(CONTEXT, extra={"attachments": []})
+    raw_inputs["subject"] = subject or ""
+    raw_inputs["body"] = body or ""
+    req_id = make_req_id()
+    masked_inputs, mapping = PiiMasker(req_id).mask_inputs(raw_inputs)
+
+    yield sse_event("ready", {"ts": int(time.time() * 1000)}, retry_ms=5000)
+    locked_title = (mail_generation.subject_chain.invoke(masked_inputs) or "").strip()
+    yield sse_event("subject", {"title": locked_title, "text": locked_title}, eid="0")
+
+    seq = 1
+    for chunk in unmask_stream(mail_generation.body_chain.stream({**masked_inputs, "locked_subject": locked_title}), req_id, mapping):
+        yield sse_event("body.delta", {"seq": seq - 1, "text": chunk}, eid=str(seq))
+        seq += 1
+    mapping.clear()
+    yield sse_event("done", {"reason": "stop"}, eid=str(seq + 1))
+
+
+async def one_client(stream_fn) -> dict[str, float]:
+    started = time.perf_counter()
+    first = None
+    last = None
+    max_gap = 0.0
+    async for ev in stream_fn(user=None, subject="", body="회의 일정 공유", to_emails=["alice@example.com"]):
+        if "event: body.delta\n" not in ev:
+            continue
+        now = time.perf_counter()
+        if first is None:
+            first = now - started
+        else:
+            max_gap = max(max_gap, now - last)
+        last = now
+    return {"first": first, "total": time.perf_counter() - started, "gap": max_gap}
+
+
+async def run_clients(stream_fn, clients: int) -> tuple[list[dict[str, float]], float, int]:
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def watch_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.005)
+
+    watcher = asyncio.create_task(watch_threads())
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one_client(stream_fn) for _ in range(clients)))
+    wall = time.perf_counter() - started
+    done.set()
+    await watcher
+    return results, wall, peak_threads
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * q) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--token-interval", type=float, default=0.01, help="seconds per streamed character")
+    parser.add_argument("--subject-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    prompt = ChatPromptTemplate.from_messages([("human", "{body}")])
+    subject_chain = prompt | FakeListChatModel(responses=[SUBJECT], sleep=args.subject_latency) | StrOutputParser()
+    body_chain = prompt | FakeListChatModel(responses=[BODY], sleep=args.token_interval) | StrOutputParser()
+
+    print(
+        f"{args.clients} concurrent clients, body {len(BODY)} chars x {args.token_interval * 1000:.0f} ms "
+        f"(~{len(BODY) * args.token_interval:.2f} s alone), subject {args.subject_latency * 1000:.0f} ms"
+    )
+    with (
+        patch.object(mail_generation, "subject_chain", subject_chain),
+        patch.object(mail_generation, "body_chain", body_chain),
+        patch.object(mail_generation, "acollect_prompt_context", AsyncMock(return_value=CONTEXT)),
+    ):
+        for name, stream_fn in (("thread-hop", thread_hop_stream), ("native", mail_generation.stream_mail_generation)):
+            results, wall, peak_threads = asyncio.run(run_clients(stream_fn, args.clients))
+            firsts = [r["first"] for r in results]
+            totals = [r["total"] for r in results]
+            gaps = [r["gap"] for r in results]
+            print(
+                f"[{name:10}] first delta p50 {statistics.median(firsts) * 1000:6.0f} ms p95 {_pct(firsts, 0.95) * 1000:6.0f} ms | "
+                f"stream p50 {statistics.median(totals):5.2f} s p95 {_pct(totals, 0.95):5.2f} s | "
+                f"worst gap p95 {_pct(gaps, 0.95) * 1000:5.0f} ms | wall {wall:5.2f} s | peak threads {peak_threads}"
+            )
+
+
+if __name__ == "__main__":
+    main()
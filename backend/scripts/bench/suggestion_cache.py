@@ -0,0 +1,89 @@
+"""
+Latency of MailSuggestView's suggest_mail_text with the response cache.
+
+The LLM chain is replaced by a stub that sleeps --llm-latency seconds (and counts calls),
+prompt context is pre-warmed, so the numbers isolate the cache path itself. Runs against
+whatever CACHES["default"] is configured (Redis when CACHE_URL is set, LocMem otherwise).
+
+  miss        : first request for an input (LLM call + cache write)
+  hit         : the same body/cursor/recipients again (toggle back, retry)
+  typed-through: the user typed the first characters of the previous suggestion
+
+Usage (from backend/, with the usual .env):
+    python scripts/bench/suggestion_cache.py [--inputs 50] [--repeats 20] [--llm-latency 0.8]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from apps.ai.services import mail_suggestion  # noqa: E402
+
+SUGGESTION = " 회의 자료를 미리 공유드리겠습니다."
+CONTEXT = {"recipients": ["Alice"], "group_name": "Team Alpha", "prompt_options": ["Please respond politely."], "language": "ko"}
+
+
+class StubChain:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return SUGGESTION
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inputs", type=int, default=50, help="distinct bodies")
+    parser.add_argument("--repeats", type=int, default=20, help="repeated requests per body")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    args = parser.parse_args()
+
+    chain = StubChain(args.llm_latency)
+    user = SimpleNamespace(id=300_000 + os.getpid())
+
+    def suggest(body):
+        return mail_suggestion.suggest_mail_text(user, subject="일정 공유", body=body, to_emails=["alice@example.com"], target="body")
+
+    results: dict[str, list[float]] = {"miss": [], "hit": [], "typed-through": []}
+    with patch.object(mail_suggestion, "suggest_chain", chain), patch.object(mail_suggestion, "collect_prompt_context", return_value=CONTEXT):
+        for i in range(args.inputs):
+            body = f"안녕하세요 {i}번 안건 관련해서 말씀드립니다."
+            results["miss"].append(timed(lambda body=body: suggest(body)))
+            results["hit"] += [timed(lambda body=body: suggest(body)) for _ in range(args.repeats)]
+            results["typed-through"].append(timed(lambda body=body: suggest(body + SUGGESTION[:4])))
+
+    print(f"cache backend: {settings.CACHES['default']['BACKEND']}, stub LLM {args.llm_latency * 1000:.0f} ms")
+    for name, values in results.items():
+        values.sort()
+        print(
+            f"[{name:13}] n={len(values):5} p50 {statistics.median(values) * 1000:8.3f} ms | "
+            f"p99 {values[int(len(values) * 0.99) - 1] * 1000:8.3f} ms"
+        )
+    total = sum(len(v) for v in results.values())
+    print(f"LLM calls {chain.calls}/{total} requests")
+
+
+if __name__ == "__main__":
+    main()
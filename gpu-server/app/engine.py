@@ -0,0 +1,328 @@
+import hashlib
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+import torch
+import torch.nn.functional as F
+from transformers import DynamicCache, StoppingCriteria, StoppingCriteriaList
+from transformers.generation.streamers import BaseStreamer
+
+from app.prefix_cache import KVLayers, PrefixCache
+
+# 동시에 들어온 /predict 요청을 모아 한 번의 generate 로 처리하는 micro-batching 엔진
+#  - 추론은 전용 스레드 하나에서만 돈다 (FastAPI 이벤트 루프를 막지 않음, 모델 호출은 항상 직렬)
+#  - 첫 요청이 들어온 뒤 최대 max_wait_ms 동안 / 최대 max_batch_size 개까지 모아서 left-padding 배치로 생성
+#  - 각 요청 결과는 concurrent.futures.Future 로 돌려준다 (async 쪽은 asyncio.wrap_future 로 대기)
+#  - 생성 중 토큰은 스텝마다 행별로 증분 디코딩되어 extractor 를 거쳐 on_text 콜백으로 바로 전달된다
+#  - system prompt 구간의 KV 는 PrefixCache 에 보관, 배치 행마다 [pad][prefix KV][pad][suffix] 로 맞춰 suffix 만 prefill
+#  - is_stale() 이 True 가 된 요청(같은 세션에 더 새 키 입력이 도착)은 큐에서 꺼낼 때 건너뛰고, 생성 중이면 그 행만 멈춘다
+
+
+@dataclass
+class GenerationRequest:
+    input_ids: list[int]  # prefix + suffix
+    max_tokens: int
+    prefix_len: int = 0
+    prefix_key: str | None = None
+    # 추론 스레드에서 호출됨 (async 쪽은 loop.call_soon_threadsafe 로 넘겨야 함)
+    on_text: Callable[[str], None] | None = None
+    # 추론 스레드에서 호출됨. True 면 더 이상 결과가 필요 없는 요청 (결과는 그때까지 나온 텍스트)
+    is_stale: Callable[[], bool] | None = None
+    future: Future = field(default_factory=Future)
+    attempt: int = 1
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class PassthroughExtractor:
+    """Default extractor: stream generated text as is."""
+
+    found = True
+    complete = False
+
+    def feed(self, chunk: str) -> str:
+        return chunk
+
+
+class _RowStream:
+    """Incremental decode state of one batch row."""
+
+    def __init__(self, request: GenerationRequest, tokenizer, extractor, stop_ids: set[int]):
+        self.request = request
+        self.tokenizer = tokenizer
+        self.extractor = extractor
+        self.stop_ids = stop_ids
+        self.ids: list[int] = []
+        self.text = ""
+        self.streamed = ""
+        self.done = False
+
+    def push(self, token_id: int):
+        if self.done:
+            return
+        if self.request.is_stale is not None and self.request.is_stale():
+            self.done = True
+            return
+        if token_id in self.stop_ids:
+            self.done = True
+            return
+
+        self.ids.append(token_id)
+        if len(self.ids) >= self.request.max_tokens:
+            self.done = True
+
+        text = self.tokenizer.decode(self.ids, skip_special_tokens=True)
+        # byte-level BPE: 멀티바이트 문자가 덜 나온 상태면 다음 토큰까지 보류
+        if text.endswith("\ufffd") and not self.done:
+            return
+        delta, self.text = text[len(self.text) :], text
+
+        piece = self.extractor.feed(delta)
+        if piece:
+            self.streamed += piece
+            if self.request.on_text is not None:
+                self.request.on_text(piece)
+        if self.extractor.complete:
+            self.done = True
+
+
+class _BatchStreamer(BaseStreamer):
+    def __init__(self, rows: list[_RowStream]):
+        self.rows = rows
+        self._prompt_seen = False
+
+    def put(self, value):
+        # 첫 호출은 프롬프트 전체, 이후로는 스텝마다 행별 새 토큰 1개씩
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+        for row, token_id in zip(self.rows, value.tolist(), strict=True):
+            row.push(token_id)
+
+    def end(self):
+        pass
+
+
+class _RowsDone(StoppingCriteria):
+    """Finish each row as soon as its extractor closed the value or it hit its own max_tokens."""
+
+    def __init__(self, rows: list[_RowStream]):
+        self.rows = rows
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.tensor([row.done for row in self.rows], dtype=torch.bool, device=input_ids.device)
+
+
+class BatchingEngine:
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_attempts: int = 3,
+        do_sample: bool = True,
+        extractor_factory=PassthroughExtractor,
+        prefix_cache_bytes: int = 0,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.tokenizer.padding_side = "left"  # decoder-only 배치 생성은 왼쪽 패딩
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.device = next(model.parameters()).device
+
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_attempts = max_attempts
+        self.do_sample = do_sample
+        # 요청마다 새 extractor: 생성 텍스트에서 실제로 내보낼 부분만 골라냄 (예: JSON output 값)
+        # 끝까지 found=False 면 (JSON 형식이 아님) 아무것도 내보내지 않았으므로 다시 큐에 넣어 재생성
+        self.extractor_factory = extractor_factory
+        # 0 이면 prefix 재사용 없이 매번 전체 프롬프트를 prefill
+        self.prefix_cache = PrefixCache(prefix_cache_bytes) if prefix_cache_bytes > 0 else None
+        self.prefill_tokens = 0
+
+        self._queue: queue.Queue[GenerationRequest | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self.batches = 0
+        self.skipped = 0  # 추론 전에 버린 stale 요청 수
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="inference", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def encode(self, system_prompt: str, user_input: str) -> tuple[list[int], int, str | None]:
+        """(input_ids, prefix_len, prefix_key): the system turn is tokenized on its own so its KV can be reused."""
+        system = {"role": "system", "content": system_prompt}
+        messages = [system, {"role": "user", "content": user_input}]
+        prompt = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        prefix = self.tokenizer.apply_chat_template([system], tokenize=False)
+
+        if not prefix or not prompt.startswith(prefix):
+            # 템플릿이 system 구간을 독립적으로 렌더링하지 않는 경우: prefix 재사용 없이 처리
+            return self.tokenizer(prompt, add_special_tokens=False)["input_ids"], 0, None
+
+        prefix_ids = self.tokenizer(prefix, add_special_tokens=False)["input_ids"]
+        suffix_ids = self.tokenizer(prompt[len(prefix) :], add_special_tokens=False)["input_ids"]
+        return prefix_ids + suffix_ids, len(prefix_ids), hashlib.sha256(prefix.encode()).hexdigest()
+
+    def submit(self, system_prompt: str, user_input: str, max_tokens: int = 10, on_text=None, is_stale=None) -> Future:
+        input_ids, prefix_len, prefix_key = self.encode(system_prompt, user_input)
+        request = GenerationRequest(input_ids, max_tokens, prefix_len, prefix_key, on_text, is_stale)
+        self._queue.put(request)
+        return request.future
+
+    def _skip_if_stale(self, request: GenerationRequest) -> bool:
+        if request.is_stale is None or not request.is_stale():
+            return False
+        self.skipped += 1
+        request.future.set_result("")
+        return True
+
+    def _collect_batch(self) -> list[GenerationRequest] | None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return None
+            if not self._skip_if_stale(first):
+                break
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # stop 신호는 현재 배치를 처리한 뒤 반영
+                break
+            if not self._skip_if_stale(request):
+                batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            try:
+                self._generate_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _generation_kwargs(self, padded) -> dict:
+        """Extra model.generate kwargs for one batch (hook for subclasses)."""
+        return {}
+
+    def _prefix_kv(self, request: GenerationRequest) -> KVLayers | None:
+        if self.prefix_cache is None or not request.prefix_len:
+            return None
+        layers = self.prefix_cache.get(request.prefix_key)
+        if layers is None:
+            # 세션 첫 요청: system 구간만 한 번 prefill 해서 보관
+            prefix = torch.tensor([request.input_ids[: request.prefix_len]], device=self.device)
+            past = self.model(input_ids=prefix, use_cache=True).past_key_values
+            layers = [(layer.keys, layer.values) for layer in past.layers]
+            self.prefill_tokens += request.prefix_len
+            self.prefix_cache.put(request.prefix_key, layers)
+        return layers
+
+    def _prepare_inputs(self, batch: list[GenerationRequest]) -> tuple[dict, DynamicCache | None]:
+        kv_rows = [self._prefix_kv(r) for r in batch]
+        reference = next((kv for kv in kv_rows if kv is not None), None)
+        if reference is None:
+            self.prefill_tokens += sum(len(r.input_ids) for r in batch)
+            padded = self.tokenizer.pad({"input_ids": [r.input_ids for r in batch]}, return_tensors="pt")
+            return dict(padded.to(self.device)), None
+
+        # 행마다 [pad][prefix (캐시)][pad][suffix]: 캐시 구간 길이 = 가장 긴 prefix, 그 뒤로 suffix 만 새로 prefill
+        pad_id = self.tokenizer.pad_token_id
+        prefix_lens = [r.prefix_len if kv is not None else 0 for r, kv in zip(batch, kv_rows, strict=True)]
+        max_prefix = max(prefix_lens)
+        suffixes = [r.input_ids[p:] for r, p in zip(batch, prefix_lens, strict=True)]
+        max_suffix = max(len(s) for s in suffixes)
+        self.prefill_tokens += sum(len(s) for s in suffixes)
+
+        input_ids, attention_mask = [], []
+        for request, p, suffix in zip(batch, prefix_lens, suffixes, strict=True):
+            lead, gap = max_prefix - p, max_suffix - len(suffix)
+            input_ids.append([pad_id] * lead + request.input_ids[:p] + [pad_id] * gap + suffix)
+            attention_mask.append([0] * lead + [1] * p + [0] * gap + [1] * len(suffix))
+
+        cache = DynamicCache()
+        for layer_idx, (ref_k, ref_v) in enumerate(reference):
+            keys, values = [], []
+            for kv, p in zip(kv_rows, prefix_lens, strict=True):
+                if kv is None:
+                    keys.append(ref_k.new_zeros(ref_k.shape[:2] + (max_prefix, ref_k.shape[-1])))
+                    values.append(ref_v.new_zeros(ref_v.shape[:2] + (max_prefix, ref_v.shape[-1])))
+                else:
+                    k, v = kv[layer_idx]
+                    keys.append(F.pad(k, (0, 0, max_prefix - p, 0)))
+                    values.append(F.pad(v, (0, 0, max_prefix - p, 0)))
+            cache.update(torch.cat(keys), torch.cat(values), layer_idx)
+
+        inputs = {
+            "input_ids": torch.tensor(input_ids, device=self.device),
+            "attention_mask": torch.tensor(attention_mask, device=self.device),
+        }
+        return inputs, cache
+
+    @torch.inference_mode()
+    def _generate_batch(self, batch: list[GenerationRequest]):
+        self.batches += 1
+        padded, past_key_values = self._prepare_inputs(batch)
+        if past_key_values is not None:
+            padded["past_key_values"] = past_key_values
+
+        stop_ids = {self.tokenizer.eos_token_id, self.tokenizer.pad_token_id}
+        rows = [_RowStream(r, self.tokenizer, self.extractor_factory(), stop_ids) for r in batch]
+        self.model.generate(
+            **padded,
+            max_new_tokens=max(r.max_tokens for r in batch),
+            do_sample=self.do_sample,
+            eos_token_id=self.tokenizer.eos_token_id,
+            pad_token_id=self.tokenizer.pad_token_id,
+            streamer=_BatchStreamer(rows),
+            stopping_criteria=StoppingCriteriaList([_RowsDone(rows)]),
+            **self._generation_kwargs(padded),
+        )
+
+        for row in rows:
+            request = row.request
+            if request.is_stale is not None and request.is_stale():
+                request.future.set_result(row.streamed)
+                continue
+            if not row.extractor.found and request.attempt < self.max_attempts:
+                # 실패한 요청만 다음 배치로 재시도 (다른 요청은 기다리게 하지 않음)
+                print(f"[WARN] JSON 파싱 실패 (시도 {request.attempt}/{self.max_attempts}) → 재시도")
+                request.attempt += 1
+                self._queue.put(request)
+                continue
+
+            if not row.extractor.found:
+                # 마지막 시도까지 형식이 맞지 않으면 생성된 원문을 그대로 전달
+                print(f"[ERROR] JSON 파싱 실패 (최대 재시도 {self.max_attempts}회 초과)")
+                if row.text and request.on_text is not None:
+                    request.on_text(row.text)
+                request.future.set_result(row.text)
+                continue
+
+            request.future.set_result(row.streamed)
@@ -0,0 +1,56 @@
+import json
+import re
+
+# 생성 중인 {"output": "..."} 텍스트에서 output 문자열 값만 조각조각 뽑아내는 증분 추출기
+#  - 키를 찾기 전까지는 아무것도 내보내지 않음 (```json 펜스, 앞뒤 잡음 무시)
+#  - 값 안의 escape(\", \n, \uXXXX)는 완성된 뒤에 디코딩해서 내보냄
+#  - 닫는 따옴표를 만나면 complete=True (엔진은 그 행의 생성을 멈춘다)
+
+
+class JsonFieldExtractor:
+    def __init__(self, field: str = "output"):
+        self._key = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ""  # 키를 찾기 전까지 누적
+        self._pending = ""  # 값 안에서 아직 끝나지 않은 escape
+        self.found = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> str:
+        if self.complete or not chunk:
+            return ""
+
+        if not self.found:
+            self._buffer += chunk
+            match = self._key.search(self._buffer)
+            if match is None:
+                return ""
+            self.found = True
+            chunk, self._buffer = self._buffer[match.end() :], ""
+
+        out = []
+        text = self._pending + chunk
+        self._pending = ""
+        i = 0
+        while i < len(text):
+            ch = text[i]
+            if ch == '"':
+                self.complete = True
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+
+            # escape: \uXXXX 는 6글자, 나머지는 2글자
+            size = 6 if text[i + 1 : i + 2] == "u" else 2
+            escape = text[i : i + size]
+            if len(escape) < size:
+                self._pending = text[i:]
+                break
+            try:
+                out.append(json.loads(f'"{escape}"'))
+            except json.JSONDecodeError:
+                out.append(escape)
+            i += size
+
+        return "".join(out)
@@ -1,84 +1,110 @@
+import os
 import torch
 from transformers import AutoModelForCausalLM, AutoTokenizer
-import redis.asyncio as aioredis
 import json
 import asyncio
 
-MODEL_NAME = "LGAI-EXAONE/EXAONE-3.5-7.8B-Instruct"
+from app.engine import BatchingEngine
+from app.json_stream import JsonFieldExtractor
+from app.sessions import SessionTracker
+
+MODEL_NAME = os.environ.get("MODEL_NAME", "LGAI-EXAONE/EXAONE-3.5-7.8B-Instruct")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://xend-fiveis-dev.duckdns.org:6379")
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.environ.get("MAX_WAIT_MS", "10"))
+# system prompt KV 재사용 메모리 상한 (0 이면 끔). 7.8B bf16 기준 토큰당 약 128KiB
+PREFIX_CACHE_MB = float(os.environ.get("PREFIX_CACHE_MB", "2048"))
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForCausalLM.from_pretrained(
-    MODEL_NAME,
-    torch_dtype=torch.bfloat16 if device == "cuda" else torch.float32,
-    trust_remote_code=True,
-    device_map=None
-).to(device)
-
-async def stream_generate_reply(system_prompt: str, user_input: str, max_tokens: int = 10):
-    retry = 3 # 최대 3번 재시도
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_input},
-    ]
-    input_ids = tokenizer.apply_chat_template(
-        messages,
-        tokenize=True,
-        add_generation_prompt=True,
-        return_tensors="pt"
+
+def load_model(model_name: str = MODEL_NAME):
+    if model_name == "tiny":
+        # GPU 없이 로컬에서 서버를 띄워볼 때 (출력은 의미 없음)
+        from app.tiny_model import build_tiny_model
+
+        return build_tiny_model()
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        torch_dtype=torch.bfloat16 if device == "cuda" else torch.float32,
+        trust_remote_code=True,
+        device_map=None
     ).to(device)
+    model.eval()
+    return model, tokenizer
+
+
+def create_engine(model=None, tokenizer=None, **kwargs) -> BatchingEngine:
+    if model is None or tokenizer is None:
+        model, tokenizer = load_model()
+    kwargs.setdefault("max_batch_size", MAX_BATCH_SIZE)
+    kwargs.setdefault("max_wait_ms", MAX_WAIT_MS)
+    kwargs.setdefault("prefix_cache_bytes", int(PREFIX_CACHE_MB * 1024 * 1024))
+    # {"output": "..."} 의 값만 토큰이 나오는 대로 흘려보냄
+    engine = BatchingEngine(model, tokenizer, extractor_factory=lambda: JsonFieldExtractor("output"), **kwargs)
+    engine.start()
+    return engine
 
-    input_length = input_ids.shape[1]
-
-    for attempt in range(1, retry+1):
-        try:
-            output = model.generate(
-                input_ids,
-                eos_token_id=tokenizer.eos_token_id,
-                max_new_tokens=max_tokens,
-                do_sample=True,
-            )
-
-            generated_ids = output[0][input_length:]
-            generated_text = tokenizer.decode(generated_ids, skip_special_tokens=True)
-
-            print(f"[DEBUG] Attempt {attempt}: {generated_text}")
-
-            # JSON 파싱 시도
-            clean_text = generated_text.strip("`json\n ")
-            try:
-                data = json.loads(clean_text)
-                output_text = data.get("output", "")
-                print(f"[DEBUG] Parsed JSON successfully on attempt {attempt}")
-                break
-            except json.JSONDecodeError:
-                if attempt < retry:
-                    print(f"[WARN] JSON 파싱 실패 (시도 {attempt}/{retry}) → 재시도")
-                    await asyncio.sleep(0.3)
-                    continue
-                else:
-                    print(f"[ERROR] JSON 파싱 실패 (최대 재시도 {retry}회 초과)")
-                    output_text = generated_text
-            break
 
-        except torch.cuda.OutOfMemoryError:
-            raise RuntimeError("GPU 메모리 부족")
-        except Exception as e:
-            raise RuntimeError(f"모델 생성 중 오류 발생: {str(e)}")
+_DONE = object()
 
+
+async def stream_generate_reply(engine: BatchingEngine, system_prompt: str, user_input: str, max_tokens: int = 10, is_stale=None):
+    # 추론 스레드에서 조각이 디코딩되는 즉시 이벤트 루프 큐로 넘겨받아 yield (완성될 때까지 기다리지 않음)
+    loop = asyncio.get_running_loop()
+    pieces: asyncio.Queue = asyncio.Queue()
+
+    future = engine.submit(
+        system_prompt,
+        user_input,
+        max_tokens,
+        on_text=lambda piece: loop.call_soon_threadsafe(pieces.put_nowait, piece),
+        is_stale=is_stale,
+    )
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(pieces.put_nowait, _DONE))
+
+    while (piece := await pieces.get()) is not _DONE:
+        yield piece
+
+    try:
+        output_text = future.result()
+    except torch.cuda.OutOfMemoryError:
+        raise RuntimeError("GPU 메모리 부족")
+    except Exception as e:
+        raise RuntimeError(f"모델 생성 중 오류 발생: {str(e)}")
     print(f"[DEBUG] 최종 출력: {output_text}")
-    for token in output_text.split():
-        yield token
-        await asyncio.sleep(0.01)
 
-async def generate_and_publish(user_id: int, system_prompt: str, user_input: str, max_tokens: int = 10):
-    redis = await aioredis.from_url("redis://xend-fiveis-dev.duckdns.org:6379")
+async def generate_and_publish(
+    engine: BatchingEngine,
+    redis,
+    user_id: int,
+    system_prompt: str,
+    user_input: str,
+    max_tokens: int = 10,
+    sessions: SessionTracker | None = None,
+    session_id: str | None = None,
+    seq: int | None = None,
+):
+    # redis: 앱 전체가 공유하는 연결 (요청마다 새로 연결하지 않음)
     channel = f"user_{user_id}_mail"
+    # session/seq 를 같이 보내면 백엔드가 자기 소켓의 최신 요청 결과만 골라서 전달
+    tag = {"session": session_id, "seq": seq} if session_id is not None and seq is not None else {}
 
-    async for token in stream_generate_reply(system_prompt, user_input, max_tokens):
-        message = json.dumps({"type": "gpu.message", "data": {"text": token}})
+    is_stale = None
+    if sessions is not None and tag:
+        sessions.observe(user_id, session_id, seq)
+
+        def is_stale():
+            return sessions.is_stale(user_id, session_id, seq)
+
+    async for token in stream_generate_reply(engine, system_prompt, user_input, max_tokens, is_stale):
+        if is_stale is not None and is_stale():
+            break
+        message = json.dumps({"type": "gpu.message", "data": {"text": token}, **tag})
         await redis.publish(channel, message)
 
-    await redis.publish(channel, json.dumps({"type": "gpu.done"}))
-    await redis.close()
\ No newline at end of file
+    if is_stale is not None and is_stale():
+        return  # 더 새 요청이 결과를 이어서 보냄
+    await redis.publish(channel, json.dumps({"type": "gpu.done", **tag}))
@@ -1,9 +1,25 @@
+from contextlib import asynccontextmanager
+
+import redis.asyncio as aioredis
 from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
 from app.models import PredictRequest
-from app.llm import generate_and_publish
+from app.llm import REDIS_URL, create_engine, generate_and_publish
+from app.sessions import SessionTracker
 import json
 
-app = FastAPI(title="GPU Server for EXAONE")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 모델/엔진과 Redis 연결은 프로세스당 하나만 두고 모든 요청이 공유
+    app.state.engine = create_engine()
+    app.state.redis = aioredis.from_url(REDIS_URL)
+    app.state.sessions = SessionTracker()
+    yield
+    app.state.engine.stop()
+    await app.state.redis.aclose()
+
+
+app = FastAPI(title="GPU Server for EXAONE", lifespan=lifespan)
 
 @app.post("/predict")
 async def predict(bg: BackgroundTasks, request: Request):
@@ -19,9 +35,20 @@ async def predict(bg: BackgroundTasks, request: Request):
         # Pydantic 모델로 안전하게 변환
         req = PredictRequest(**body_json)
 
-        # 기존 작업 실행
-        bg.add_task(generate_and_publish, req.user_id, req.system_prompt, req.user_input, req.max_tokens)
+        # 엔진 큐에 넣고 바로 응답 (생성/배치는 추론 스레드에서)
+        bg.add_task(
+            generate_and_publish,
+            request.app.state.engine,
+            request.app.state.redis,
+            req.user_id,
+            req.system_prompt,
+            req.user_input,
+            req.max_tokens,
+            request.app.state.sessions,
+            req.session_id,
+            req.seq,
+        )
         return {"status": "started"}
     except Exception as e:
         print(f"Exception: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -6,3 +6,6 @@ class PredictRequest(BaseModel):
     system_prompt: str
     user_input: str
     max_tokens: int = 10
+    # compose 소켓 식별자와 그 소켓의 키 입력 순번 (더 큰 seq 가 오면 이전 요청은 버림)
+    session_id: str | None = None
+    seq: int | None = None
@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+
+import torch
+
+# system prompt(프롬프트 앞부분) 의 past key/values 를 보관하는 LRU 캐시
+#  - 키: 렌더링된 system 구간 문자열의 hash, 값: 레이어별 (key, value) 텐서 [1, heads, prefix_len, head_dim]
+#  - 전체 텐서 바이트가 max_bytes 를 넘으면 가장 오래 안 쓴 prefix 부터 버린다
+#  - 한 compose 세션 동안 system prompt 는 그대로이므로 키 입력마다 suffix(user 입력)만 prefill 하면 된다
+
+KVLayers = list[tuple[torch.Tensor, torch.Tensor]]
+
+
+def kv_nbytes(layers: KVLayers) -> int:
+    return sum(k.numel() * k.element_size() + v.numel() * v.element_size() for k, v in layers)
+
+
+class PrefixCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[KVLayers, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> KVLayers | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, layers: KVLayers) -> None:
+        size = kv_nbytes(layers)
+        if size > self.max_bytes:
+            return  # 예산보다 큰 prefix 는 이번 배치에서만 쓰고 보관하지 않음
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (layers, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def __len__(self) -> int:
+        return len(self._entries)
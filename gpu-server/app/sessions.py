@@ -0,0 +1,29 @@
+import threading
+from collections import OrderedDict
+
+# compose 세션(소켓)별 최신 요청 번호(seq) 추적
+#  - 백엔드 consumer 가 키 입력마다 seq 를 1씩 올려서 보낸다
+#  - 더 큰 seq 가 도착한 세션의 이전 요청은 stale: 큐에 있으면 건너뛰고, 생성 중이면 그 행을 멈춘다
+#  - 세션 수가 무한히 늘지 않도록 오래된 세션부터 잊는다
+
+MAX_TRACKED_SESSIONS = 10_000
+
+
+class SessionTracker:
+    def __init__(self, max_sessions: int = MAX_TRACKED_SESSIONS):
+        self.max_sessions = max_sessions
+        self._latest: OrderedDict[tuple[int, str], int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, user_id: int, session_id: str, seq: int) -> None:
+        key = (user_id, session_id)
+        with self._lock:
+            if seq > self._latest.get(key, -1):
+                self._latest[key] = seq
+            self._latest.move_to_end(key)
+            while len(self._latest) > self.max_sessions:
+                self._latest.popitem(last=False)
+
+    def is_stale(self, user_id: int, session_id: str, seq: int) -> bool:
+        with self._lock:
+            return seq < self._latest.get((user_id, session_id), seq)
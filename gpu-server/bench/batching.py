@@ -0,0 +1,104 @@
+"""
+CPU benchmark: BatchingEngine throughput / latency with a tiny random model.
+
+  sequential: max_batch_size=1 (one model.generate per request, like the old background task)
+  batched   : micro-batches of up to --batch-size requests gathered within --wait-ms
+
+Closed loop: --clients concurrent callers, each sending --requests requests back to back
+(keystroke-style prompts: long shared-looking system prompt + short user input).
+
+Usage (from gpu-server/):
+    python bench/batching.py [--clients 16] [--requests 8] [--batch-size 8] [--wait-ms 10] [--max-tokens 12]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import torch  # noqa: E402
+
+from app.engine import BatchingEngine  # noqa: E402
+from app.tiny_model import build_tiny_model  # noqa: E402
+
+SYSTEM_PROMPT = (
+    "당신은 사용자가 작성 중인 메일을 이어서 완성하는 역할을 수행합니다. "
+    "사용자가 작성한 내용에 자연스럽게 이어서 6단어 정도만 작성하세요. "
+    "출력은 반드시 JSON 형태로 작성합니다.\n수신자들에 대한 설명은 다음과 같습니다: Internal team comms"
+)
+INPUTS = ["안녕하세요 오늘 회의 진행을 맡은", "저는 내일 미팅을 준비하고 있고,", "Hi team, please find", "첨부한 견적서를 검토하시고"]
+
+
+def run(engine: BatchingEngine, clients: int, requests_per_client: int, max_tokens: int, seed: int) -> dict:
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def client(idx: int):
+        rng = random.Random(seed + idx)
+        for _ in range(requests_per_client):
+            text = rng.choice(INPUTS)[: rng.randrange(5, 30)]
+            started = time.perf_counter()
+            engine.submit(f"{SYSTEM_PROMPT}\n(user {idx})", text, max_tokens).result()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / wall,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "batches": engine.batches,
+        "requests": len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=8, help="requests per client")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--wait-ms", type=float, default=10)
+    parser.add_argument("--max-tokens", type=int, default=12)
+    parser.add_argument("--hidden", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="torch intra-op threads")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    model, tokenizer = build_tiny_model(args.hidden, args.layers, args.seed)
+    print(
+        f"tiny llama hidden={args.hidden} layers={args.layers}, {args.clients} clients x {args.requests} requests, "
+        f"max_new_tokens={args.max_tokens}, torch threads={args.threads}"
+    )
+
+    for name, batch_size, wait_ms in (("sequential", 1, 0), ("batched", args.batch_size, args.wait_ms)):
+        # 랜덤 모델이라 JSON 파싱은 항상 실패하므로 재시도는 끄고 생성 비용만 비교
+        engine = BatchingEngine(model, tokenizer, max_batch_size=batch_size, max_wait_ms=wait_ms, max_attempts=1)
+        engine.start()
+        engine.submit(SYSTEM_PROMPT, "warmup", 2).result()
+        engine.batches = 0
+
+        r = run(engine, args.clients, args.requests, args.max_tokens, args.seed)
+        engine.stop()
+        print(
+            f"[{name:10}] {r['throughput']:6.1f} req/s | p50 {r['p50'] * 1000:6.0f} ms | p95 {r['p95'] * 1000:6.0f} ms | "
+            f"{r['requests']} requests in {r['batches']} generate calls"
+        )
+
+
+if __name__ == "__main__":
+    main()
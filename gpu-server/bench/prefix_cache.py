@@ -0,0 +1,112 @@
+"""
+CPU benchmark: prefix KV-cache reuse across a compose session.
+
+Each simulated user keeps one long system prompt (recipients, group description,
+style prompt, reply body, analysis JSON) and types --keystrokes times; every keystroke
+is a /predict with the same system prompt and a slightly longer user input.
+
+  no cache  : every request prefills the full prompt
+  prefix kv : the system turn is prefilled once per session, later keystrokes only prefill the typed suffix
+
+Usage (from gpu-server/):
+    python bench/prefix_cache.py [--users 4] [--keystrokes 10] [--max-tokens 6] [--budget-mb 256]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import torch  # noqa: E402
+
+from app.engine import BatchingEngine  # noqa: E402
+from app.tiny_model import build_tiny_model  # noqa: E402
+
+TYPED = "안녕하세요 오늘 회의 진행을 맡은 홍길동 대리입니다. 지난주 논의한 일정 관련해서"
+
+
+def system_prompt(user: int) -> str:
+    analysis = {
+        "lexical_style": "정중하고 간결한 비즈니스 문체, 존댓말 사용",
+        "grammar_patterns": ["~드립니다", "~부탁드립니다", "확인 부탁드립니다"],
+        "emotional_tone": "차분하고 신뢰감 있는 톤",
+        "representative_sentences": ["검토 후 회신 부탁드립니다.", "일정 조율 가능하실까요?", "감사합니다."],
+    }
+    return (
+        "당신은 사용자가 작성 중인 메일을 이어서 완성하는 역할을 수행합니다.\n"
+        "사용자가 작성한 내용에 자연스럽게 이어서 6단어 정도만 작성하세요.\n"
+        f"사용자는 다음의 수신자에게 메일을 작성하고 있습니다:\nRecipient {user}\n"
+        "수신자들에 대한 설명은 다음과 같습니다:\n외부 파트너사 프로젝트 담당자\n"
+        "문장을 작성할 때 다음과 같은 스타일의 문체를 사용합니다:\nPlease respond politely.\nKeep it concise.\n"
+        "사용자는 다음 내용의 메일에 답장하고 있습니다:\n" + "지난주 회의에서 논의한 일정과 예산안을 공유드립니다. " * 6 + "\n"
+        "사용자가 수신자들에게 작성한 메일을 분석한 내용은 다음과 같습니다:\n" + json.dumps(analysis, ensure_ascii=False)
+    )
+
+
+def run(engine: BatchingEngine, users: int, keystrokes: int, max_tokens: int):
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def session(user: int):
+        prompt = system_prompt(user)
+        for i in range(keystrokes):
+            started = time.perf_counter()
+            engine.submit(prompt, TYPED[: 5 + i * 3], max_tokens).result()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=session, args=(u,)) for u in range(users)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--keystrokes", type=int, default=10)
+    parser.add_argument("--max-tokens", type=int, default=6)
+    parser.add_argument("--budget-mb", type=float, default=256)
+    parser.add_argument("--hidden", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    model, tokenizer = build_tiny_model(args.hidden, args.layers)
+    prompt_tokens = len(BatchingEngine(model, tokenizer).encode(system_prompt(0), TYPED)[0])
+    print(
+        f"tiny llama hidden={args.hidden} layers={args.layers}, {args.users} sessions x {args.keystrokes} keystrokes, "
+        f"~{prompt_tokens} prompt tokens, max_new_tokens={args.max_tokens}"
+    )
+
+    for name, budget in (("no cache", 0), ("prefix kv", int(args.budget_mb * 1024 * 1024))):
+        engine = BatchingEngine(model, tokenizer, max_attempts=1, prefix_cache_bytes=budget)
+        engine.start()
+        engine.submit("warmup", "warmup", 2).result()
+        engine.prefill_tokens = 0
+
+        latencies, wall = run(engine, args.users, args.keystrokes, args.max_tokens)
+        engine.stop()
+
+        n = len(latencies)
+        line = (
+            f"[{name:9}] p50 {statistics.median(latencies) * 1000:6.0f} ms | p95 {latencies[int(n * 0.95) - 1] * 1000:6.0f} ms | "
+            f"{n / wall:5.1f} req/s | prefill {engine.prefill_tokens / n:6.0f} tokens/request"
+        )
+        if engine.prefix_cache is not None:
+            cache = engine.prefix_cache
+            line += f" | hits {cache.hits} misses {cache.misses}, {cache.bytes / 1024 / 1024:.1f} MiB held"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
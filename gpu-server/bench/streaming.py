@@ -0,0 +1,133 @@
+"""
+CPU benchmark: time-to-first-token of the autocomplete stream.
+
+The tiny random model is forced (logits processor) to emit a realistic completion,
+  ```json\\n{"output": "오늘 회의 자료를 준비하면서 필요한 내용을"}```
+so the real decode -> JsonFieldExtractor -> on_text path runs token by token.
+
+  post-hoc : words are published only after the whole completion is parsed
+             (previous behaviour: TTFT == completion time)
+  streaming: first piece of the "output" value is published as soon as it is decoded
+
+Usage (from gpu-server/):
+    python bench/streaming.py [--clients 8] [--requests 6] [--batch-size 8] [--wait-ms 10]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import torch  # noqa: E402
+from transformers import LogitsProcessor, LogitsProcessorList  # noqa: E402
+
+from app.engine import BatchingEngine  # noqa: E402
+from app.json_stream import JsonFieldExtractor  # noqa: E402
+from app.tiny_model import build_tiny_model  # noqa: E402
+
+COMPLETION = '```json\n{"output": "오늘 회의 자료를 준비하면서 필요한 내용을"}\n```'
+SYSTEM_PROMPT = (
+    "당신은 사용자가 작성 중인 메일을 이어서 완성하는 역할을 수행합니다. "
+    "사용자가 작성한 내용에 자연스럽게 이어서 6단어 정도만 작성하세요. "
+    "출력은 반드시 JSON 형태로 작성합니다."
+)
+
+
+class _ForceCompletion(LogitsProcessor):
+    def __init__(self, prompt_len: int, script: list[int], eos_id: int):
+        self.prompt_len = prompt_len
+        self.script = script
+        self.eos_id = eos_id
+
+    def __call__(self, input_ids, scores):
+        step = input_ids.shape[1] - self.prompt_len
+        forced = self.script[step] if step < len(self.script) else self.eos_id
+        out = torch.full_like(scores, float("-inf"))
+        out[:, forced] = 0
+        return out
+
+
+class ScriptedEngine(BatchingEngine):
+    def _generation_kwargs(self, padded) -> dict:
+        script = self.tokenizer(COMPLETION, add_special_tokens=False)["input_ids"]
+        processor = _ForceCompletion(padded["input_ids"].shape[1], script, self.tokenizer.eos_token_id)
+        return {"logits_processor": LogitsProcessorList([processor])}
+
+
+def run(engine: BatchingEngine, clients: int, requests_per_client: int, max_tokens: int):
+    ttft: list[float] = []
+    total: list[float] = []
+    lock = threading.Lock()
+
+    def client(idx: int):
+        for _ in range(requests_per_client):
+            first: list[float] = []
+            started = time.perf_counter()
+            future = engine.submit(
+                f"{SYSTEM_PROMPT}\n(user {idx})",
+                "안녕하세요 오늘 회의 진행을 맡은",
+                max_tokens,
+                on_text=lambda piece, first=first: first or first.append(time.perf_counter()),
+            )
+            text = future.result()
+            done = time.perf_counter()
+            assert text == "오늘 회의 자료를 준비하면서 필요한 내용을", text
+            with lock:
+                ttft.append(first[0] - started)
+                total.append(done - started)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(ttft), sorted(total)
+
+
+def _pct(values: list[float], q: float) -> float:
+    return values[max(0, int(len(values) * q) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=6, help="requests per client")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--wait-ms", type=float, default=10)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--hidden", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    model, tokenizer = build_tiny_model(args.hidden, args.layers)
+    engine = ScriptedEngine(
+        model,
+        tokenizer,
+        max_batch_size=args.batch_size,
+        max_wait_ms=args.wait_ms,
+        do_sample=False,
+        extractor_factory=lambda: JsonFieldExtractor("output"),
+    )
+    engine.start()
+    script_len = len(tokenizer(COMPLETION, add_special_tokens=False)["input_ids"])
+    engine.submit(SYSTEM_PROMPT, "warmup", script_len).result()
+
+    print(f"tiny llama hidden={args.hidden} layers={args.layers}, {args.clients} clients x {args.requests} requests, completion {script_len} tokens")
+
+    ttft, total = run(engine, args.clients, args.requests, args.max_tokens)
+    engine.stop()
+
+    # post-hoc 방식은 완성 후에야 첫 단어를 보낼 수 있으므로 TTFT == 완료 시간
+    print(f"[post-hoc ] TTFT p50 {statistics.median(total) * 1000:6.0f} ms | p95 {_pct(total, 0.95) * 1000:6.0f} ms")
+    print(f"[streaming] TTFT p50 {statistics.median(ttft) * 1000:6.0f} ms | p95 {_pct(ttft, 0.95) * 1000:6.0f} ms")
+    print(f"            completion p50 {statistics.median(total) * 1000:6.0f} ms (no artificial 10 ms/word delay)")
+
+
+if __name__ == "__main__":
+    main()